@@ -1,18 +1,50 @@
 from django.contrib import admin
-from apps.training.models import TrainingPlan
+from django.db.models import Count
+from apps.training.models import TrainingPlan, PlanGenerationJob, Exercise
 
 @admin.register(TrainingPlan)
 class TrainingPlanAdmin(admin.ModelAdmin):
-    list_display = ('user', 'plan_type', 'difficulty', 'get_exercises_summary', 'is_active', 'created_at')
+    list_display = (
+        'user', 'plan_type', 'difficulty', 'get_exercises_summary',
+        'total_sets', 'estimated_duration', 'is_active', 'created_at'
+    )
     list_filter = ('plan_type', 'difficulty', 'is_active')
     search_fields = ('user__username',)
+    list_select_related = ('user',)
+    readonly_fields = ('day_count', 'exercise_count', 'total_sets', 'estimated_duration')
 
     def get_exercises_summary(self, obj):
         """Muestra un resumen de los ejercicios del plan"""
-        if obj.exercises and 'dias' in obj.exercises:
-            dias = len(obj.exercises['dias'])
-            total_ejercicios = sum(len(dia['ejercicios']) for dia in obj.exercises['dias'])
-            return f"{dias} días, {total_ejercicios} ejercicios"
+        if obj.day_count:
+            return f"{obj.day_count} días, {obj.exercise_count} ejercicios"
         return "Sin ejercicios"
     
-    get_exercises_summary.short_description = "Ejercicios"
\ No newline at end of file
+    get_exercises_summary.short_description = "Ejercicios"
+    get_exercises_summary.admin_order_field = 'exercise_count'
+
+
+@admin.register(PlanGenerationJob)
+class PlanGenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'plan', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('user__username',)
+    list_select_related = ('user', 'plan__user')
+
+
+@admin.register(Exercise)
+class ExerciseAdmin(admin.ModelAdmin):
+    list_display = ('name', 'get_plan_count')
+    search_fields = ('normalized_name',)
+    readonly_fields = ('normalized_name',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            plan_count=Count('plan_exercises__plan', distinct=True)
+        )
+
+    def get_plan_count(self, obj):
+        """Número de planes que incluyen el ejercicio"""
+        return obj.plan_count
+
+    get_plan_count.short_description = "Planes"
+    get_plan_count.admin_order_field = 'plan_count'
@@ -0,0 +1,81 @@
+from datetime import datetime, time
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from apps.training.models import TrainingPlan
+
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def _parse_moment(name, value, end_of_day=False):
+    """Acepta fechas (``2024-05-01``) o fechas con hora en ISO 8601"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: 'Formato de fecha no válido, usa AAAA-MM-DD o ISO 8601'})
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class TrainingPlanFilter(BaseFilterBackend):
+    """
+    Filtros del listado de planes por parámetros de consulta.
+
+    ``plan_type``, ``difficulty``, ``is_active``, ``created_after``,
+    ``created_before`` y ``exercise``. Todos se combinan con el filtro por
+    usuario de la vista, así que se resuelven sobre los índices que empiezan
+    por ``user``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        for field, choices in (('plan_type', TrainingPlan.TRAINING_TYPES),
+                               ('difficulty', TrainingPlan.DIFFICULTY_LEVELS)):
+            value = params.get(field)
+            if value:
+                if value not in dict(choices):
+                    raise ValidationError({field: f'Valor no válido: {value}'})
+                queryset = queryset.filter(**{field: value})
+
+        is_active = params.get('is_active', '').lower()
+        if is_active in TRUE_VALUES:
+            queryset = queryset.filter(is_active=True)
+        elif is_active in FALSE_VALUES:
+            queryset = queryset.filter(is_active=False)
+        elif is_active:
+            raise ValidationError({'is_active': 'Usa true o false'})
+
+        if params.get('created_after'):
+            queryset = queryset.filter(
+                created_at__gte=_parse_moment('created_after', params['created_after'])
+            )
+        if params.get('created_before'):
+            queryset = queryset.filter(
+                created_at__lte=_parse_moment('created_before', params['created_before'], end_of_day=True)
+            )
+
+        if params.get('exercise'):
+            queryset = queryset.with_exercise(params['exercise'])
+        return queryset
+
+
+class TrainingPlanOrderingFilter(OrderingFilter):
+    """
+    ``?ordering=`` limitado a columnas cubiertas por los índices del plan,
+    con ``id`` como desempate en el mismo sentido para la paginación por cursor.
+    """
+    ordering_fields = ('created_at',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        tiebreaker = '-id' if ordering[0].startswith('-') else 'id'
+        return tuple(ordering) + (tiebreaker,)
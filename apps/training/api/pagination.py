@@ -0,0 +1,109 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'TRAINING_PLAN_PAGINATION', {})
+
+
+class TrainingPlanCursorPagination(CursorPagination):
+    """
+    Paginación por cursor (keyset) del listado de planes.
+
+    El cursor guarda ``created_at`` e ``id`` del último plan servido y la
+    página siguiente se pide con la comparación de filas
+    ``(created_at, id) < (cursor)`` (``>`` en orden ascendente), escrita
+    como ``created_at < c OR (created_at = c AND id < i)`` más la cota
+    ``created_at <= c`` para recorrer el índice ``(user, -created_at, -id)``.
+    No hay OFFSET ni desempates por desplazamiento, así que el coste no
+    depende de cuántos planes tenga el usuario ni de los ``created_at``
+    repetidos. El cliente puede pedir ``?page_size=`` hasta ``MAX_PAGE_SIZE``.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        config = _get_config()
+        self.page_size = config.get('PAGE_SIZE', 20)
+        self.max_page_size = config.get('MAX_PAGE_SIZE', 100)
+        return super().get_page_size(request)
+
+    def _get_position_from_instance(self, instance, ordering):
+        # El orden siempre es (created_at, id) en el mismo sentido: ver TrainingPlanOrderingFilter
+        field_name = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            value, pk = instance[field_name], instance['id']
+        else:
+            value, pk = getattr(instance, field_name), instance.pk
+        return f'{value.isoformat()}|{pk}'
+
+    def _parse_position(self, position):
+        value, _, pk = position.rpartition('|')
+        moment = parse_datetime(value)
+        if moment is None or not pk.isdigit():
+            raise NotFound(self.invalid_cursor_message)
+        return moment, int(pk)
+
+    def _after(self, ordering, position):
+        """Filtro de las filas que siguen a ``position`` en ``ordering``"""
+        moment, pk = self._parse_position(position)
+        field_name = ordering[0].lstrip('-')
+        lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+        id_lookup = 'lt' if ordering[1].startswith('-') else 'gt'
+        return Q(**{f'{field_name}__{lookup}e': moment}) & (
+            Q(**{f'{field_name}__{lookup}': moment})
+            | Q(**{field_name: moment, f'id__{id_lookup}': pk})
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        position = self.cursor.position if self.cursor is not None else None
+
+        # Hacia atrás se recorre el orden inverso y se da la vuelta a la página
+        if reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering)
+        else:
+            ordering = self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+
+        # Una fila de más indica si hay otra página en el sentido del recorrido
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+        self.current_position = position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (self._get_position_from_instance(self.page[-1], self.ordering)
+                    if self.page else self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (self._get_position_from_instance(self.page[0], self.ordering)
+                    if self.page else self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
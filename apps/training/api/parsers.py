@@ -0,0 +1,15 @@
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    Parser de JSON Lines (un objeto JSON por línea).
+
+    No lee el cuerpo entero: devuelve un iterador perezoso de líneas en bytes
+    que la vista consume a medida que llegan, así que ``request.data`` solo
+    puede recorrerse una vez.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return iter(stream.readline, b'')
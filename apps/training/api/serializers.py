@@ -1,9 +1,20 @@
 from rest_framework import serializers
-from apps.training.models import TrainingPlan
+from apps.training.models import TrainingPlan, PlanGenerationJob
 from apps.users.api.serializers import UserSerializer
+from apps.training.validators import validate_plan
 
 
-class TrainingPlanSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Permite limitar los campos serializados con ``fields=[...]`` al instanciar"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class TrainingPlanSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -14,14 +25,68 @@ class TrainingPlanSerializer(serializers.ModelSerializer):
             'plan_type',
             'difficulty',
             'exercises',
+            'day_count',
+            'exercise_count',
+            'total_sets',
+            'estimated_duration',
             'created_at',
             'is_active'
         )
+        read_only_fields = ('day_count', 'exercise_count', 'total_sets', 'estimated_duration')
 
     def validate_exercises(self, value):
-        """Validación del formato JSON de exercises"""
-        if not isinstance(value, dict) or 'dias' not in value:
-            raise serializers.ValidationError(
-                "El formato de exercises debe ser un diccionario con una clave 'dias'"
-            )
+        """Validación del formato JSON de exercises, el mismo que se exige a OpenAI"""
+        error = validate_plan(value)
+        if error:
+            raise serializers.ValidationError(f"Formato de exercises no válido: {error}")
         return value
+
+    def update(self, instance, validated_data):
+        """
+        Guarda solo los campos recibidos: sin ``exercises`` no se recalculan
+        las estadísticas ni se reconstruyen los días y ejercicios del plan.
+        """
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=list(validated_data))
+        return instance
+
+
+class TrainingPlanSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Representación ligera para listados: sin ejercicios, solo sus estadísticas"""
+
+    class Meta:
+        model = TrainingPlan
+        fields = (
+            'id',
+            'plan_type',
+            'difficulty',
+            'day_count',
+            'exercise_count',
+            'total_sets',
+            'estimated_duration',
+            'created_at',
+            'is_active'
+        )
+        read_only_fields = fields
+
+
+class PlanGenerationJobSerializer(serializers.ModelSerializer):
+    plan = TrainingPlanSerializer(read_only=True)
+
+    class Meta:
+        model = PlanGenerationJob
+        fields = (
+            'id',
+            'status',
+            'engine',
+            'plan',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at'
+        )
+        read_only_fields = ('id', 'status', 'plan', 'error', 'created_at', 'started_at', 'finished_at')
+        extra_kwargs = {
+            'engine': {'required': False}
+        }
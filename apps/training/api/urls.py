@@ -1,8 +1,22 @@
 from django.urls import path
-from apps.training.api.views import TrainingPlanListCreateView, TrainingPlanDetailView, GenerateTrainingPlanView
+from apps.training.api.views import (
+    TrainingPlanListCreateView,
+    TrainingPlanDetailView,
+    TrainingPlanBulkImportView,
+    TrainingPlanExportView,
+    GenerateTrainingPlanView,
+    AsyncGenerateTrainingPlanView,
+    StreamTrainingPlanView,
+    PlanGenerationJobDetailView,
+)
 
 urlpatterns = [
     path('', TrainingPlanListCreateView.as_view(), name='training-plan-list'),
     path('<int:pk>/', TrainingPlanDetailView.as_view(), name='training-plan-detail'),
+    path('bulk/', TrainingPlanBulkImportView.as_view(), name='training-plan-bulk'),
+    path('export/', TrainingPlanExportView.as_view(), name='training-plan-export'),
     path('generate/', GenerateTrainingPlanView.as_view(), name='generate-training-plan'),
+    path('generate/async/', AsyncGenerateTrainingPlanView.as_view(), name='generate-training-plan-async'),
+    path('generate/stream/', StreamTrainingPlanView.as_view(), name='generate-training-plan-stream'),
+    path('jobs/<int:pk>/', PlanGenerationJobDetailView.as_view(), name='plan-generation-job-detail'),
 ]
\ No newline at end of file
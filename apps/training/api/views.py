@@ -1,84 +1,265 @@
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views import View
 from rest_framework import generics, status
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from apps.training.services.openai_service import OpenAIService
-from apps.training.models import TrainingPlan
-from apps.training.api.serializers import TrainingPlanSerializer
+from rest_framework.exceptions import AuthenticationFailed, ValidationError as DRFValidationError
+from apps.users.authentication import ProfileJWTAuthentication, StatelessJWTAuthentication
+from apps.training.services.plan_jobs import enqueue_plan_generation, reclaim_stale_jobs
+from apps.training.services.openai_service import UpstreamUnavailableError
+from apps.training.services.plan_generation import agenerate_plan_for_user, stream_plan_for_user
+from apps.training.services.plan_bulk import BulkImportError, export_plans, import_plans
+from apps.training.models import TrainingPlan, PlanGenerationJob
+from apps.training.api.serializers import (
+    TrainingPlanSerializer,
+    TrainingPlanSummarySerializer,
+    PlanGenerationJobSerializer
+)
+from apps.training.api.pagination import TrainingPlanCursorPagination
+from apps.training.api.parsers import NDJSONParser
+from apps.users.api.mixins import UserDataConditionalMixin
+from apps.training.api.filters import TrainingPlanFilter, TrainingPlanOrderingFilter
+import json
 import logging
 
 
+class TrainingPlanListCreateView(UserDataConditionalMixin, generics.ListCreateAPIView):
+    """
+    Vista para listar y crear planes de entrenamiento.
 
-class TrainingPlanListCreateView(generics.ListCreateAPIView):
-    """Vista para listar y crear planes de entrenamiento"""
+    El listado acepta ``?view=summary``, que sustituye los ejercicios por sus
+    recuentos, y ``?fields=id,plan_type,...`` para devolver solo esos campos.
+    En ambos casos la columna ``exercises`` no se lee si no se va a devolver.
+    Los filtros y el orden disponibles están en ``api/filters.py``.
+    """
     serializer_class = TrainingPlanSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = TrainingPlanCursorPagination
+    filter_backends = (TrainingPlanFilter, TrainingPlanOrderingFilter)
+    authentication_classes = (StatelessJWTAuthentication,)
+
+    def is_summary(self):
+        return self.request.method == 'GET' and self.request.query_params.get('view') == 'summary'
+
+    def get_requested_fields(self):
+        """Campos pedidos con ``?fields=``, o None si se quieren todos"""
+        fields = self.request.query_params.get('fields')
+        if self.request.method != 'GET' or not fields:
+            return None
+        requested = [name.strip() for name in fields.split(',') if name.strip()]
+        available = self.get_serializer_class().Meta.fields
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise DRFValidationError({'fields': f"Campos no válidos: {', '.join(unknown)}"})
+        return requested
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return TrainingPlanSummarySerializer
+        return TrainingPlanSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
 
     def get_queryset(self):
         """Filtrar planes por usuario actual"""
-        return TrainingPlan.objects.filter(user=self.request.user)
+        queryset = TrainingPlan.objects.filter(user_id=self.request.user.pk)
+        if self.is_summary():
+            return queryset.summary()
+
+        fields = self.get_requested_fields()
+        if fields is not None and 'exercises' not in fields:
+            queryset = queryset.defer('exercises')
+        if fields is None or 'user' in fields:
+            queryset = queryset.select_related('user')
+        return queryset
 
     def perform_create(self, serializer):
         """Asignar usuario actual al crear plan"""
         serializer.save(user=self.request.user)
 
-class TrainingPlanDetailView(generics.RetrieveUpdateDestroyAPIView):
+class TrainingPlanDetailView(UserDataConditionalMixin, generics.RetrieveUpdateDestroyAPIView):
     """Vista para ver, actualizar y eliminar un plan específico"""
     serializer_class = TrainingPlanSerializer
     permission_classes = (IsAuthenticated,)
+    authentication_classes = (StatelessJWTAuthentication,)
 
     def get_queryset(self):
         """Filtrar planes por usuario actual"""
-        return TrainingPlan.objects.filter(user=self.request.user)
-    
-    
+        return TrainingPlan.objects.filter(user_id=self.request.user.pk).select_related('user')
+
+
+class TrainingPlanBulkImportView(APIView):
+    """
+    Importa planes en bloque desde un cuerpo JSON Lines
+    (``Content-Type: application/x-ndjson``), un plan por línea con los mismos
+    campos que el alta individual. O se importan todos o ninguno: si alguna
+    línea no es válida se responde 400 con los errores por número de línea.
+    """
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (NDJSONParser,)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            created = import_plans(request.user, request.data, TrainingPlanSerializer)
+        except BulkImportError as e:
+            return Response({'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+
+class TrainingPlanExportView(generics.GenericAPIView):
+    """
+    Exporta los planes del usuario como JSON Lines en streaming, del más
+    reciente al más antiguo. Acepta los mismos filtros que el listado.
+    """
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (StatelessJWTAuthentication,)
+    filter_backends = (TrainingPlanFilter,)
+    # Todos los campos menos el usuario, así una exportación se puede volver a importar
+    export_fields = tuple(name for name in TrainingPlanSerializer.Meta.fields if name != 'user')
+
+    def get_queryset(self):
+        return TrainingPlan.objects.filter(user_id=self.request.user.pk).order_by('-created_at', '-id')
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = TrainingPlanSerializer(fields=self.export_fields)
+        response = StreamingHttpResponse(export_plans(queryset, serializer), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="training-plans.jsonl"'
+        return response
+
+
 class GenerateTrainingPlanView(generics.CreateAPIView):
+    """
+    Encola la generación de un plan a partir del perfil del usuario.
+
+    Responde 202 con el trabajo creado; su estado se consulta en
+    ``jobs/<id>/`` mientras la llamada a OpenAI se resuelve en segundo plano.
+    Con ``engine=rules`` el plan se genera localmente y se responde 201 con
+    el trabajo ya completado.
+    """
     permission_classes = (IsAuthenticated,)
-    serializer_class = TrainingPlanSerializer
+    serializer_class = PlanGenerationJobSerializer
 
     def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_plan_generation(request.user, serializer.validated_data.get('engine'))
+
+        serializer = self.get_serializer(job)
+        finished = job.status != PlanGenerationJob.STATUS_PENDING
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if finished else status.HTTP_202_ACCEPTED,
+            headers={'Location': reverse('plan-generation-job-detail', kwargs={'pk': job.pk})}
+        )
+
+
+class PlanGenerationJobDetailView(generics.RetrieveAPIView):
+    """Vista para consultar el estado de una generación de plan"""
+    serializer_class = PlanGenerationJobSerializer
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (StatelessJWTAuthentication,)
+
+    def get_queryset(self):
+        """Filtrar trabajos por usuario actual"""
+        return PlanGenerationJob.objects.filter(
+            user_id=self.request.user.pk
+        ).select_related('plan__user')
+
+    def get_object(self):
+        job = super().get_object()
+        # Un trabajo abandonado por un reinicio se recupera cuando el cliente lo consulta
+        if job.status in (PlanGenerationJob.STATUS_PENDING, PlanGenerationJob.STATUS_RUNNING):
+            if reclaim_stale_jobs([job.pk]):
+                job.refresh_from_db()
+        return job
+
+
+class StreamTrainingPlanView(APIView):
+    """
+    Genera un plan y lo envía por Server-Sent Events.
+
+    Emite un evento ``day`` por cada día en cuanto está completo, ``done``
+    con el plan guardado al terminar, o ``error`` si la generación falla.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            self._event_stream(request.user),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Evita que nginx acumule la respuesta antes de enviarla
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def _event_stream(self, user):
         try:
-            print("DEBUG: Iniciando generación de plan de entrenamiento")
-            
-            # Obtener los datos del perfil del usuario
-            profile = request.user.profile
-            print(f"DEBUG: Perfil encontrado - Usuario: {request.user.username}")
-            print(f"DEBUG: Datos del perfil - Nivel: {profile.experience_level}, "
-                  f"Objetivo: {profile.fitness_goal}, "
-                  f"Días disponibles: {profile.available_days}")
-            
-            # Inicializar el servicio de OpenAI
-            openai_service = OpenAIService()
-            
-            try:
-                # Generar el plan
-                plan_data = openai_service.generate_training_plan(
-                    experience_level=profile.experience_level,
-                    fitness_goal=profile.fitness_goal,
-                    available_days=profile.available_days,
-                    health_conditions=profile.health_conditions
-                )
-                print("DEBUG: Plan generado correctamente")
-                
-            except Exception as e:
-                print(f"DEBUG: Error al generar el plan - {str(e)}")
-                raise
-                
-            # Crear el plan en la base de datos
-            plan = TrainingPlan.objects.create(
-                user=request.user,
-                plan_type='STRENGTH',
-                difficulty=profile.experience_level,
-                exercises=plan_data,
-                is_active=True
+            for kind, payload in stream_plan_for_user(user):
+                if kind == 'day':
+                    yield self._format_event('day', payload)
+                else:
+                    yield self._format_event('done', TrainingPlanSerializer(payload).data)
+        except ValidationError as e:
+            yield self._format_event('error', {'error': str(e)})
+
+    @staticmethod
+    def _format_event(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class AsyncGenerateTrainingPlanView(View):
+    """
+    Variante async de la generación que devuelve el plan en la misma petición.
+
+    Bajo ASGI la espera a OpenAI no bloquea ningún hilo, de modo que un solo
+    proceso atiende muchas generaciones concurrentes. Al ser una vista de
+    Django (DRF no soporta vistas async), la autenticación JWT se hace aquí.
+    """
+    http_method_names = ['post', 'options']
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Autenticación por cabecera JWT, sin cookies: igual que en las vistas de DRF
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            result = await sync_to_async(ProfileJWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        if result is None:
+            return JsonResponse(
+                {'detail': 'Las credenciales de autenticación no se proveyeron.'},
+                status=status.HTTP_401_UNAUTHORIZED
             )
-            
-            serializer = self.get_serializer(plan)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-            
-        except Exception as e:
-            print(f"DEBUG: Error general en create - {str(e)}")
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+        user, _ = result
+
+        engine = None
+        if request.content_type == 'application/json' and request.body:
+            try:
+                engine = json.loads(request.body).get('engine')
+            except (ValueError, AttributeError):
+                return JsonResponse({'error': 'JSON no válido'}, status=status.HTTP_400_BAD_REQUEST)
+        if engine is not None and engine not in dict(PlanGenerationJob.ENGINES):
+            return JsonResponse({'engine': ['Motor no válido']}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            plan = await agenerate_plan_for_user(user, engine)
+        except UpstreamUnavailableError as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ValidationError as e:
+            return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse(TrainingPlanSerializer(plan).data, status=status.HTTP_201_CREATED)
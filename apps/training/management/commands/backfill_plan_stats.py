@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from apps.training.models import TrainingPlan
+from apps.training.services.plan_stats import STATS_FIELDS, compute_plan_stats
+from apps.users.services.user_service import bump_data_version
+
+
+class Command(BaseCommand):
+    help = 'Recalcula las estadísticas desnormalizadas de los planes de entrenamiento existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Planes leídos y actualizados por lote'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcula todos los planes, no solo los que no tienen estadísticas'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        plans = TrainingPlan.objects.only('id', 'user_id', 'exercises', *STATS_FIELDS).order_by('id')
+        if not options['all']:
+            plans = plans.filter(day_count=0)
+
+        # Se avanza por clave primaria para que cada lote sea una consulta por índice
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(plans.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            changed = []
+            for plan in batch:
+                stats = compute_plan_stats(plan.exercises)
+                if any(getattr(plan, field) != value for field, value in stats.items()):
+                    for field, value in stats.items():
+                        setattr(plan, field, value)
+                    changed.append(plan)
+            TrainingPlan.objects.bulk_update(changed, STATS_FIELDS)
+            # bulk_update no emite señales: las estadísticas se exponen en la API
+            if changed:
+                bump_data_version(*{plan.user_id for plan in changed})
+            updated += len(changed)
+            last_id = batch[-1].id
+
+        self.stdout.write(f'{updated} planes actualizados')
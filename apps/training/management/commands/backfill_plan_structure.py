@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from apps.training.models import TrainingPlan
+from apps.training.services.plan_structure import sync_plan_structure
+
+
+class Command(BaseCommand):
+    help = 'Genera los días y ejercicios relacionales de los planes de entrenamiento existentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Planes leídos por lote'
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reconstruye todos los planes, no solo los que no tienen días'
+        )
+
+    def handle(self, *args, **options):
+        plans = TrainingPlan.objects.only('id', 'exercises').order_by('id')
+        if not options['all']:
+            # No se filtra por day_count: en planes antiguos sigue a 0 hasta backfill_plan_stats
+            plans = plans.filter(days__isnull=True)
+
+        last_id = 0
+        synced = 0
+        while True:
+            batch = list(plans.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            for plan in batch:
+                sync_plan_structure(plan)
+            synced += len(batch)
+            last_id = batch[-1].id
+
+        self.stdout.write(f'{synced} planes sincronizados')
@@ -0,0 +1,58 @@
+import json
+from django.core.management.base import BaseCommand
+from benchmarks.runner import run_benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Mide la latencia de los endpoints principales sobre datos sembrados y un OpenAI local'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            nargs='+',
+            type=int,
+            default=[1000],
+            help='Número total de planes sembrados en cada ejecución (p. ej. 1000 100000 1000000)'
+        )
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Latencia en segundos del servidor OpenAI simulado'
+        )
+        parser.add_argument(
+            '--user-plans',
+            type=int,
+            default=200,
+            help='Planes del usuario que hace las peticiones'
+        )
+        parser.add_argument(
+            '--scenarios',
+            nargs='+',
+            default=None,
+            help='Escenarios a ejecutar (por defecto todos)'
+        )
+        parser.add_argument(
+            '--output',
+            default=None,
+            help='Fichero JSON de resultados (por defecto la salida estándar)'
+        )
+
+    def handle(self, *args, **options):
+        results = run_benchmarks(
+            sizes=options['sizes'],
+            iterations=options['iterations'],
+            warmup=options['warmup'],
+            latency=options['latency'],
+            user_plans=options['user_plans'],
+            scenarios=options['scenarios'],
+        )
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+            self.stdout.write(f"Resultados guardados en {options['output']}")
+        else:
+            self.stdout.write(output)
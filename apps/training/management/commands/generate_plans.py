@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from apps.training.models import PlanGenerationJob
+from apps.training.services.batch_generation import generate_plans_for_profiles, group_profiles
+from apps.users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Genera planes de entrenamiento para muchos usuarios, una generación por perfil equivalente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            nargs='+',
+            default=None,
+            help='Usuarios para los que generar el plan (por defecto todos los activos)'
+        )
+        parser.add_argument(
+            '--experience-level',
+            choices=[code for code, _ in UserProfile.EXPERIENCE_LEVELS],
+            help='Solo perfiles con este nivel'
+        )
+        parser.add_argument(
+            '--fitness-goal',
+            choices=[code for code, _ in UserProfile.GOALS],
+            help='Solo perfiles con este objetivo'
+        )
+        parser.add_argument(
+            '--engine',
+            choices=[code for code, _ in PlanGenerationJob.ENGINES],
+            default=None,
+            help='Motor de generación (por defecto el configurado)'
+        )
+        parser.add_argument(
+            '--max-workers',
+            type=int,
+            default=None,
+            help='Generaciones simultáneas'
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=None,
+            help='Generaciones iniciadas por segundo como máximo (0 sin límite)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra cuántas generaciones harían falta sin ejecutarlas'
+        )
+
+    def handle(self, *args, **options):
+        profiles = UserProfile.objects.filter(user__is_active=True).order_by('user_id')
+        if options['username']:
+            profiles = profiles.filter(user__username__in=options['username'])
+        if options['experience_level']:
+            profiles = profiles.filter(experience_level=options['experience_level'])
+        if options['fitness_goal']:
+            profiles = profiles.filter(fitness_goal=options['fitness_goal'])
+
+        if options['dry_run']:
+            groups = group_profiles(profiles)
+            users = sum(len(members) for members in groups.values())
+            self.stdout.write(f'{users} usuarios, {len(groups)} generaciones distintas')
+            return
+
+        result = generate_plans_for_profiles(
+            profiles,
+            engine=options['engine'],
+            max_workers=options['max_workers'],
+            rate=options['rate']
+        )
+        self.stdout.write(
+            f"{result['created']} planes creados con {result['generations']} generaciones"
+        )
+        for failure in result['failed']:
+            self.stderr.write(f"Usuario {failure['user']}: {failure['error']}")
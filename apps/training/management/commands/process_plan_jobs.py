@@ -0,0 +1,36 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.training.services.plan_jobs import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos pendientes de generación de planes de entrenamiento'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Segundos de espera entre sondeos cuando no hay trabajos'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Número máximo de trabajos a procesar por sondeo'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_jobs(limit=options['limit'])
+            if processed:
+                self.stdout.write(f'{processed} trabajos procesados')
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
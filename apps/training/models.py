@@ -2,6 +2,29 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from apps.training.services.plan_stats import STATS_FIELDS, compute_plan_stats
+
+
+def normalize_exercise_name(name) -> str:
+    """Clave del catálogo: sin mayúsculas ni espacios repetidos"""
+    return ' '.join(str(name or '').split()).lower()[:100]
+
+
+class TrainingPlanQuerySet(models.QuerySet):
+    def summary(self):
+        """Planes sin el JSON de ejercicios; sus recuentos están en columnas propias"""
+        return self.defer('exercises')
+
+    def with_exercise(self, name):
+        """Planes que incluyen el ejercicio indicado, resuelto por índice sobre PlanExercise"""
+        # EXISTS en lugar de JOIN + DISTINCT: conserva el orden por índice del listado
+        return self.filter(models.Exists(
+            PlanExercise.objects.filter(
+                plan=models.OuterRef('pk'),
+                exercise__normalized_name=normalize_exercise_name(name)
+            )
+        ))
+
 
 class TrainingPlan(models.Model):
     TRAINING_TYPES = [
@@ -51,10 +74,46 @@ class TrainingPlan(models.Model):
         verbose_name='Plan activo'
     )
 
+    # Estadísticas derivadas de ``exercises``, mantenidas en save()
+    day_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Días'
+    )
+
+    exercise_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Ejercicios'
+    )
+
+    total_sets = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Series totales'
+    )
+
+    estimated_duration = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Duración estimada por sesión (min)'
+    )
+
+    objects = TrainingPlanQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Plan de entrenamiento'
         verbose_name_plural = 'Planes de entrenamiento'
         ordering = ['-created_at']
+        indexes = [
+            # Listado por usuario en el orden de la paginación por cursor
+            models.Index(
+                fields=['user', '-created_at', '-id'],
+                name='training_plan_user_created_idx'
+            ),
+            # Solo los planes activos, que son los que se consultan a diario
+            models.Index(
+                fields=['user', '-created_at'],
+                name='training_plan_user_active_idx',
+                condition=models.Q(is_active=True)
+            ),
+        ]
 
     def __str__(self):
         return f'Plan de {self.get_plan_type_display()} para {self.user.username}'
@@ -65,6 +124,215 @@ class TrainingPlan(models.Model):
         if self.difficulty not in dict(self.DIFFICULTY_LEVELS):
             raise ValidationError('Nivel de dificultad no válido')
 
+    def refresh_stats(self):
+        """Recalcula las estadísticas a partir de ``exercises``, sin guardar"""
+        for field, value in compute_plan_stats(self.exercises).items():
+            setattr(self, field, value)
+
     def save(self, *args, **kwargs):
         self.clean()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'exercises' in update_fields:
+            self.refresh_stats()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | set(STATS_FIELDS)
+        super().save(*args, **kwargs)
+
+class PlanGenerationJob(models.Model):
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+
+    STATUSES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_RUNNING, 'En curso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    ENGINE_AUTO = 'auto'
+    ENGINE_OPENAI = 'openai'
+    ENGINE_RULES = 'rules'
+
+    ENGINES = [
+        (ENGINE_AUTO, 'OpenAI con respaldo por reglas'),
+        (ENGINE_OPENAI, 'OpenAI'),
+        (ENGINE_RULES, 'Reglas locales'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='plan_generation_jobs',
+        verbose_name='Usuario'
+    )
+
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=STATUS_PENDING,
+        db_index=True,
+        verbose_name='Estado'
+    )
+
+    engine = models.CharField(
+        max_length=10,
+        choices=ENGINES,
+        default=ENGINE_AUTO,
+        verbose_name='Motor de generación'
+    )
+
+    plan = models.ForeignKey(
+        TrainingPlan,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='generation_jobs',
+        verbose_name='Plan generado'
+    )
+
+    error = models.TextField(
+        blank=True,
+        verbose_name='Error'
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Fecha de creación'
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de inicio'
+    )
+
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Fecha de finalización'
+    )
+
+    class Meta:
+        verbose_name = 'Generación de plan'
+        verbose_name_plural = 'Generaciones de planes'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Generación {self.pk} de {self.user.username} ({self.get_status_display()})'
+
+
+class Exercise(models.Model):
+    """Catálogo de ejercicios que aparecen en los planes"""
+    name = models.CharField(
+        max_length=100,
+        verbose_name='Nombre'
+    )
+
+    normalized_name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Nombre normalizado'
+    )
+
+    class Meta:
+        verbose_name = 'Ejercicio'
+        verbose_name_plural = 'Ejercicios'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_exercise_name(self.name)
+        super().save(*args, **kwargs)
+
+
+class PlanDay(models.Model):
+    """Día de un plan, en representación relacional de ``TrainingPlan.exercises``"""
+    plan = models.ForeignKey(
+        TrainingPlan,
+        on_delete=models.CASCADE,
+        related_name='days',
+        verbose_name='Plan'
+    )
+
+    position = models.PositiveSmallIntegerField(
+        verbose_name='Posición'
+    )
+
+    name = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Día'
+    )
+
+    class Meta:
+        verbose_name = 'Día del plan'
+        verbose_name_plural = 'Días del plan'
+        ordering = ['plan', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['plan', 'position'], name='training_plan_day_position_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.plan_id})'
+
+
+class PlanExercise(models.Model):
+    """Ejercicio de un día del plan, enlazado al catálogo"""
+    day = models.ForeignKey(
+        PlanDay,
+        on_delete=models.CASCADE,
+        related_name='plan_exercises',
+        verbose_name='Día'
+    )
+
+    # Redundante con day.plan, para buscar planes por ejercicio sin pasar por PlanDay
+    plan = models.ForeignKey(
+        TrainingPlan,
+        on_delete=models.CASCADE,
+        related_name='plan_exercises',
+        verbose_name='Plan'
+    )
+
+    exercise = models.ForeignKey(
+        Exercise,
+        on_delete=models.PROTECT,
+        related_name='plan_exercises',
+        verbose_name='Ejercicio'
+    )
+
+    position = models.PositiveSmallIntegerField(
+        verbose_name='Posición'
+    )
+
+    series = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Series'
+    )
+
+    repetitions = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Repeticiones'
+    )
+
+    rest = models.CharField(
+        max_length=50,
+        blank=True,
+        verbose_name='Descanso'
+    )
+
+    class Meta:
+        verbose_name = 'Ejercicio del plan'
+        verbose_name_plural = 'Ejercicios del plan'
+        ordering = ['day', 'position']
+        indexes = [
+            # Búsqueda de planes por ejercicio y recuentos por ejercicio
+            models.Index(fields=['exercise', 'plan'], name='training_plan_exercise_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.exercise} ({self.day})'
@@ -0,0 +1,95 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+from django.conf import settings
+from django.db import connections, transaction
+from apps.training.models import TrainingPlan
+from apps.training.services import metrics
+from apps.training.services.plan_bulk import bulk_create_plans
+from apps.training.services.plan_cache import make_plan_key
+from apps.training.services.plan_generation import profile_inputs, generate_plan_data, get_default_engine
+from apps.training.services.resilience import RateLimiter
+from apps.users.models import UserProfile
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'TRAINING_PLAN_BATCH', {})
+
+
+def group_profiles(profiles: Iterable[UserProfile]) -> Dict[str, List[UserProfile]]:
+    """
+    Agrupa los perfiles por las entradas del prompt, normalizadas igual que
+    la clave de la caché de planes: cada grupo necesita una sola generación.
+    """
+    groups: Dict[str, List[UserProfile]] = {}
+    for profile in profiles:
+        groups.setdefault(make_plan_key(**profile_inputs(profile)), []).append(profile)
+    return groups
+
+
+def _generate(profile: UserProfile, engine: str, limiter: RateLimiter) -> Dict[str, Any]:
+    try:
+        limiter.acquire()
+        return generate_plan_data(profile, engine)
+    finally:
+        # La caché de planes puede usar la base de datos; cada hilo cierra la suya
+        connections.close_all()
+
+
+def generate_plans_for_profiles(profiles: Iterable[UserProfile], engine: Optional[str] = None,
+                                max_workers: Optional[int] = None,
+                                rate: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Genera un plan para cada perfil con una generación por grupo de perfiles
+    equivalentes.
+
+    Las generaciones distintas se lanzan en un pool de ``max_workers`` hilos,
+    a no más de ``rate`` por segundo, y los planes se insertan con
+    bulk_create al terminar. Un grupo que falla no impide guardar el resto.
+    Devuelve un resumen con los planes creados, las generaciones hechas y
+    los usuarios cuya generación falló.
+    """
+    config = _get_config()
+    engine = engine or get_default_engine()
+    max_workers = max_workers or config.get('MAX_WORKERS', 4)
+    limiter = RateLimiter(rate if rate is not None else config.get('RATE_PER_SECOND', 2))
+
+    groups = group_profiles(profiles)
+    plans = []
+    failed = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plan-batch') as executor:
+        futures = {
+            executor.submit(_generate, members[0], engine, limiter): members
+            for members in groups.values()
+        }
+        for future in as_completed(futures):
+            members = futures[future]
+            try:
+                plan_data = future.result()
+            except Exception as e:
+                logger.warning("Error en la generación de %s perfiles: %s", len(members), e)
+                failed.extend({'user': profile.user_id, 'error': str(e)} for profile in members)
+                continue
+            plans.extend(
+                TrainingPlan(
+                    user_id=profile.user_id,
+                    plan_type='STRENGTH',
+                    difficulty=profile.experience_level,
+                    exercises=plan_data,
+                    is_active=True
+                )
+                for profile in members
+            )
+
+    chunk_size = config.get('CHUNK_SIZE', 500)
+    with transaction.atomic():
+        for start in range(0, len(plans), chunk_size):
+            bulk_create_plans(plans[start:start + chunk_size])
+
+    metrics.increment('plan_batch.generations', len(groups))
+    metrics.increment('plan_batch.plans', len(plans))
+    metrics.increment('plan_batch.failed', len(failed))
+    return {'created': len(plans), 'generations': len(groups), 'failed': failed}
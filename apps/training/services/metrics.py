@@ -0,0 +1,34 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = defaultdict(int)
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Incrementa un contador del proceso"""
+    with _lock:
+        _counters[name] += value
+
+
+def get(name: str) -> int:
+    """Devuelve el valor actual de un contador"""
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot(prefix: str = '') -> Dict[str, int]:
+    """Copia de los contadores cuyo nombre empieza por el prefijo indicado"""
+    with _lock:
+        return {
+            name: value for name, value in _counters.items()
+            if name.startswith(prefix)
+        }
+
+
+def reset() -> None:
+    """Pone a cero todos los contadores (útil en tests)"""
+    with _lock:
+        _counters.clear()
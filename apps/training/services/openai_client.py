@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+_lock = threading.Lock()
+_client: Optional[OpenAI] = None
+# httpx.AsyncClient no puede compartir conexiones entre event loops: un cliente por loop
+_async_clients: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]' = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_config() -> Dict[str, Any]:
+    return getattr(settings, 'OPENAI_CLIENT', {})
+
+
+def _pool_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Límites del pool de conexiones y timeouts para httpx"""
+    return {
+        'limits': httpx.Limits(
+            max_connections=config.get('MAX_CONNECTIONS', 20),
+            max_keepalive_connections=config.get('MAX_KEEPALIVE_CONNECTIONS', 10),
+            keepalive_expiry=config.get('KEEPALIVE_EXPIRY', 30),
+        ),
+        'timeout': _timeout(config),
+    }
+
+
+def _timeout(config: Dict[str, Any]) -> httpx.Timeout:
+    return httpx.Timeout(
+        config.get('READ_TIMEOUT', 60),
+        connect=config.get('CONNECT_TIMEOUT', 5),
+    )
+
+
+def _client_kwargs(config: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'api_key': settings.OPENAI_API_KEY,
+        'base_url': config.get('BASE_URL') or None,
+        'timeout': _timeout(config),
+        # Los reintentos los gestiona resilience.call_with_resilience
+        'max_retries': config.get('MAX_RETRIES', 0),
+    }
+
+
+def get_openai_client() -> OpenAI:
+    """
+    Cliente OpenAI compartido por todo el proceso.
+
+    Se crea en el primer uso y reutiliza el pool de conexiones de httpx
+    (keep-alive incluido), evitando un handshake TLS por petición.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            config = _get_config()
+            _client = OpenAI(
+                http_client=httpx.Client(**_pool_kwargs(config)),
+                **_client_kwargs(config)
+            )
+        return _client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Cliente AsyncOpenAI compartido por las corrutinas del event loop actual"""
+    config = _get_config()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Fuera de un event loop no hay pool que compartir
+        return AsyncOpenAI(**_client_kwargs(config))
+
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(
+                http_client=httpx.AsyncClient(**_pool_kwargs(config)),
+                **_client_kwargs(config)
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def reset_clients() -> None:
+    """Descarta los clientes creados para que el siguiente uso lea de nuevo la configuración"""
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _async_clients.clear()
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(sender, setting, **kwargs):
+    if setting in ('OPENAI_CLIENT', 'OPENAI_API_KEY'):
+        reset_clients()
@@ -1,16 +1,68 @@
 import json
-from typing import Dict, Any
-from openai import OpenAI
+from typing import Dict, Any, Iterator, Optional, Tuple
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from apps.training.services.openai_client import get_openai_client, get_async_openai_client
+from apps.training.services.resilience import (
+    TRANSIENT_ERRORS,
+    CircuitOpenError,
+    DeadlineExceededError,
+    call_with_resilience,
+    acall_with_resilience,
+)
+from apps.training.services import metrics
+from apps.training.services.plan_cache import PlanCache, make_plan_key
+from apps.training.services.plan_prompt import (
+    PROMPT_VERSION,
+    build_plan_messages,
+    completion_budget,
+    count_message_tokens,
+)
+from apps.training.services.stream_parser import PlanDayStreamParser
+from apps.training.validators import PLAN_SCHEMA, salvage_json, validate_plan
+from apps.training.services.single_flight import SingleFlight, AsyncSingleFlight, aprocess_lock, process_lock
 
 
-class OpenAIService:
-    def __init__(self):
+# Coalescen las generaciones simultáneas de perfiles equivalentes en este proceso
+plan_flight = SingleFlight()
+async_plan_flight = AsyncSingleFlight()
+
+# Errores que indican que OpenAI no está disponible ahora mismo
+UNAVAILABLE_ERRORS = TRANSIENT_ERRORS + (CircuitOpenError, DeadlineExceededError)
+
+
+def get_response_format() -> Optional[Dict[str, Any]]:
+    """
+    ``response_format`` de las peticiones según ``OPENAI_RESPONSE['FORMAT']``:
+    ``json_schema`` (salida estructurada con PLAN_SCHEMA, solo en modelos
+    que la admiten), ``json_object`` (modo JSON) o ``text`` (sin forzar).
+    """
+    response_format = getattr(settings, 'OPENAI_RESPONSE', {}).get('FORMAT', 'json_object')
+    if response_format == 'json_schema':
+        return {
+            'type': 'json_schema',
+            'json_schema': {'name': 'plan_entrenamiento', 'schema': PLAN_SCHEMA, 'strict': True},
+        }
+    if response_format == 'json_object':
+        return {'type': 'json_object'}
+    return None
+
+
+class UpstreamUnavailableError(ValidationError):
+    """OpenAI no responde: circuito abierto, plazo agotado o errores transitorios"""
+
+
+class BaseOpenAIService:
+    """Lógica común a los servicios síncrono y asíncrono: prompt, validación y caché"""
+
+    def get_client(self):
+        raise NotImplementedError
+
+    def __init__(self, plan_cache: Optional[PlanCache] = None):
         print(
             f"OpenAI Service initialized with key starting with: {settings.OPENAI_API_KEY[:7]}")
         try:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.client = self.get_client()
             print("DEBUG: OpenAI client initialized successfully")
         except Exception as e:
             print(f"DEBUG: Error initializing OpenAI client: {str(e)}")
@@ -18,126 +70,88 @@ class OpenAIService:
 
         self.model = "gpt-3.5-turbo"
         self.temperature = 0.7
+        self.plan_cache = plan_cache or PlanCache()
 
-    def _create_prompt(self, experience_level: str, fitness_goal: str,
-                       available_days: int, gender: str = 'M',
-                       health_conditions: str = None) -> str:
-        """Crea el prompt para OpenAI"""
-
-        # Configuraciones según el objetivo
-        training_configs = {
-            "STRENGTH": {
-                "reps": "4-8 repeticiones",
-                "rest": "120-180 segundos",
-                "description": "Enfoque en fuerza máxima"
-            },
-            "HYPERTROPHY": {
-                "reps": "8-12 repeticiones",
-                "rest": "60-90 segundos",
-                "description": "Enfoque en crecimiento muscular"
-            },
-            "ENDURANCE": {
-                "reps": "12-20 repeticiones",
-                "rest": "30-45 segundos",
-                "description": "Enfoque en resistencia muscular"
-            },
-            "WEIGHT_LOSS": {
-                "reps": "12-15 repeticiones",
-                "rest": "45-60 segundos",
-                "description": "Enfoque en pérdida de grasa"
-            }
-        }
+    def _cache_key(self, experience_level: str, fitness_goal: str,
+                   available_days: int, gender: str = 'M',
+                   health_conditions: str = None) -> str:
+        """Clave de caché del plan para estas entradas, modelo y versión del prompt"""
+        return make_plan_key(
+            experience_level=experience_level,
+            fitness_goal=fitness_goal,
+            available_days=available_days,
+            gender=gender,
+            health_conditions=health_conditions,
+            model=self.model,
+            temperature=self.temperature,
+            prompt_version=PROMPT_VERSION,
+        )
 
-        config = training_configs.get(fitness_goal, training_configs["STRENGTH"])
-        
-        # Distribuciones óptimas de días
-        day_distributions = {
-            2: ["Lunes", "Jueves"],
-            3: ["Lunes", "Miércoles", "Viernes"],
-            4: ["Lunes", "Martes", "Jueves", "Viernes"],
-            5: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"],
-            6: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"],
-            7: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
-        }
+    def _prepare_request(self, experience_level: str, fitness_goal: str,
+                         available_days: int, gender: str = 'M',
+                         health_conditions: str = None) -> Dict[str, Any]:
+        """
+        Mensajes, ``max_tokens`` y formato de respuesta de la petición, dentro
+        del presupuesto de tokens de ``OPENAI_TOKEN_BUDGET``. Los tokens estimados se suman a
+        las métricas ``openai.prompt_tokens`` y ``openai.max_tokens``.
+        """
+        messages = build_plan_messages(
+            experience_level,
+            fitness_goal,
+            available_days,
+            gender,
+            health_conditions,
+            model=self.model
+        )
+        prompt_tokens = count_message_tokens(messages, self.model)
+        max_tokens = completion_budget(prompt_tokens, available_days)
+        metrics.increment('openai.prompts')
+        metrics.increment('openai.prompt_tokens', prompt_tokens)
+        metrics.increment('openai.max_tokens', max_tokens)
+        request = {'messages': messages, 'max_tokens': max_tokens}
+        response_format = get_response_format()
+        if response_format is not None:
+            request['response_format'] = response_format
+        return request
 
-        suggested_days = day_distributions.get(available_days, [f"Día {i+1}" for i in range(available_days)])
-        days_string = ", ".join(suggested_days)
-
-        base_prompt = f"""Actúa como un entrenador personal profesional experto en crear planes de entrenamiento.
-
-        IMPORTANTE: DEBES DEVOLVER SOLO UN JSON VÁLIDO CON LA SIGUIENTE ESTRUCTURA.
-        NO INCLUYAS NINGÚN TEXTO ADICIONAL, SOLO EL JSON.
-
-        {{
-            "dias": [
-                {{
-                    "dia": "Lunes",
-                    "ejercicios": [
-                        {{
-                            "nombre": "Press de banca",
-                            "series": 4,
-                            "repeticiones": "6-8",
-                            "descanso": "120"
-                        }},
-                        {{
-                            "nombre": "Sentadillas",
-                            "series": 4,
-                            "repeticiones": "6-8",
-                            "descanso": "120"
-                        }}
-                    ]
-                }}
-            ]
-        }}
-
-        INSTRUCCIONES:
-        - Usar estos días exactamente: {days_string}
-        - Objetivo: {config['description']}
-        - Nivel: {experience_level}
-        - Género: {'Masculino' if gender == 'M' else 'Femenino'}
-        - Mínimo 4 ejercicios por día
-        - Series: 3-5 (número entero)
-        - Repeticiones: {config['reps']}
-        - Descansos: {config['rest']}
-        - Ejercicios compuestos: descansos más largos
-        - Ejercicios aislados: descansos más cortos
-        - Adaptar ejercicios y cargas según el género
-        {f'- Considerar: {health_conditions}' if health_conditions else ''}
-
-        RECUERDA: DEVOLVER SOLO EL JSON, SIN NINGÚN TEXTO ADICIONAL"""
-
-        return base_prompt
+    @staticmethod
+    def _record_usage(response) -> None:
+        """Suma los tokens que OpenAI dice haber consumido, si vienen en la respuesta"""
+        usage = getattr(response, 'usage', None)
+        for field in ('prompt_tokens', 'completion_tokens'):
+            value = getattr(usage, field, None)
+            if isinstance(value, int):
+                metrics.increment(f'openai.usage.{field}', value)
 
     def _validate_response(self, response: Dict) -> bool:
         """Valida que la respuesta tenga la estructura correcta"""
+        return validate_plan(response) is None
+
+    def _parse_plan(self, content: str) -> Dict[str, Any]:
+        """Convierte el contenido de la respuesta en un plan validado"""
         try:
-            if not isinstance(response, dict):
-                return False
-            if 'dias' not in response:
-                return False
-            if not isinstance(response['dias'], list):
-                return False
-
-            for dia in response['dias']:
-                if not all(key in dia for key in ['dia', 'ejercicios']):
-                    return False
-                if not isinstance(dia['ejercicios'], list):
-                    return False
-
-                for ejercicio in dia['ejercicios']:
-                    required_keys = ['nombre', 'series',
-                                     'repeticiones', 'descanso']
-                    if not all(key in ejercicio for key in required_keys):
-                        return False
-                    # Validar tipos de datos
-                    if not isinstance(ejercicio['series'], int):
-                        return False
-                    if not all(isinstance(ejercicio[key], str) for key in ['nombre', 'repeticiones', 'descanso']):
-                        return False
-
-            return True
-        except Exception:
-            return False
+            plan = json.loads(content)
+        except json.JSONDecodeError:
+            # Respuesta casi válida (bloque de código, texto alrededor): se
+            # rescata en lugar de tirar la llamada
+            try:
+                plan = salvage_json(content)
+            except ValueError:
+                raise ValidationError(
+                    "La respuesta de OpenAI no es un JSON válido")
+            metrics.increment('openai.salvaged_responses')
+
+        error = validate_plan(plan)
+        if error:
+            raise ValidationError(
+                f"La respuesta de OpenAI no tiene el formato esperado: {error}")
+        return plan
+
+
+class OpenAIService(BaseOpenAIService):
+
+    def get_client(self):
+        return get_openai_client()
 
     def generate_training_plan(
         self,
@@ -147,12 +161,12 @@ class OpenAIService:
         gender: str = 'M',
         health_conditions: str = None
     ) -> Dict[str, Any]:
-        print("DEBUG: Intentando conexión con OpenAI")
-        # Para ver qué endpoint está usando
-        print(f"DEBUG: URL de la API: {self.client.base_url}")
         """
         Genera un plan de entrenamiento personalizado usando OpenAI.
 
+        Los planes se cachean por sus entradas normalizadas, de modo que
+        perfiles equivalentes reutilizan el plan sin llamar a la API.
+
         Args:
             experience_level: Nivel de experiencia (BEG, INT, ADV)
             fitness_goal: Objetivo del entrenamiento
@@ -166,35 +180,208 @@ class OpenAIService:
         Raises:
             ValidationError: Si la respuesta no tiene el formato esperado
         """
-        prompt = self._create_prompt(
+        cache_key = self._cache_key(
             experience_level,
             fitness_goal,
             available_days,
             gender,
             health_conditions
         )
+        cached_plan = self.plan_cache.get(cache_key)
+        if cached_plan is not None:
+            return cached_plan
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "Eres un entrenador personal profesional experto en crear planes de entrenamiento."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
+        inputs = {
+            'experience_level': experience_level,
+            'fitness_goal': fitness_goal,
+            'available_days': available_days,
+            'gender': gender,
+            'health_conditions': health_conditions,
+        }
+        # Las peticiones simultáneas con la misma clave esperan al resultado de la primera
+        return plan_flight.do(cache_key, lambda: self._request_plan(cache_key, inputs))
 
-            plan = json.loads(response.choices[0].message.content)
+    def _request_plan(self, cache_key: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Pide el plan a OpenAI y lo guarda en la caché. Solo lo ejecuta el
+        líder, así que la petición (y sus métricas de tokens) se prepara aquí.
+        """
+        with process_lock(cache_key) as locked:
+            if locked:
+                # Otro proceso puede haber generado el plan mientras esperábamos el bloqueo
+                cached_plan = self.plan_cache.get(cache_key)
+                if cached_plan is not None:
+                    return cached_plan
 
-            if not self._validate_response(plan):
+            request = self._prepare_request(**inputs)
+            print("DEBUG: Intentando conexión con OpenAI")
+            # Para ver qué endpoint está usando
+            print(f"DEBUG: URL de la API: {self.client.base_url}")
+            try:
+                response = call_with_resilience(
+                    lambda timeout: self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=self.temperature,
+                        timeout=timeout,
+                        **request
+                    )
+                )
+                self._record_usage(response)
+                plan = self._parse_plan(response.choices[0].message.content)
+            except ValidationError:
+                raise
+            except UNAVAILABLE_ERRORS as e:
+                raise UpstreamUnavailableError(
+                    f"OpenAI no está disponible: {str(e)}")
+            except Exception as e:
                 raise ValidationError(
-                    "La respuesta de OpenAI no tiene el formato esperado")
+                    f"Error al generar el plan de entrenamiento: {str(e)}")
 
+            self.plan_cache.set(cache_key, plan)
             return plan
 
+    def stream_training_plan(
+        self,
+        experience_level: str,
+        fitness_goal: str,
+        available_days: int,
+        gender: str = 'M',
+        health_conditions: str = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Genera el plan en modo streaming.
+
+        Produce ``('day', dia)`` por cada día en cuanto su JSON se completa y,
+        al final, ``('plan', plan)`` con el plan entero ya validado y cacheado.
+        Si el plan está en caché sus días se emiten de inmediato.
+
+        Raises:
+            ValidationError: Si la respuesta no tiene el formato esperado
+        """
+        cache_key = self._cache_key(
+            experience_level,
+            fitness_goal,
+            available_days,
+            gender,
+            health_conditions
+        )
+        cached_plan = self.plan_cache.get(cache_key)
+        if cached_plan is not None:
+            for day in cached_plan['dias']:
+                yield 'day', day
+            yield 'plan', cached_plan
+            return
+
+        request = self._prepare_request(
+            experience_level,
+            fitness_goal,
+            available_days,
+            gender,
+            health_conditions
+        )
+        parser = PlanDayStreamParser()
+        try:
+            # El plazo y los reintentos cubren el inicio de la respuesta; la
+            # lectura del stream queda limitada por el timeout de lectura del cliente
+            stream = call_with_resilience(
+                lambda timeout: self.client.chat.completions.create(
+                    model=self.model,
+                    temperature=self.temperature,
+                    stream=True,
+                    timeout=timeout,
+                    **request
+                )
+            )
+            for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                for day in parser.feed(chunk.choices[0].delta.content):
+                    yield 'day', day
         except json.JSONDecodeError:
             raise ValidationError(
                 "La respuesta de OpenAI no es un JSON válido")
+        except UNAVAILABLE_ERRORS as e:
+            raise UpstreamUnavailableError(
+                f"OpenAI no está disponible: {str(e)}")
         except Exception as e:
             raise ValidationError(
                 f"Error al generar el plan de entrenamiento: {str(e)}")
+
+        plan = self._parse_plan(parser.text)
+        self.plan_cache.set(cache_key, plan)
+        yield 'plan', plan
+
+
+class AsyncOpenAIService(BaseOpenAIService):
+    """
+    Variante asíncrona del servicio basada en ``AsyncOpenAI``.
+
+    Pensada para vistas async servidas por ASGI: mientras espera a OpenAI
+    no ocupa ningún hilo, así que un único proceso puede mantener muchas
+    generaciones en curso a la vez.
+    """
+
+    def get_client(self):
+        return get_async_openai_client()
+
+    async def generate_training_plan(
+        self,
+        experience_level: str,
+        fitness_goal: str,
+        available_days: int,
+        gender: str = 'M',
+        health_conditions: str = None
+    ) -> Dict[str, Any]:
+        """Equivalente asíncrono de OpenAIService.generate_training_plan"""
+        cache_key = self._cache_key(
+            experience_level,
+            fitness_goal,
+            available_days,
+            gender,
+            health_conditions
+        )
+        cached_plan = await self.plan_cache.aget(cache_key)
+        if cached_plan is not None:
+            return cached_plan
+
+        inputs = {
+            'experience_level': experience_level,
+            'fitness_goal': fitness_goal,
+            'available_days': available_days,
+            'gender': gender,
+            'health_conditions': health_conditions,
+        }
+        return await async_plan_flight.do(cache_key, lambda: self._request_plan(cache_key, inputs))
+
+    async def _request_plan(self, cache_key: str, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Pide el plan a OpenAI y lo guarda en la caché; solo lo ejecuta el líder"""
+        async with aprocess_lock(cache_key) as locked:
+            if locked:
+                # Otro proceso puede haber generado el plan mientras esperábamos el bloqueo
+                cached_plan = await self.plan_cache.aget(cache_key)
+                if cached_plan is not None:
+                    return cached_plan
+
+            request = self._prepare_request(**inputs)
+            try:
+                response = await acall_with_resilience(
+                    lambda timeout: self.client.chat.completions.create(
+                        model=self.model,
+                        temperature=self.temperature,
+                        timeout=timeout,
+                        **request
+                    )
+                )
+                self._record_usage(response)
+                plan = self._parse_plan(response.choices[0].message.content)
+            except ValidationError:
+                raise
+            except UNAVAILABLE_ERRORS as e:
+                raise UpstreamUnavailableError(
+                    f"OpenAI no está disponible: {str(e)}")
+            except Exception as e:
+                raise ValidationError(
+                    f"Error al generar el plan de entrenamiento: {str(e)}")
+
+            await self.plan_cache.aset(cache_key, plan)
+            return plan
@@ -0,0 +1,115 @@
+import json
+from typing import Any, Dict, Iterable, Iterator, List
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from apps.training.models import TrainingPlan
+from apps.training.services import metrics
+from apps.training.services.plan_structure import create_plans_structure
+from apps.users.services.user_service import bump_data_version
+
+
+class BulkImportError(Exception):
+    """La importación tiene líneas no válidas; no se ha guardado ningún plan"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f'{len(errors)} líneas no válidas')
+        self.errors = errors
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'TRAINING_PLAN_BULK', {})
+
+
+def bulk_create_plans(plans: List[TrainingPlan], bump_versions: bool = True) -> int:
+    """
+    Inserta los planes con una sola consulta y crea su estructura relacional.
+
+    bulk_create no pasa por save() ni por las señales, así que aquí se
+    calculan las estadísticas, se crean los días y ejercicios y se invalidan
+    las versiones de datos de los propietarios. Con ``bump_versions=False``
+    la invalidación queda a cargo del llamador, p. ej. una vez por importación.
+    """
+    for plan in plans:
+        plan.refresh_stats()
+    TrainingPlan.objects.bulk_create(plans)
+    create_plans_structure(plans)
+    if bump_versions:
+        bump_data_version(*{plan.user_id for plan in plans})
+    return len(plans)
+
+
+def import_plans(user: User, lines: Iterable[bytes], serializer_class: type) -> int:
+    """
+    Importa planes en formato JSON Lines para el usuario y devuelve cuántos
+    se crearon.
+
+    Cada línea se valida con ``serializer_class`` (el de la vista, para no
+    depender aquí de la capa de API) y los planes se insertan
+    por lotes de ``CHUNK_SIZE`` dentro de una transacción, de modo que la
+    memoria no depende del tamaño del fichero. Si alguna línea no es válida
+    no se guarda nada y se lanza BulkImportError con los errores por línea
+    (hasta ``MAX_ERRORS``).
+    """
+    config = _get_config()
+    chunk_size = config.get('CHUNK_SIZE', 500)
+    max_lines = config.get('MAX_LINES', 10000)
+    max_errors = config.get('MAX_ERRORS', 50)
+
+    errors = []
+    batch = []
+    created = 0
+    with transaction.atomic():
+        for number, line in enumerate(lines, start=1):
+            if number > max_lines:
+                errors.append({'line': number, 'errors': f'Se admiten como máximo {max_lines} líneas'})
+                break
+            if not line.strip():
+                continue
+
+            try:
+                data = json.loads(line)
+            except ValueError:
+                errors.append({'line': number, 'errors': 'JSON no válido'})
+            else:
+                serializer = serializer_class(data=data)
+                if not serializer.is_valid():
+                    errors.append({'line': number, 'errors': serializer.errors})
+                elif not errors:
+                    # Tras el primer error solo se valida, para informar del resto
+                    batch.append(TrainingPlan(user=user, **serializer.validated_data))
+
+            if len(errors) >= max_errors:
+                break
+            if len(batch) >= chunk_size:
+                created += bulk_create_plans(batch, bump_versions=False)
+                batch = []
+
+        if errors:
+            # Sale del bloque atómico con excepción: se deshacen los lotes ya insertados
+            raise BulkImportError(errors)
+        if batch:
+            created += bulk_create_plans(batch, bump_versions=False)
+        if created:
+            # Una sola invalidación por importación, no una por lote
+            bump_data_version(user.pk)
+
+    metrics.increment('plan_bulk.imported', created)
+    return created
+
+
+def export_plans(queryset: QuerySet, serializer: Any) -> Iterator[str]:
+    """
+    Serializa los planes con ``serializer`` como JSON Lines, una línea por plan.
+
+    Lee la base de datos por bloques de ``EXPORT_CHUNK_SIZE`` con
+    ``iterator()``, sin cachear el queryset, para poder generar exportaciones
+    de cualquier tamaño con memoria constante.
+    """
+    chunk_size = _get_config().get('EXPORT_CHUNK_SIZE', 500)
+    exported = 0
+    for plan in queryset.iterator(chunk_size=chunk_size):
+        yield json.dumps(serializer.to_representation(plan), ensure_ascii=False) + '\n'
+        exported += 1
+    metrics.increment('plan_bulk.exported', exported)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from apps.training.services import metrics
+
+
+def _normalize(value: Any) -> Any:
+    """Normaliza un valor de entrada para que perfiles equivalentes compartan clave"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return ' '.join(value.split()).lower()
+    return value
+
+
+def make_plan_key(**inputs: Any) -> str:
+    """
+    Construye la clave de caché a partir de las entradas que determinan el plan.
+
+    Las entradas se normalizan y se serializan de forma canónica antes de
+    calcular el hash, de modo que el orden de los argumentos o los espacios
+    extra no generan claves distintas.
+    """
+    normalized = {name: _normalize(value) for name, value in inputs.items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return 'plan:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class PlanCache:
+    """
+    Caché de planes generados sobre el framework de caché de Django.
+
+    El backend (locmem, fichero, base de datos...) se elige en ``CACHES``;
+    el número máximo de entradas y la política de expulsión (LRU en locmem)
+    los aplica el propio backend. Esta clase añade el TTL, un límite de
+    tamaño por entrada y los contadores de aciertos y fallos.
+    """
+
+    def __init__(self, alias: Optional[str] = None, timeout: Optional[int] = None,
+                 max_entry_bytes: Optional[int] = None, enabled: Optional[bool] = None):
+        config = getattr(settings, 'TRAINING_PLAN_CACHE', {})
+        self.alias = alias or config.get('ALIAS', 'default')
+        self.timeout = timeout if timeout is not None else config.get('TIMEOUT', 60 * 60 * 24)
+        self.max_entry_bytes = (
+            max_entry_bytes if max_entry_bytes is not None
+            else config.get('MAX_ENTRY_BYTES', 64 * 1024)
+        )
+        self.enabled = enabled if enabled is not None else config.get('ENABLED', True)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Devuelve el plan cacheado o None si no existe"""
+        if not self.enabled:
+            return None
+        plan = self.backend.get(key)
+        metrics.increment('plan_cache.hits' if plan is not None else 'plan_cache.misses')
+        return plan
+
+    def set(self, key: str, plan: Dict[str, Any]) -> bool:
+        """Guarda el plan si la caché está activa y no supera el tamaño máximo"""
+        if not self.enabled:
+            return False
+        size = len(json.dumps(plan, separators=(',', ':')).encode('utf-8'))
+        if self.max_entry_bytes and size > self.max_entry_bytes:
+            metrics.increment('plan_cache.rejected')
+            return False
+        self.backend.set(key, plan, self.timeout)
+        metrics.increment('plan_cache.sets')
+        return True
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await sync_to_async(self.get)(key)
+
+    async def aset(self, key: str, plan: Dict[str, Any]) -> bool:
+        return await sync_to_async(self.set)(key, plan)
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores de uso de la caché en este proceso"""
+        return {
+            name.split('.', 1)[1]: value
+            for name, value in metrics.snapshot('plan_cache.').items()
+        }
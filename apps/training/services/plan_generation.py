@@ -0,0 +1,127 @@
+import logging
+from typing import Any, Dict, Iterator, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from apps.training.models import TrainingPlan, PlanGenerationJob
+from apps.users.models import UserProfile
+from apps.training.services import metrics
+from apps.training.services.openai_service import OpenAIService, AsyncOpenAIService
+from apps.training.services.rule_based_generator import RuleBasedPlanGenerator
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_default_engine() -> str:
+    return getattr(settings, 'TRAINING_PLAN_GENERATOR', {}).get(
+        'ENGINE', PlanGenerationJob.ENGINE_AUTO
+    )
+
+
+def profile_inputs(profile: UserProfile) -> Dict[str, Any]:
+    """Entradas del perfil que determinan el plan generado"""
+    return {
+        'experience_level': profile.experience_level,
+        'fitness_goal': profile.fitness_goal,
+        'available_days': profile.available_days,
+        'gender': profile.gender,
+        'health_conditions': profile.health_conditions,
+    }
+
+
+def _fallback(inputs: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    logger.warning("OpenAI no disponible, se usa el generador por reglas: %s", error)
+    metrics.increment('plan_generation.fallbacks')
+    return RuleBasedPlanGenerator().generate_training_plan(**inputs)
+
+
+def generate_plan_data(profile: UserProfile, engine: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Genera los datos del plan con el motor indicado.
+
+    ``openai`` usa siempre OpenAI, ``rules`` el generador local por reglas y
+    ``auto`` usa OpenAI y recurre a las reglas si la llamada falla o agota
+    su timeout.
+    """
+    engine = engine or get_default_engine()
+    inputs = profile_inputs(profile)
+
+    if engine == PlanGenerationJob.ENGINE_RULES:
+        return RuleBasedPlanGenerator().generate_training_plan(**inputs)
+
+    try:
+        return OpenAIService().generate_training_plan(**inputs)
+    except ValidationError as e:
+        if engine != PlanGenerationJob.ENGINE_AUTO:
+            raise
+        return _fallback(inputs, e)
+
+
+async def agenerate_plan_data(profile: UserProfile, engine: Optional[str] = None) -> Dict[str, Any]:
+    """Equivalente asíncrono de generate_plan_data"""
+    engine = engine or get_default_engine()
+    inputs = profile_inputs(profile)
+
+    if engine == PlanGenerationJob.ENGINE_RULES:
+        return RuleBasedPlanGenerator().generate_training_plan(**inputs)
+
+    try:
+        return await AsyncOpenAIService().generate_training_plan(**inputs)
+    except ValidationError as e:
+        if engine != PlanGenerationJob.ENGINE_AUTO:
+            raise
+        return _fallback(inputs, e)
+
+
+def generate_plan_for_user(user: User, engine: Optional[str] = None) -> TrainingPlan:
+    """Genera un plan a partir del perfil del usuario y lo guarda en la base de datos"""
+    profile = user.profile
+    plan_data = generate_plan_data(profile, engine)
+
+    return TrainingPlan.objects.create(
+        user=user,
+        plan_type='STRENGTH',
+        difficulty=profile.experience_level,
+        exercises=plan_data,
+        is_active=True
+    )
+
+
+def stream_plan_for_user(user: User) -> Iterator[Tuple[str, Any]]:
+    """
+    Genera el plan por streaming: produce ``('day', dia)`` según llegan los
+    días y ``('plan', TrainingPlan)`` una vez guardado el plan completo.
+    """
+    profile = user.profile
+
+    events = OpenAIService().stream_training_plan(**profile_inputs(profile))
+    for kind, payload in events:
+        if kind == 'day':
+            yield kind, payload
+        else:
+            yield 'plan', TrainingPlan.objects.create(
+                user=user,
+                plan_type='STRENGTH',
+                difficulty=profile.experience_level,
+                exercises=payload,
+                is_active=True
+            )
+
+
+async def agenerate_plan_for_user(user: User, engine: Optional[str] = None) -> TrainingPlan:
+    """Equivalente asíncrono de generate_plan_for_user, con ORM async"""
+    if User.profile.is_cached(user):
+        # Ya cargado por la autenticación
+        profile = user.profile
+    else:
+        profile = await UserProfile.objects.aget(user=user)
+    plan_data = await agenerate_plan_data(profile, engine)
+
+    return await TrainingPlan.objects.acreate(
+        user=user,
+        plan_type='STRENGTH',
+        difficulty=profile.experience_level,
+        exercises=plan_data,
+        is_active=True
+    )
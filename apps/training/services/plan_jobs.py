@@ -0,0 +1,154 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Iterable, Optional
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from apps.training.models import PlanGenerationJob
+from apps.training.services import metrics
+from apps.training.services.plan_generation import generate_plan_for_user, get_default_engine
+
+
+logger = logging.getLogger(__name__)
+
+MODE_THREAD = 'thread'
+MODE_WORKER = 'worker'
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'TRAINING_PLAN_JOBS', {})
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de hilos del proceso, creado en el primer uso"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_get_config().get('MAX_WORKERS', 4),
+                thread_name_prefix='plan-jobs'
+            )
+        return _executor
+
+
+def enqueue_plan_generation(user: User, engine: Optional[str] = None) -> PlanGenerationJob:
+    """
+    Crea un trabajo de generación para el usuario.
+
+    En modo ``thread`` el trabajo se ejecuta en el pool de hilos del proceso
+    en cuanto se confirma la transacción; en modo ``worker`` queda pendiente
+    hasta que lo recoja ``manage.py process_plan_jobs``. Con el motor por
+    reglas no hay espera externa y el trabajo se resuelve en el momento.
+    """
+    job = PlanGenerationJob.objects.create(user=user, engine=engine or get_default_engine())
+    if job.engine == PlanGenerationJob.ENGINE_RULES:
+        return run_job(job.pk)
+    if _get_config().get('MODE', MODE_THREAD) == MODE_THREAD:
+        _submit_on_commit([job.pk])
+    return job
+
+
+def _submit_on_commit(job_ids: Iterable[int]) -> None:
+    job_ids = list(job_ids)
+    transaction.on_commit(lambda: [get_executor().submit(_run_in_thread, job_id) for job_id in job_ids])
+
+
+def _stale_jobs():
+    """
+    Trabajos abandonados: en curso desde hace más de ``STALE_AFTER`` segundos
+    (el proceso que los ejecutaba murió) y, en modo ``thread``, pendientes
+    desde hace ese tiempo (se encolaron en un pool que ya no existe). En
+    modo ``worker`` un trabajo pendiente solo está esperando al worker.
+    """
+    cutoff = timezone.now() - timedelta(seconds=_get_config().get('STALE_AFTER', 300))
+    stale = Q(status=PlanGenerationJob.STATUS_RUNNING, started_at__lt=cutoff)
+    if _get_config().get('MODE', MODE_THREAD) == MODE_THREAD:
+        stale |= Q(status=PlanGenerationJob.STATUS_PENDING, created_at__lt=cutoff)
+    return PlanGenerationJob.objects.filter(stale)
+
+
+def reclaim_stale_jobs(job_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Devuelve a pendiente los trabajos abandonados (todos o los indicados) y,
+    en modo ``thread``, los vuelve a enviar al pool. Devuelve cuántos se
+    recuperaron. Si dos procesos recuperan el mismo trabajo, _claim_job
+    garantiza que solo uno lo ejecute.
+    """
+    stale = _stale_jobs()
+    if job_ids is not None:
+        stale = stale.filter(pk__in=list(job_ids))
+    reclaimed = list(stale.values_list('pk', flat=True))
+    if not reclaimed:
+        return 0
+
+    # Se vuelve a aplicar el filtro: un trabajo puede haber terminado entretanto
+    _stale_jobs().filter(pk__in=reclaimed).update(
+        status=PlanGenerationJob.STATUS_PENDING, started_at=None
+    )
+    logger.warning("Recuperados %s trabajos de generación abandonados", len(reclaimed))
+    metrics.increment('plan_jobs.reclaimed', len(reclaimed))
+    if _get_config().get('MODE', MODE_THREAD) == MODE_THREAD:
+        _submit_on_commit(reclaimed)
+    return len(reclaimed)
+
+
+def _claim_job(job_id: int) -> bool:
+    """Marca el trabajo como en curso si sigue pendiente; evita ejecuciones dobles"""
+    claimed = PlanGenerationJob.objects.filter(
+        pk=job_id,
+        status=PlanGenerationJob.STATUS_PENDING
+    ).update(status=PlanGenerationJob.STATUS_RUNNING, started_at=timezone.now())
+    return claimed == 1
+
+
+def run_job(job_id: int) -> Optional[PlanGenerationJob]:
+    """Ejecuta un trabajo pendiente y guarda su resultado o su error"""
+    if not _claim_job(job_id):
+        return None
+
+    job = PlanGenerationJob.objects.select_related('user__profile').get(pk=job_id)
+    try:
+        job.plan = generate_plan_for_user(job.user, job.engine)
+        job.status = PlanGenerationJob.STATUS_DONE
+    except Exception as e:
+        logger.exception("Error en la generación del plan %s", job_id)
+        job.status = PlanGenerationJob.STATUS_FAILED
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['plan', 'status', 'error', 'finished_at'])
+    return job
+
+
+def _run_in_thread(job_id: int) -> None:
+    try:
+        run_job(job_id)
+    finally:
+        # Cada hilo del pool abre su propia conexión; se cierra al terminar
+        connections.close_all()
+
+
+def process_pending_jobs(limit: Optional[int] = None) -> int:
+    """
+    Recupera los trabajos abandonados y ejecuta los pendientes por orden de
+    llegada. Devuelve cuántos se procesaron.
+    """
+    reclaim_stale_jobs()
+    pending = PlanGenerationJob.objects.filter(
+        status=PlanGenerationJob.STATUS_PENDING
+    ).order_by('created_at').values_list('pk', flat=True)
+    if limit:
+        pending = pending[:limit]
+
+    processed = 0
+    for job_id in list(pending):
+        if run_job(job_id) is not None:
+            processed += 1
+    return processed
@@ -0,0 +1,165 @@
+import json
+import math
+from string import Template
+from typing import Dict, List, Optional
+from django.conf import settings
+from apps.training.services import metrics
+from apps.training.services.training_config import get_training_config, get_training_days
+
+try:
+    import tiktoken
+except ImportError:
+    # Dependencia opcional: sin ella los tokens se estiman por caracteres
+    tiktoken = None
+
+
+# Versión de la plantilla del prompt; forma parte de la clave de caché,
+# así que debe incrementarse cada vez que cambie PLAN_PROMPT o SYSTEM_MESSAGE
+PROMPT_VERSION = 2
+
+SYSTEM_MESSAGE = "Eres un entrenador personal experto. Respondes solo con JSON válido, sin texto adicional."
+
+# Estimación sin tiktoken; por lo bajo para el español, así el recuento sobra en lugar de faltar
+CHARS_PER_TOKEN = 3
+
+# Tokens de formato de cada mensaje y del inicio de la respuesta en el chat de OpenAI
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+def _compact(text: str) -> str:
+    """Quita la sangría y las líneas vacías: en el prompt solo cuestan tokens"""
+    return '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+# Ejemplo de la estructura en JSON compacto, que además anima a responder sin sangrías
+_EXAMPLE = json.dumps(
+    {"dias": [{"dia": "Lunes", "ejercicios": [
+        {"nombre": "Press de banca", "series": 4, "repeticiones": "6-8", "descanso": "120"}
+    ]}]},
+    ensure_ascii=False,
+    separators=(',', ':')
+)
+
+# Plantilla compilada una sola vez al importar el módulo
+PLAN_PROMPT = Template(_compact(f"""
+    Devuelve solo un JSON con esta estructura:
+    {_EXAMPLE}
+    Instrucciones:
+    - Usar exactamente estos días: $days
+    - Objetivo: $description
+    - Nivel: $level
+    - Género: $gender
+    - Mínimo 4 ejercicios por día
+    - Series: entero entre 3 y 5
+    - Repeticiones: $reps
+    - Descansos: $rest; más largos en ejercicios compuestos, más cortos en aislados
+    - Adaptar ejercicios y cargas según el género
+    $conditions
+"""))
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'OPENAI_TOKEN_BUDGET', {})
+
+
+_encodings: Dict[str, object] = {}
+
+
+def _get_encoding(model: str):
+    if tiktoken is None:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding('cl100k_base')
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens del texto con el tokenizador del modelo, o una estimación sin tiktoken"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """Tokens de entrada de una conversación, con el formato de cada mensaje"""
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(message['content'], model) for message in messages
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Recorta el texto a ``max_tokens`` como mucho"""
+    if max_tokens <= 0:
+        return ''
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+
+def _render(experience_level: str, fitness_goal: str, available_days: int,
+            gender: str, health_conditions: Optional[str]) -> str:
+    config = get_training_config(fitness_goal)
+    return PLAN_PROMPT.substitute(
+        days=', '.join(get_training_days(available_days)),
+        description=config['description'],
+        level=experience_level,
+        gender='Masculino' if gender == 'M' else 'Femenino',
+        reps=config['reps'],
+        rest=config['rest'],
+        conditions=f'- Considerar: {health_conditions}' if health_conditions else '',
+    ).rstrip()
+
+
+def build_plan_messages(experience_level: str, fitness_goal: str, available_days: int,
+                        gender: str = 'M', health_conditions: Optional[str] = None,
+                        model: str = 'gpt-3.5-turbo') -> List[Dict[str, str]]:
+    """
+    Mensajes de la generación de un plan dentro de ``MAX_PROMPT_TOKENS``.
+
+    Las condiciones de salud son la única entrada de texto libre: si el
+    prompt no cabe en el presupuesto se recortan lo necesario.
+    """
+    def messages(conditions):
+        return [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": _render(
+                experience_level, fitness_goal, available_days, gender, conditions
+            )},
+        ]
+
+    max_prompt_tokens = _get_config().get('MAX_PROMPT_TOKENS', 1000)
+    conditions = health_conditions
+    result = messages(conditions)
+    excess = count_message_tokens(result, model) - max_prompt_tokens
+    # Los tokens de un texto recortado no siempre bajan exactamente lo previsto:
+    # se repite hasta que cabe o no quedan condiciones que recortar
+    while excess > 0 and conditions:
+        conditions = truncate_to_tokens(conditions, count_tokens(conditions, model) - excess, model)
+        result = messages(conditions)
+        excess = count_message_tokens(result, model) - max_prompt_tokens
+    if conditions != health_conditions:
+        metrics.increment('openai.prompts_truncated')
+    return result
+
+
+def completion_budget(prompt_tokens: int, available_days: int) -> int:
+    """
+    ``max_tokens`` de la respuesta: lo que ocupa un plan con esos días, sin
+    pasar de ``MAX_COMPLETION_TOKENS`` ni de lo que queda de la ventana de
+    contexto del modelo.
+    """
+    config = _get_config()
+    needed = config.get('COMPLETION_TOKENS_BASE', 50) + (
+        config.get('COMPLETION_TOKENS_PER_DAY', 400) * max(1, available_days)
+    )
+    return max(1, min(
+        needed,
+        config.get('MAX_COMPLETION_TOKENS', 3000),
+        config.get('CONTEXT_WINDOW', 16385) - prompt_tokens,
+    ))
@@ -0,0 +1,76 @@
+import re
+from typing import Any, Dict
+
+
+# Segundos de trabajo estimados por serie, sin contar el descanso
+SECONDS_PER_SET = 45
+# Descanso por defecto cuando el plan no lo indica o no se puede interpretar
+DEFAULT_REST_SECONDS = 90
+
+STATS_FIELDS = ('day_count', 'exercise_count', 'total_sets', 'estimated_duration')
+
+_NUMBER = re.compile(r'\d+(?:[.,]\d+)?')
+
+
+def parse_number(value: Any, default: float = 0) -> float:
+    """
+    Interpreta valores como 4, "4", "3-4" o "90 segundos"; en los rangos
+    usa la media de los extremos.
+    """
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return value
+    numbers = _NUMBER.findall(str(value or ''))[:2]
+    if not numbers:
+        return default
+    values = [float(number.replace(',', '.')) for number in numbers]
+    return sum(values) / len(values)
+
+
+def _rest_seconds(value: Any) -> float:
+    seconds = parse_number(value, DEFAULT_REST_SECONDS)
+    if isinstance(value, str) and 'min' in value.lower():
+        seconds *= 60
+    return max(0.0, seconds)
+
+
+def parse_series(value: Any) -> int:
+    """Número de series de un ejercicio; los valores negativos cuentan como 0"""
+    return max(0, int(round(parse_number(value))))
+
+
+def compute_plan_stats(exercises: Any) -> Dict[str, int]:
+    """
+    Estadísticas de un plan a partir de su JSON de ejercicios.
+
+    ``estimated_duration`` es la duración media de una sesión en minutos:
+    series por (trabajo + descanso) de cada ejercicio, promediada por día.
+    Los datos mal formados se ignoran en lugar de fallar, ya que los planes
+    antiguos y los editados a mano no siempre siguen el formato.
+    """
+    days = exercises.get('dias') if isinstance(exercises, dict) else None
+    if not isinstance(days, list):
+        days = []
+
+    exercise_count = 0
+    total_sets = 0
+    total_seconds = 0.0
+    for day in days:
+        day_exercises = day.get('ejercicios') if isinstance(day, dict) else None
+        if not isinstance(day_exercises, list):
+            continue
+        for exercise in day_exercises:
+            exercise_count += 1
+            if not isinstance(exercise, dict):
+                continue
+            sets = parse_series(exercise.get('series'))
+            total_sets += sets
+            total_seconds += sets * (SECONDS_PER_SET + _rest_seconds(exercise.get('descanso')))
+
+    return {
+        'day_count': len(days),
+        'exercise_count': exercise_count,
+        'total_sets': total_sets,
+        'estimated_duration': int(round(total_seconds / 60 / len(days))) if days else 0,
+    }
@@ -0,0 +1,92 @@
+from typing import Any, Dict, Iterable, List
+from django.db import transaction
+from apps.training.models import Exercise, PlanDay, PlanExercise, TrainingPlan, normalize_exercise_name
+from apps.training.services.plan_stats import parse_series
+
+
+# Tope de PositiveSmallIntegerField; por encima PostgreSQL rechaza la fila
+MAX_STORED_SERIES = 32767
+
+
+def _plan_days(exercises: Any) -> List[Dict[str, Any]]:
+    days = exercises.get('dias') if isinstance(exercises, dict) else None
+    if not isinstance(days, list):
+        return []
+    return [day if isinstance(day, dict) else {} for day in days]
+
+
+def _day_exercises(day: Dict[str, Any]) -> List[Dict[str, Any]]:
+    exercises = day.get('ejercicios')
+    if not isinstance(exercises, list):
+        return []
+    return [exercise for exercise in exercises
+            if isinstance(exercise, dict) and normalize_exercise_name(exercise.get('nombre'))]
+
+
+def get_or_create_exercises(names: Iterable[str]) -> Dict[str, Exercise]:
+    """Ejercicios del catálogo por nombre normalizado, creando los que falten en bloque"""
+    by_key = {}
+    for name in names:
+        by_key.setdefault(normalize_exercise_name(name), ' '.join(str(name).split())[:100])
+
+    catalogue = {
+        exercise.normalized_name: exercise
+        for exercise in Exercise.objects.filter(normalized_name__in=by_key)
+    }
+    missing = [
+        Exercise(name=name, normalized_name=key)
+        for key, name in by_key.items() if key not in catalogue
+    ]
+    if missing:
+        # Otra petición puede crear el mismo ejercicio a la vez: se ignora el
+        # conflicto y se vuelven a leer los que faltaban
+        Exercise.objects.bulk_create(missing, ignore_conflicts=True)
+        catalogue.update({
+            exercise.normalized_name: exercise
+            for exercise in Exercise.objects.filter(
+                normalized_name__in=[exercise.normalized_name for exercise in missing]
+            )
+        })
+    return catalogue
+
+
+@transaction.atomic
+def sync_plan_structure(plan: TrainingPlan) -> None:
+    """
+    Reconstruye los días y ejercicios relacionales del plan a partir de su
+    JSON, que sigue siendo la fuente de verdad. Las entradas sin nombre de
+    ejercicio se ignoran.
+    """
+    PlanDay.objects.filter(plan=plan).delete()
+    create_plans_structure([plan])
+
+
+def create_plans_structure(plans: Iterable[TrainingPlan]) -> None:
+    """
+    Crea los días y ejercicios relacionales de planes que aún no los tienen,
+    con una sola consulta al catálogo y una inserción por tabla para todo el
+    lote. Lo usan sync_plan_structure y la importación masiva.
+    """
+    days = [(plan, position, day) for plan in plans
+            for position, day in enumerate(_plan_days(plan.exercises))]
+    catalogue = get_or_create_exercises(
+        exercise['nombre'] for _, _, day in days for exercise in _day_exercises(day)
+    )
+
+    plan_days = PlanDay.objects.bulk_create([
+        PlanDay(plan=plan, position=position, name=str(day.get('dia') or '')[:50])
+        for plan, position, day in days
+    ])
+    PlanExercise.objects.bulk_create([
+        PlanExercise(
+            day=plan_day,
+            plan=plan_day.plan,
+            exercise=catalogue[normalize_exercise_name(exercise['nombre'])],
+            position=position,
+            series=min(parse_series(exercise.get('series')), MAX_STORED_SERIES),
+            repetitions=str(exercise.get('repeticiones') or '')[:50],
+            rest=str(exercise.get('descanso') or '')[:50],
+        )
+        for plan_day, (_, _, day) in zip(plan_days, days)
+        for position, exercise in enumerate(_day_exercises(day))
+    ])
@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from apps.training.services import metrics
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Errores de OpenAI que se consideran transitorios: se reintentan y cuentan como fallo del circuito
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto y la llamada se rechaza sin intentarla"""
+
+
+class DeadlineExceededError(Exception):
+    """Se agotó el presupuesto de tiempo de la petición"""
+
+
+class Deadline:
+    """Presupuesto de tiempo total de una petición, repartido entre sus intentos"""
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class RetryPolicy:
+    """Reintentos acotados con backoff exponencial y jitter completo"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 4.0,
+                 retry_on: Tuple[Type[BaseException], ...] = TRANSIENT_ERRORS):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def delay(self, attempt: int) -> float:
+        """Espera antes del reintento número ``attempt`` (empezando en 1)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por tasa de fallos sobre una ventana de llamadas.
+
+    Cerrado: deja pasar todo y abre si, con al menos ``min_calls`` en la
+    ventana, la tasa de fallos alcanza ``failure_rate``. Abierto: rechaza
+    todo durante ``open_seconds``. Semiabierto: deja pasar hasta
+    ``half_open_calls`` sondas; un éxito lo cierra y un fallo lo reabre.
+    Cada transición incrementa ``circuit_breaker.<nombre>.<estado>``.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window_size: int = 20, min_calls: int = 5,
+                 failure_rate: float = 0.5, open_seconds: float = 30,
+                 half_open_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=window_size)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(self.HALF_OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.info("Circuito %s: %s -> %s", self.name, self._state, state)
+        self._state = state
+        self._probes = 0
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+        elif state == self.CLOSED:
+            self._window.clear()
+        metrics.increment(f'circuit_breaker.{self.name}.{state}')
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._refresh()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            metrics.increment(f'circuit_breaker.{self.name}.rejected')
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._transition(self.CLOSED)
+            else:
+                self._window.append(True)
+
+    def release(self) -> None:
+        """Libera una sonda semiabierta cuya llamada terminó sin resultado (p. ej. cancelada)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._transition(self.OPEN)
+                return
+            self._window.append(False)
+            failures = self._window.count(False)
+            if (self._state == self.CLOSED and len(self._window) >= self.min_calls
+                    and failures / len(self._window) >= self.failure_rate):
+                self._transition(self.OPEN)
+
+
+class RateLimiter:
+    """
+    Limita el ritmo de llamadas a ``rate`` por segundo entre todos los hilos.
+
+    Reparte las llamadas a intervalos regulares: ``acquire`` reserva el
+    siguiente hueco libre y espera hasta él. Con ``rate`` 0 o negativo no
+    limita.
+    """
+
+    def __init__(self, rate: float, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_at)
+            self._next_at = start + self.interval
+        if start > now:
+            metrics.increment('rate_limiter.waits')
+            self._sleep(start - now)
+
+
+def _get_config() -> Dict[str, Any]:
+    return getattr(settings, 'OPENAI_RESILIENCE', {})
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str = 'openai') -> CircuitBreaker:
+    """Circuit breaker compartido por el proceso para el servicio indicado"""
+    with _breakers_lock:
+        if name not in _breakers:
+            config = _get_config()
+            _breakers[name] = CircuitBreaker(
+                name,
+                window_size=config.get('BREAKER_WINDOW', 20),
+                min_calls=config.get('BREAKER_MIN_CALLS', 5),
+                failure_rate=config.get('BREAKER_FAILURE_RATE', 0.5),
+                open_seconds=config.get('BREAKER_OPEN_SECONDS', 30),
+                half_open_calls=config.get('BREAKER_HALF_OPEN_CALLS', 1),
+            )
+        return _breakers[name]
+
+
+def get_retry_policy() -> RetryPolicy:
+    config = _get_config()
+    return RetryPolicy(
+        max_attempts=config.get('MAX_ATTEMPTS', 3),
+        base_delay=config.get('BACKOFF_BASE', 0.5),
+        max_delay=config.get('BACKOFF_MAX', 4.0),
+    )
+
+
+def new_deadline() -> Deadline:
+    return Deadline(_get_config().get('DEADLINE', 45))
+
+
+@receiver(setting_changed)
+def _reset_on_setting_changed(sender, setting, **kwargs):
+    if setting == 'OPENAI_RESILIENCE':
+        with _breakers_lock:
+            _breakers.clear()
+
+
+def _before_attempt(breaker: CircuitBreaker, deadline: Deadline) -> None:
+    if deadline.expired:
+        metrics.increment('openai.deadline_exceeded')
+        raise DeadlineExceededError("Se agotó el tiempo máximo de la petición")
+    if not breaker.allow_request():
+        raise CircuitOpenError(f"Circuito {breaker.name} abierto")
+
+
+def _after_failure(breaker: CircuitBreaker, policy: RetryPolicy, deadline: Deadline,
+                   attempt: int) -> Optional[float]:
+    """Registra el fallo transitorio y devuelve la espera antes del reintento, o None si no hay"""
+    breaker.record_failure()
+    metrics.increment('openai.transient_errors')
+    if attempt >= policy.max_attempts:
+        return None
+    delay = policy.delay(attempt)
+    if delay >= deadline.remaining():
+        return None
+    metrics.increment('openai.retries')
+    return delay
+
+
+def call_with_resilience(fn: Callable[[float], T], breaker: Optional[CircuitBreaker] = None,
+                         policy: Optional[RetryPolicy] = None,
+                         deadline: Optional[Deadline] = None) -> T:
+    """
+    Ejecuta ``fn(timeout)`` protegida por circuit breaker, reintentos y plazo.
+
+    ``fn`` recibe los segundos que quedan del plazo para usarlos como timeout
+    del intento. Solo los errores transitorios se reintentan y cuentan como
+    fallo; el resto de excepciones se propagan sin contar como éxito ni fallo.
+    """
+    breaker = breaker or get_circuit_breaker()
+    policy = policy or get_retry_policy()
+    deadline = deadline or new_deadline()
+
+    attempt = 0
+    while True:
+        _before_attempt(breaker, deadline)
+        attempt += 1
+        try:
+            result = fn(deadline.remaining())
+        except policy.retry_on:
+            delay = _after_failure(breaker, policy, deadline, attempt)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # Ni éxito ni fallo: solo se libera la sonda si el circuito estaba semiabierto
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def acall_with_resilience(fn: Callable[[float], Awaitable[T]],
+                                breaker: Optional[CircuitBreaker] = None,
+                                policy: Optional[RetryPolicy] = None,
+                                deadline: Optional[Deadline] = None) -> T:
+    """Equivalente asíncrono de call_with_resilience"""
+    breaker = breaker or get_circuit_breaker()
+    policy = policy or get_retry_policy()
+    deadline = deadline or new_deadline()
+
+    attempt = 0
+    while True:
+        _before_attempt(breaker, deadline)
+        attempt += 1
+        try:
+            result = await fn(deadline.remaining())
+        except policy.retry_on:
+            delay = _after_failure(breaker, policy, deadline, attempt)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            continue
+        except BaseException:
+            # Ni éxito ni fallo: solo se libera la sonda si el circuito estaba semiabierto
+            breaker.release()
+            raise
+        breaker.record_success()
+        return result
@@ -0,0 +1,127 @@
+from typing import Any, Dict, List, Tuple
+from apps.training.services.training_config import get_training_config, get_training_days
+
+
+# Catálogo de ejercicios por grupo muscular: (nombre, es_compuesto)
+EXERCISE_CATALOGUE: Dict[str, List[Tuple[str, bool]]] = {
+    'pecho': [
+        ('Press de banca', True),
+        ('Press inclinado con mancuernas', True),
+        ('Fondos en paralelas', True),
+        ('Aperturas con mancuernas', False),
+    ],
+    'espalda': [
+        ('Dominadas', True),
+        ('Remo con barra', True),
+        ('Jalón al pecho', True),
+        ('Remo con mancuerna', False),
+    ],
+    'piernas': [
+        ('Sentadillas', True),
+        ('Peso muerto rumano', True),
+        ('Prensa de piernas', True),
+        ('Zancadas', True),
+        ('Curl femoral', False),
+        ('Extensiones de cuádriceps', False),
+        ('Elevación de gemelos', False),
+    ],
+    'hombros': [
+        ('Press militar', True),
+        ('Elevaciones laterales', False),
+        ('Pájaros con mancuernas', False),
+    ],
+    'brazos': [
+        ('Curl de bíceps con barra', False),
+        ('Extensiones de tríceps en polea', False),
+        ('Curl martillo', False),
+    ],
+    'core': [
+        ('Plancha', False),
+        ('Rueda abdominal', False),
+        ('Elevaciones de piernas colgado', False),
+    ],
+}
+
+# Grupos musculares de cada tipo de sesión, por orden de prioridad
+SESSIONS: Dict[str, List[str]] = {
+    'cuerpo_completo': ['piernas', 'pecho', 'espalda', 'hombros', 'core', 'brazos'],
+    'torso': ['pecho', 'espalda', 'hombros', 'pecho', 'espalda', 'brazos'],
+    'pierna': ['piernas', 'piernas', 'piernas', 'piernas', 'core', 'piernas'],
+    'empuje': ['pecho', 'hombros', 'pecho', 'hombros', 'brazos', 'pecho'],
+    'tiron': ['espalda', 'espalda', 'espalda', 'brazos', 'hombros', 'core'],
+}
+
+# Reparto de sesiones según los días disponibles
+SPLITS: Dict[int, List[str]] = {
+    1: ['cuerpo_completo'],
+    2: ['cuerpo_completo', 'cuerpo_completo'],
+    3: ['empuje', 'tiron', 'pierna'],
+    4: ['torso', 'pierna', 'torso', 'pierna'],
+    5: ['empuje', 'tiron', 'pierna', 'torso', 'pierna'],
+    6: ['empuje', 'tiron', 'pierna', 'empuje', 'tiron', 'pierna'],
+    7: ['empuje', 'tiron', 'pierna', 'empuje', 'tiron', 'pierna', 'cuerpo_completo'],
+}
+
+# Series y ejercicios por día según el nivel
+LEVEL_VOLUME = {
+    'BEG': {'series': 3, 'exercises': 4},
+    'INT': {'series': 4, 'exercises': 5},
+    'ADV': {'series': 5, 'exercises': 6},
+}
+
+
+def _parse_range(text: str) -> Tuple[str, str]:
+    """Extrae los extremos de un rango como '120-180 segundos'"""
+    numbers = text.split()[0].split('-')
+    return numbers[0], numbers[-1]
+
+
+class RuleBasedPlanGenerator:
+    """
+    Generador local y determinista de planes de entrenamiento.
+
+    Usa las mismas configuraciones por objetivo y distribuciones de días que
+    el prompt de OpenAI y produce la misma estructura, sin llamadas externas.
+    No interpreta condiciones de salud ni adapta ejercicios al género: para
+    eso sigue siendo necesario OpenAI.
+    """
+
+    def generate_training_plan(
+        self,
+        experience_level: str,
+        fitness_goal: str,
+        available_days: int,
+        gender: str = 'M',
+        health_conditions: str = None
+    ) -> Dict[str, Any]:
+        config = get_training_config(fitness_goal)
+        volume = LEVEL_VOLUME.get(experience_level, LEVEL_VOLUME['BEG'])
+        reps_low, reps_high = _parse_range(config['reps'])
+        rest_low, rest_high = _parse_range(config['rest'])
+        split = SPLITS.get(available_days, SPLITS[7])
+
+        # Las sesiones repetidas en la semana rotan los ejercicios para variar
+        session_count: Dict[str, int] = {}
+        days = []
+        for index, day_name in enumerate(get_training_days(available_days)):
+            session = split[index % len(split)]
+            rotation = session_count.get(session, 0)
+            session_count[session] = rotation + 1
+
+            exercises = []
+            group_usage: Dict[str, int] = {}
+            for group in SESSIONS[session][:volume['exercises']]:
+                catalogue = EXERCISE_CATALOGUE[group]
+                position = group_usage.get(group, 0)
+                group_usage[group] = position + 1
+                name, compound = catalogue[(position + rotation) % len(catalogue)]
+                exercises.append({
+                    "nombre": name,
+                    "series": volume['series'] if compound else max(3, volume['series'] - 1),
+                    "repeticiones": f"{reps_low}-{reps_high}",
+                    # Compuestos: descansos más largos; aislados: más cortos
+                    "descanso": rest_high if compound else rest_low
+                })
+            days.append({"dia": day_name, "ejercicios": exercises})
+
+        return {"dias": days}
@@ -0,0 +1,179 @@
+import asyncio
+import copy
+import hashlib
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator
+from django.conf import settings
+from apps.training.services import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución.
+
+    El primer hilo que llega con una clave (el líder) ejecuta la función; los
+    que llegan mientras tanto esperan y reciben el mismo resultado o la misma
+    excepción.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.increment('single_flight.followers')
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        metrics.increment('single_flight.leaders')
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """
+    Versión para corrutinas de SingleFlight; agrupa las llamadas de un mismo event loop.
+
+    Si se cancela el líder, los seguidores no heredan la cancelación: vuelven a
+    intentarlo y el primero en hacerlo pasa a ser el nuevo líder.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        while True:
+            future = self._calls.get(key)
+            if future is None or future.get_loop() is not loop:
+                break
+            metrics.increment('single_flight.followers')
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                # Solo se reintenta si el cancelado fue el líder, no este seguidor
+                if not future.cancelled():
+                    raise
+
+        metrics.increment('single_flight.leaders')
+        future = loop.create_future()
+        self._calls[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita el aviso de excepción no recuperada si no hay seguidores
+            future.exception()
+            raise
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+def _open_lock_file(key: str):
+    """Fichero de bloqueo de la clave y su plazo, o (None, 0) si no hay bloqueo entre procesos"""
+    config = getattr(settings, 'TRAINING_PLAN_SINGLE_FLIGHT', {})
+    lock_dir = config.get('LOCK_DIR')
+    if not lock_dir or fcntl is None:
+        return None, 0
+    os.makedirs(lock_dir, exist_ok=True)
+    filename = hashlib.sha256(key.encode('utf-8')).hexdigest() + '.lock'
+    return open(os.path.join(lock_dir, filename), 'a'), config.get('LOCK_TIMEOUT', 120)
+
+
+def _try_lock(lock_file) -> bool:
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+@contextmanager
+def process_lock(key: str) -> Iterator[bool]:
+    """
+    Bloqueo entre procesos basado en ficheros para una clave.
+
+    Solo actúa si ``TRAINING_PLAN_SINGLE_FLIGHT['LOCK_DIR']`` está configurado
+    y la plataforma dispone de ``fcntl``. Devuelve True si se obtuvo el
+    bloqueo; si vence ``LOCK_TIMEOUT`` se continúa sin él.
+    """
+    lock_file, timeout = _open_lock_file(key)
+    if lock_file is None:
+        yield False
+        return
+
+    deadline = time.monotonic() + timeout
+    with lock_file:
+        locked = _try_lock(lock_file)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(0.05)
+            locked = _try_lock(lock_file)
+        if not locked:
+            metrics.increment('single_flight.lock_timeouts')
+        try:
+            yield locked
+        finally:
+            if locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@asynccontextmanager
+async def aprocess_lock(key: str) -> AsyncIterator[bool]:
+    """Versión asíncrona de process_lock: espera el bloqueo sin ocupar el event loop"""
+    lock_file, timeout = _open_lock_file(key)
+    if lock_file is None:
+        yield False
+        return
+
+    deadline = time.monotonic() + timeout
+    with lock_file:
+        locked = _try_lock(lock_file)
+        while not locked and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            locked = _try_lock(lock_file)
+        if not locked:
+            metrics.increment('single_flight.lock_timeouts')
+        try:
+            yield locked
+        finally:
+            if locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
@@ -0,0 +1,70 @@
+import json
+import re
+from typing import Any, Dict, List
+
+
+_DIAS_ARRAY = re.compile(r'"dias"\s*:\s*\[')
+
+
+class PlanDayStreamParser:
+    """
+    Parser JSON incremental para planes que llegan por streaming.
+
+    Recibe el texto por fragmentos y devuelve cada elemento de la lista
+    ``dias`` en cuanto su objeto JSON queda cerrado, sin esperar al resto
+    de la respuesta. El texto completo queda disponible en ``text`` para
+    validar el plan al final.
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._day_start = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Añade un fragmento y devuelve los días que se han completado con él"""
+        self.text += chunk
+        if self._finished:
+            return []
+
+        if not self._in_array:
+            match = _DIAS_ARRAY.search(self.text)
+            if not match:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        days = []
+        text = self.text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0:
+                    self._day_start = index
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0:
+                    # Cierre de la propia lista "dias"
+                    self._finished = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    days.append(json.loads(text[self._day_start:index + 1]))
+                    self._day_start = None
+
+        self._pos = len(text)
+        return days
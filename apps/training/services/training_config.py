@@ -0,0 +1,46 @@
+from typing import Dict, List
+
+
+# Configuraciones según el objetivo
+TRAINING_CONFIGS = {
+    "STRENGTH": {
+        "reps": "4-8 repeticiones",
+        "rest": "120-180 segundos",
+        "description": "Enfoque en fuerza máxima"
+    },
+    "HYPERTROPHY": {
+        "reps": "8-12 repeticiones",
+        "rest": "60-90 segundos",
+        "description": "Enfoque en crecimiento muscular"
+    },
+    "ENDURANCE": {
+        "reps": "12-20 repeticiones",
+        "rest": "30-45 segundos",
+        "description": "Enfoque en resistencia muscular"
+    },
+    "WEIGHT_LOSS": {
+        "reps": "12-15 repeticiones",
+        "rest": "45-60 segundos",
+        "description": "Enfoque en pérdida de grasa"
+    }
+}
+
+# Distribuciones óptimas de días
+DAY_DISTRIBUTIONS = {
+    2: ["Lunes", "Jueves"],
+    3: ["Lunes", "Miércoles", "Viernes"],
+    4: ["Lunes", "Martes", "Jueves", "Viernes"],
+    5: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes"],
+    6: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"],
+    7: ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+}
+
+
+def get_training_config(fitness_goal: str) -> Dict[str, str]:
+    """Configuración de repeticiones y descansos para el objetivo (fuerza por defecto)"""
+    return TRAINING_CONFIGS.get(fitness_goal, TRAINING_CONFIGS["STRENGTH"])
+
+
+def get_training_days(available_days: int) -> List[str]:
+    """Días de entrenamiento sugeridos para el número de días disponibles"""
+    return DAY_DISTRIBUTIONS.get(available_days, [f"Día {i+1}" for i in range(available_days)])
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.training.models import TrainingPlan
+from apps.training.services.plan_structure import sync_plan_structure
+from apps.users.services.user_service import bump_data_version
+
+
+@receiver(post_save, sender=TrainingPlan)
+def sync_training_plan_structure(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Mantiene PlanDay/PlanExercise al día cada vez que se guarda el JSON del plan"""
+    # Al cargar fixtures los días vienen en el propio fixture
+    if raw:
+        return
+    if update_fields is None or 'exercises' in update_fields:
+        sync_plan_structure(instance)
+
+
+@receiver(post_save, sender=TrainingPlan)
+@receiver(post_delete, sender=TrainingPlan)
+def bump_plan_owner_version(sender, instance, **kwargs):
+    """Invalida los ETag de los planes y el perfil del propietario"""
+    if not kwargs.get('raw'):
+        bump_data_version(instance.user_id)
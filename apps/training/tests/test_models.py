@@ -1,7 +1,10 @@
 import pytest
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from apps.training.models import TrainingPlan
+from django.core.management import call_command
+from io import StringIO
+from django.db.models import Count
+from apps.training.models import TrainingPlan, Exercise, PlanDay, PlanExercise
 
 
 @pytest.mark.django_db
@@ -115,5 +118,139 @@ class TestTrainingPlan:
         plans = TrainingPlan.objects.all()
         # Verificamos que las fechas estén en orden descendente
         assert plans[0].created_at >= plans[1].created_at
+
+    def test_stats_maintained_on_save(self):
+        """Test que save() mantiene las estadísticas derivadas de los ejercicios"""
+        plan = TrainingPlan.objects.create(
+            user=self.user,
+            plan_type='STRENGTH',
+            difficulty='BEG',
+            exercises=self.example_exercises
+        )
+        assert (plan.day_count, plan.exercise_count, plan.total_sets) == (1, 1, 3)
+        # 3 series x (45 s de trabajo + 90 s de descanso) = 6,75 minutos
+        assert plan.estimated_duration == 7
+
+        plan.exercises = {"dias": []}
+        plan.save(update_fields=['exercises'])
+        plan.refresh_from_db()
+        assert (plan.day_count, plan.exercise_count, plan.total_sets) == (0, 0, 0)
+
+    def test_backfill_plan_stats(self):
+        """Test que el comando rellena por lotes las estadísticas de planes existentes"""
+        for _ in range(3):
+            TrainingPlan.objects.create(
+                user=self.user,
+                plan_type='STRENGTH',
+                difficulty='BEG',
+                exercises=self.example_exercises
+            )
+        # Simula filas anteriores a las columnas: update() no pasa por save()
+        TrainingPlan.objects.update(day_count=0, exercise_count=0, total_sets=0, estimated_duration=0)
+
+        out = StringIO()
+        call_command('backfill_plan_stats', batch_size=2, stdout=out)
+
+        assert '3 planes actualizados' in out.getvalue()
+        assert set(TrainingPlan.objects.values_list('day_count', 'total_sets')) == {(1, 3)}
+
+
+@pytest.mark.django_db
+class TestPlanStructure:
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass1234'
+        )
+        self.exercises = {
+            "dias": [
+                {"dia": "Lunes", "ejercicios": [
+                    {"nombre": "Sentadillas", "series": 4, "repeticiones": "6-8", "descanso": "120"},
+                    {"nombre": "Press de banca", "series": "3", "repeticiones": "8-10", "descanso": "90"}
+                ]},
+                {"dia": "Jueves", "ejercicios": [
+                    {"nombre": "  sentadillas ", "series": 3, "repeticiones": "10", "descanso": "90"}
+                ]}
+            ]
+        }
+
+    def create_plan(self, exercises=None):
+        return TrainingPlan.objects.create(
+            user=self.user,
+            plan_type='STRENGTH',
+            difficulty='BEG',
+            exercises=exercises or self.exercises
+        )
+
+    def test_structure_created_from_json(self):
+        """Test que al guardar el plan se crean sus días y ejercicios relacionales"""
+        plan = self.create_plan()
+
+        assert list(plan.days.values_list('position', 'name')) == [(0, 'Lunes'), (1, 'Jueves')]
+        assert plan.plan_exercises.count() == 3
+        # Las variantes del mismo nombre comparten entrada en el catálogo
+        assert Exercise.objects.count() == 2
+        squat = PlanExercise.objects.filter(day__position=0, position=0).get()
+        assert (squat.exercise.name, squat.series, squat.repetitions) == ('Sentadillas', 4, '6-8')
+
+    def test_structure_follows_json_changes(self):
+        """Test que editar el JSON reconstruye la representación relacional"""
+        plan = self.create_plan()
+        plan.exercises = {"dias": [{"dia": "Martes", "ejercicios": [{"nombre": "Dominadas", "series": 3}]}]}
+        plan.save()
+
+        assert list(plan.days.values_list('name', flat=True)) == ['Martes']
+        assert list(plan.plan_exercises.values_list('exercise__name', flat=True)) == ['Dominadas']
+
+        plan.is_active = False
+        plan.save(update_fields=['is_active'])
+        assert plan.plan_exercises.count() == 1
+
+    def test_out_of_range_series_are_clamped(self):
+        """Test que las series fuera del rango de la columna se ajustan en lugar de fallar"""
+        plan = self.create_plan({"dias": [{"dia": "Lunes", "ejercicios": [
+            {"nombre": "Sentadillas", "series": -4},
+            {"nombre": "Dominadas", "series": 100000},
+        ]}]})
+
+        assert list(plan.plan_exercises.order_by('position').values_list('series', flat=True)) == [0, 32767]
+        assert plan.total_sets == 100000
+
+    def test_search_and_aggregate_by_exercise(self):
+        """Test de búsqueda de planes por ejercicio y recuento en SQL"""
+        with_squats = self.create_plan()
+        self.create_plan({"dias": [{"dia": "Lunes", "ejercicios": [{"nombre": "Dominadas"}]}]})
+
+        assert list(TrainingPlan.objects.with_exercise('SENTADILLAS')) == [with_squats]
+        counts = dict(
+            Exercise.objects.annotate(plans=Count('plan_exercises__plan', distinct=True))
+            .values_list('name', 'plans')
+        )
+        assert counts == {'Sentadillas': 1, 'Press de banca': 1, 'Dominadas': 1}
+
+    def test_backfill_plan_structure(self):
+        """Test que el comando genera la estructura de planes que no la tienen"""
+        plan = self.create_plan()
+        PlanDay.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_plan_structure', stdout=out)
+
+        assert '1 planes sincronizados' in out.getvalue()
+        assert plan.plan_exercises.count() == 3
+
+    def test_backfill_plan_structure_legacy_plan(self):
+        """Test que el comando sincroniza planes anteriores a las estadísticas (day_count a 0)"""
+        plan = self.create_plan()
+        PlanDay.objects.all().delete()
+        TrainingPlan.objects.update(day_count=0, exercise_count=0, total_sets=0, estimated_duration=0)
+
+        out = StringIO()
+        call_command('backfill_plan_structure', stdout=out)
+
+        assert '1 planes sincronizados' in out.getvalue()
+        assert list(plan.days.values_list('name', flat=True)) == ['Lunes', 'Jueves']
+        assert plan.plan_exercises.count() == 3
         
         # pytest apps/training/tests/test_models.py -v
\ No newline at end of file
@@ -0,0 +1,249 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.training.models import TrainingPlan, PlanGenerationJob
+from apps.training.api.pagination import TrainingPlanCursorPagination
+
+
+EXERCISES = {
+    "dias": [
+        {
+            "dia": "Lunes",
+            "ejercicios": [
+                {
+                    "nombre": "Sentadillas",
+                    "series": 4,
+                    "repeticiones": "6-8",
+                    "descanso": "120"
+                }
+            ]
+        }
+    ]
+}
+
+
+def count_queries(request):
+    """Número de consultas SQL que ejecuta la petición"""
+    with CaptureQueriesContext(connection) as context:
+        response = request()
+    assert response.status_code == 200
+    return len(context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestQueryCounts:
+    """Las consultas por petición no deben crecer con el número de resultados"""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def create_plans(self, count, user=None):
+        for _ in range(count):
+            TrainingPlan.objects.create(
+                user=user or self.user,
+                plan_type='STRENGTH',
+                difficulty='BEG',
+                exercises=EXERCISES
+            )
+
+    @pytest.fixture(autouse=True)
+    def without_response_cache(self, settings):
+        """Se mide el camino que llega a la base de datos, no la caché de respuestas"""
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': False}
+
+    def assert_constant_queries(self, request, create):
+        create(1)
+        # La primera petición rellena cachés del proceso (p. ej. la versión de los tokens)
+        count_queries(request)
+        small = count_queries(request)
+        create(10)
+        large = count_queries(request)
+        assert small == large, f'{small} consultas con 1 resultado, {large} con 11'
+
+    def test_plan_list(self):
+        """Test que el listado de planes hace un número fijo de consultas"""
+        self.assert_constant_queries(
+            lambda: self.client.get(reverse('training-plan-list')),
+            self.create_plans
+        )
+
+    def test_plan_detail(self):
+        """Test que el detalle de un plan hace un número fijo de consultas"""
+        self.create_plans(1)
+        plan = TrainingPlan.objects.get()
+        url = reverse('training-plan-detail', kwargs={'pk': plan.pk})
+        # Usuario del token, versión de sus datos (ETag) y plan con su usuario
+        assert count_queries(lambda: self.client.get(url)) <= 3
+
+    def test_plan_patch_without_exercises(self):
+        """Test que un PATCH sin exercises no reconstruye los días y ejercicios del plan"""
+        self.create_plans(1)
+        plan = TrainingPlan.objects.get()
+        day_ids = list(plan.days.values_list('id', flat=True))
+        url = reverse('training-plan-detail', kwargs={'pk': plan.pk})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(url, {'is_active': False}, format='json')
+        assert response.status_code == 200
+        assert not any('training_planday' in query['sql'] for query in context.captured_queries)
+        assert list(plan.days.values_list('id', flat=True)) == day_ids
+
+    def test_admin_plan_changelist(self):
+        """Test que el listado del admin no consulta el usuario de cada plan"""
+        admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        client = APIClient()
+        client.force_login(admin)
+        url = reverse('admin:training_trainingplan_changelist')
+
+        self.assert_constant_queries(lambda: client.get(url), self.create_plans)
+
+    def test_admin_job_changelist(self):
+        """Test que el listado de generaciones del admin no crece con los resultados"""
+        admin = User.objects.create_superuser(username='admin', password='adminpass123')
+        client = APIClient()
+        client.force_login(admin)
+        url = reverse('admin:training_plangenerationjob_changelist')
+
+        def create_jobs(count):
+            # Con plan: su columna muestra el nombre del propietario del plan
+            for _ in range(count):
+                plan = TrainingPlan.objects.create(
+                    user=self.user, plan_type='STRENGTH', difficulty='BEG', exercises=EXERCISES
+                )
+                PlanGenerationJob.objects.create(
+                    user=self.user, plan=plan, status=PlanGenerationJob.STATUS_DONE
+                )
+
+        self.assert_constant_queries(lambda: client.get(url), create_jobs)
+
+
+def explain(queryset):
+    """Plan de ejecución de la consulta en el motor de la base de datos de tests"""
+    if connection.vendor != 'postgresql':
+        return queryset.explain()
+    # Con tablas casi vacías PostgreSQL prefiere un seq scan; se desactiva
+    # para comprobar que existe un índice utilizable
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+@pytest.mark.django_db
+class TestPlanIndexes:
+    """Las consultas por usuario deben resolverse con índices, sin ordenar en memoria"""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.plans = TrainingPlan.objects.filter(user=self.user).select_related('user')
+
+    def assert_uses_index(self, queryset, index_name):
+        plan = explain(queryset)
+        assert index_name in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+        assert 'Sort' not in plan, plan
+
+    def test_list_uses_user_created_index(self):
+        """Test que el listado paginado usa el índice (user, -created_at, -id)"""
+        page = self.plans.order_by(*TrainingPlanCursorPagination.ordering)[:21]
+        self.assert_uses_index(page, 'training_plan_user_created_idx')
+
+    def test_active_plans_use_partial_index(self):
+        """Test que los planes activos usan el índice parcial"""
+        active = self.plans.filter(is_active=True).order_by('-created_at')[:21]
+        self.assert_uses_index(active, 'training_plan_user_active_idx')
+
+    def test_exercise_search_uses_exercise_index(self):
+        """Test que la búsqueda de planes por ejercicio usa el índice de PlanExercise"""
+        plan = explain(TrainingPlan.objects.with_exercise('Sentadillas'))
+        assert 'training_plan_exercise_idx' in plan, plan
+
+    def test_detail_uses_primary_key(self):
+        """Test que el detalle busca por clave primaria"""
+        plan = explain(self.plans.filter(pk=1).order_by())
+        if connection.vendor == 'postgresql':
+            assert 'training_trainingplan_pkey' in plan, plan
+        else:
+            assert 'training_trainingplan USING INTEGER PRIMARY KEY' in plan, plan
+
+
+FILTERS = {
+    'plan_type': 'STRENGTH',
+    'difficulty': 'BEG',
+    'is_active': 'true',
+    'created_after': '2024-01-01',
+    'created_before': '2030-12-31',
+    'exercise': 'Sentadillas',
+}
+
+
+def explain_sql(sql):
+    """Plan de ejecución de una consulta ya capturada, con los parámetros interpolados"""
+    prefix = 'EXPLAIN ' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN '
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(prefix + sql)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+@pytest.mark.django_db
+class TestPlanFilterIndexes:
+    """Cada combinación de filtros y orden del listado debe resolverse con índices"""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def list_query_plan(self, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('training-plan-list'), params)
+        assert response.status_code == 200, response.data
+        sql = next(q['sql'] for q in context.captured_queries
+                   if q['sql'].startswith('SELECT') and 'FROM "training_trainingplan"' in q['sql'])
+        return explain_sql(sql)
+
+    @pytest.mark.parametrize('ordering', ['', 'created_at'])
+    @pytest.mark.parametrize('filters', [
+        (),
+        *((name,) for name in FILTERS),
+        ('plan_type', 'difficulty'),
+        ('is_active', 'created_after', 'created_before'),
+        ('plan_type', 'is_active', 'exercise'),
+        tuple(FILTERS),
+    ], ids=lambda filters: '+'.join(filters) or 'none')
+    def test_filter_combinations_use_indexes(self, filters, ordering):
+        """Test que cada combinación de filtros y orden del listado se resuelve por índice, sin ordenar aparte"""
+        params = {name: FILTERS[name] for name in filters}
+        if ordering:
+            params['ordering'] = ordering
+        plan = self.list_query_plan(params)
+
+        assert 'training_plan_user_' in plan, plan
+        assert 'SCAN training_trainingplan' not in plan, plan
+        assert 'TEMP B-TREE' not in plan, plan
+        assert 'Seq Scan' not in plan and 'Sort' not in plan, plan
+        if 'exercise' in filters:
+            assert 'training_plan_exercise_idx' in plan, plan
+
+
+# pytest apps/training/tests/test_queries.py -v
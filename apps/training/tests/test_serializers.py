@@ -66,6 +66,35 @@ class TestTrainingPlanSerializer:
         assert not serializer.is_valid()
         assert 'exercises' in serializer.errors
 
+    def test_invalid_nested_exercise(self):
+        """Test que los ejercicios se validan con el mismo formato que las respuestas de OpenAI"""
+        exercises = {"dias": [{"dia": "Lunes", "ejercicios": [
+            {"nombre": "Press de banca", "series": "3", "repeticiones": "12-15", "descanso": "90"}
+        ]}]}
+        serializer = TrainingPlanSerializer(data={
+            'plan_type': 'STRENGTH',
+            'difficulty': 'BEG',
+            'exercises': exercises,
+            'is_active': True
+        })
+        assert not serializer.is_valid()
+        assert 'dias[0].ejercicios[0].series debe ser un entero' in str(serializer.errors['exercises'][0])
+
+    @pytest.mark.parametrize('series', [-4, 0, 100000])
+    def test_out_of_range_series(self, series):
+        """Test que se rechazan las series negativas o desmesuradas"""
+        exercises = {"dias": [{"dia": "Lunes", "ejercicios": [
+            {"nombre": "Press de banca", "series": series, "repeticiones": "12-15", "descanso": "90"}
+        ]}]}
+        serializer = TrainingPlanSerializer(data={
+            'plan_type': 'STRENGTH',
+            'difficulty': 'BEG',
+            'exercises': exercises,
+            'is_active': True
+        })
+        assert not serializer.is_valid()
+        assert 'dias[0].ejercicios[0].series debe estar entre 1 y 20' in str(serializer.errors['exercises'][0])
+
     def test_invalid_plan_type(self):
         """Test que valida el tipo de plan"""
         invalid_data = {
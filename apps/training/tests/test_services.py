@@ -0,0 +1,882 @@
+import asyncio
+import json
+import threading
+import time
+import httpx
+import openai
+import pytest
+from io import StringIO
+from unittest.mock import AsyncMock, MagicMock, patch
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from apps.training.models import PlanDay, TrainingPlan
+from apps.users.models import UserProfile
+from apps.training.services import metrics
+from apps.training.services.openai_client import get_openai_client, get_async_openai_client
+from apps.training.services.openai_service import OpenAIService, AsyncOpenAIService, UpstreamUnavailableError
+from apps.training.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Deadline,
+    DeadlineExceededError,
+    RateLimiter,
+    RetryPolicy,
+    call_with_resilience,
+)
+from apps.training.services.plan_cache import PlanCache, make_plan_key
+from apps.training.services import plan_prompt
+from apps.training.services.plan_prompt import build_plan_messages, completion_budget, count_message_tokens
+from apps.training.validators import PLAN_SCHEMA, salvage_json, validate_plan
+from apps.training.services.plan_stats import compute_plan_stats
+from apps.training.services.rule_based_generator import RuleBasedPlanGenerator
+from apps.training.services.stream_parser import PlanDayStreamParser
+from apps.training.services.single_flight import SingleFlight, AsyncSingleFlight, aprocess_lock, process_lock
+from apps.training.services.batch_generation import generate_plans_for_profiles, group_profiles
+
+
+VALID_PLAN = {
+    "dias": [
+        {
+            "dia": "Lunes",
+            "ejercicios": [
+                {
+                    "nombre": "Press de banca",
+                    "series": 4,
+                    "repeticiones": "6-8",
+                    "descanso": "120"
+                }
+            ]
+        }
+    ]
+}
+
+
+def fake_stream(text, size=7):
+    """Trocea el texto en fragmentos con la forma de los chunks de streaming"""
+    chunks = []
+    for start in range(0, len(text), size):
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = text[start:start + size]
+        chunks.append(chunk)
+    return chunks
+
+
+def fake_completion(plan):
+    """Construye una respuesta con la forma de chat.completions.create"""
+    completion = MagicMock()
+    completion.choices[0].message.content = json.dumps(plan)
+    return completion
+
+
+class TestPlanCacheKey:
+
+    def test_key_ignores_argument_order_and_whitespace(self):
+        """Test que entradas equivalentes generan la misma clave"""
+        key1 = make_plan_key(fitness_goal='STRENGTH', health_conditions='Dolor  de rodilla ')
+        key2 = make_plan_key(health_conditions='dolor de rodilla', fitness_goal='STRENGTH')
+        assert key1 == key2
+
+    def test_key_depends_on_inputs(self):
+        """Test que entradas distintas generan claves distintas"""
+        assert make_plan_key(available_days=3) != make_plan_key(available_days=4)
+
+
+class TestPlanCache:
+
+    def setup_method(self):
+        caches['training_plans'].clear()
+        metrics.reset()
+        self.cache = PlanCache(alias='training_plans')
+
+    def test_hit_and_miss_counters(self):
+        """Test que se cuentan aciertos y fallos"""
+        assert self.cache.get('plan:x') is None
+        self.cache.set('plan:x', VALID_PLAN)
+        assert self.cache.get('plan:x') == VALID_PLAN
+
+        stats = self.cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['sets'] == 1
+
+    def test_rejects_oversized_entries(self):
+        """Test que no se guardan planes que superan el tamaño máximo"""
+        cache = PlanCache(alias='training_plans', max_entry_bytes=10)
+        assert not cache.set('plan:x', VALID_PLAN)
+        assert cache.get('plan:x') is None
+
+    def test_disabled_cache(self):
+        """Test que una caché desactivada nunca devuelve planes"""
+        cache = PlanCache(alias='training_plans', enabled=False)
+        cache.set('plan:x', VALID_PLAN)
+        assert cache.get('plan:x') is None
+
+
+class TestOpenAIServiceCache:
+
+    def setup_method(self):
+        caches['training_plans'].clear()
+        self.service = OpenAIService(plan_cache=PlanCache(alias='training_plans'))
+        self.service.client = MagicMock()
+        self.service.client.chat.completions.create.return_value = fake_completion(VALID_PLAN)
+        self.profile = {
+            'experience_level': 'BEG',
+            'fitness_goal': 'STRENGTH',
+            'available_days': 3,
+            'gender': 'M',
+            'health_conditions': ''
+        }
+
+    def test_identical_profiles_call_upstream_once(self):
+        """Test que un perfil repetido se sirve desde la caché"""
+        first = self.service.generate_training_plan(**self.profile)
+        second = self.service.generate_training_plan(**self.profile)
+
+        assert first == second == VALID_PLAN
+        assert self.service.client.chat.completions.create.call_count == 1
+
+    def test_different_profiles_call_upstream(self):
+        """Test que perfiles distintos no comparten plan"""
+        self.service.generate_training_plan(**self.profile)
+        self.service.generate_training_plan(**{**self.profile, 'available_days': 4})
+
+        assert self.service.client.chat.completions.create.call_count == 2
+
+    def test_request_within_token_budget(self, settings):
+        """Test que la petición lleva max_tokens y los tokens quedan en las métricas"""
+        settings.OPENAI_TOKEN_BUDGET = {'COMPLETION_TOKENS_BASE': 50, 'COMPLETION_TOKENS_PER_DAY': 400}
+        metrics.reset()
+        completion = fake_completion(VALID_PLAN)
+        completion.usage.prompt_tokens = 180
+        completion.usage.completion_tokens = 900
+        self.service.client.chat.completions.create.return_value = completion
+
+        self.service.generate_training_plan(**self.profile)
+
+        kwargs = self.service.client.chat.completions.create.call_args.kwargs
+        assert kwargs['max_tokens'] == 1250
+        assert kwargs['messages'][0]['role'] == 'system'
+        assert metrics.get('openai.prompt_tokens') == count_message_tokens(kwargs['messages'], 'gpt-3.5-turbo')
+        assert metrics.get('openai.max_tokens') == 1250
+        assert metrics.get('openai.usage.prompt_tokens') == 180
+        assert metrics.get('openai.usage.completion_tokens') == 900
+
+
+class TestPlanPrompt:
+
+    def test_prompt_is_compact(self):
+        """Test que el prompt no lleva sangrías ni líneas vacías y usa los días sugeridos"""
+        messages = build_plan_messages('INT', 'HYPERTROPHY', 3, 'F')
+        prompt = messages[1]['content']
+        assert all(line == line.strip() and line for line in prompt.splitlines())
+        assert 'Lunes, Miércoles, Viernes' in prompt
+        assert '8-12 repeticiones' in prompt
+        assert 'Femenino' in prompt
+        assert 'Considerar' not in prompt
+
+    def test_prompt_version_in_cache_key(self):
+        """Test que cambiar la versión del prompt cambia la clave de caché"""
+        assert plan_prompt.PROMPT_VERSION == 2
+        inputs = {'experience_level': 'BEG', 'fitness_goal': 'STRENGTH', 'available_days': 3}
+        assert make_plan_key(**inputs, prompt_version=1) != make_plan_key(**inputs, prompt_version=2)
+
+    def test_health_conditions_trimmed_to_budget(self, settings):
+        """Test que las condiciones de salud se recortan si el prompt no cabe en el presupuesto"""
+        base = count_message_tokens(build_plan_messages('BEG', 'STRENGTH', 3), 'gpt-3.5-turbo')
+        settings.OPENAI_TOKEN_BUDGET = {'MAX_PROMPT_TOKENS': base + 20}
+
+        messages = build_plan_messages('BEG', 'STRENGTH', 3, health_conditions='dolor lumbar ' * 100)
+        assert count_message_tokens(messages, 'gpt-3.5-turbo') <= base + 20
+        assert '- Considerar: dolor lumbar' in messages[1]['content']
+
+        short = build_plan_messages('BEG', 'STRENGTH', 3, health_conditions='asma')
+        assert short[1]['content'].endswith('- Considerar: asma')
+
+    def test_count_tokens_without_tiktoken(self, monkeypatch):
+        """Test que sin tiktoken se estima por caracteres, por exceso"""
+        monkeypatch.setattr(plan_prompt, 'tiktoken', None)
+        monkeypatch.setattr(plan_prompt, '_encodings', {})
+        assert plan_prompt.count_tokens('a' * 10, 'gpt-3.5-turbo') == 4
+        assert plan_prompt.truncate_to_tokens('a' * 10, 2, 'gpt-3.5-turbo') == 'a' * 6
+
+    def test_completion_budget(self, settings):
+        """Test que max_tokens depende de los días y respeta los límites"""
+        settings.OPENAI_TOKEN_BUDGET = {
+            'COMPLETION_TOKENS_BASE': 50, 'COMPLETION_TOKENS_PER_DAY': 400,
+            'MAX_COMPLETION_TOKENS': 2000, 'CONTEXT_WINDOW': 4000,
+        }
+        assert completion_budget(300, 3) == 1250
+        assert completion_budget(300, 7) == 2000
+        assert completion_budget(3000, 7) == 1000
+
+
+
+class TestPlanValidator:
+
+    def test_valid_plan(self):
+        """Test que un plan correcto no tiene errores y admite claves adicionales"""
+        assert validate_plan(VALID_PLAN) is None
+        assert validate_plan({**VALID_PLAN, 'notas': 'semana de descarga'}) is None
+
+    @pytest.mark.parametrize('plan, error', [
+        ([], 'El plan debe ser un objeto'),
+        ({}, 'Falta dias'),
+        ({'dias': {}}, 'dias debe ser una lista'),
+        ({'dias': [{'dia': 'Lunes'}]}, 'Falta dias[0].ejercicios'),
+        ({'dias': [{'dia': 'Lunes', 'ejercicios': [
+            {'nombre': 'Plancha', 'series': True, 'repeticiones': '30', 'descanso': '60'}
+        ]}]}, 'dias[0].ejercicios[0].series debe ser un entero'),
+        ({'dias': [{'dia': 'Lunes', 'ejercicios': [
+            {'nombre': 'Plancha', 'series': 3, 'repeticiones': 30, 'descanso': '60'}
+        ]}]}, 'dias[0].ejercicios[0].repeticiones debe ser un texto'),
+        ({'dias': [{'dia': 'Lunes', 'ejercicios': [
+            {'nombre': 'Plancha', 'series': -4, 'repeticiones': '30', 'descanso': '60'}
+        ]}]}, 'dias[0].ejercicios[0].series debe estar entre 1 y 20'),
+        ({'dias': [{'dia': 'Lunes', 'ejercicios': [
+            {'nombre': 'Plancha', 'series': 100000, 'repeticiones': '30', 'descanso': '60'}
+        ]}]}, 'dias[0].ejercicios[0].series debe estar entre 1 y 20'),
+    ])
+    def test_first_error_with_path(self, plan, error):
+        """Test que se devuelve el primer error con su ruta"""
+        assert validate_plan(plan) == error
+
+    def test_schema_is_strict(self):
+        """Test que el esquema cumple las reglas del modo estricto de salida estructurada"""
+        def objects(schema):
+            if schema['type'] == 'object':
+                yield schema
+                for sub in schema['properties'].values():
+                    yield from objects(sub)
+            elif schema['type'] == 'array':
+                yield from objects(schema['items'])
+
+        for schema in objects(PLAN_SCHEMA):
+            assert schema['additionalProperties'] is False
+            assert set(schema['required']) == set(schema['properties'])
+        # Los límites de series solo se aplican en la validación local
+        assert 'minimum' not in json.dumps(PLAN_SCHEMA)
+
+    @pytest.mark.parametrize('content', [
+        '```json\n{"dias": []}\n```',
+        'Aquí tienes el plan:\n{"dias": []}\nEspero que te sirva.',
+        '{"dias": []} }',
+    ])
+    def test_salvage_json(self, content):
+        """Test que se rescata el JSON de respuestas casi válidas"""
+        assert salvage_json(content) == {'dias': []}
+
+    def test_salvage_without_json(self):
+        """Test que sin objeto JSON se lanza ValueError"""
+        with pytest.raises(ValueError):
+            salvage_json('Lo siento, no puedo ayudarte')
+
+
+class TestOpenAIResponseFormat:
+
+    def setup_method(self):
+        metrics.reset()
+        self.service = OpenAIService(plan_cache=PlanCache(enabled=False))
+        self.service.client = MagicMock()
+
+    def test_fenced_response_is_salvaged(self):
+        """Test que una respuesta en un bloque de código no desperdicia la llamada"""
+        completion = MagicMock()
+        completion.choices[0].message.content = f"```json\n{json.dumps(VALID_PLAN)}\n```"
+        self.service.client.chat.completions.create.return_value = completion
+
+        assert self.service.generate_training_plan('BEG', 'STRENGTH', 3) == VALID_PLAN
+        assert metrics.get('openai.salvaged_responses') == 1
+
+    def test_invalid_format_reports_path(self):
+        """Test que el error de formato indica dónde está el problema"""
+        plan = {'dias': [{'dia': 'Lunes', 'ejercicios': [{'nombre': 'Plancha'}]}]}
+        self.service.client.chat.completions.create.return_value = fake_completion(plan)
+
+        with pytest.raises(ValidationError, match=r'Falta dias\[0\]\.ejercicios\[0\]\.series'):
+            self.service.generate_training_plan('BEG', 'STRENGTH', 3)
+
+    @pytest.mark.parametrize('response_format, expected', [
+        ('json_object', {'type': 'json_object'}),
+        ('json_schema', {'type': 'json_schema', 'json_schema': {
+            'name': 'plan_entrenamiento', 'schema': PLAN_SCHEMA, 'strict': True
+        }}),
+        ('text', None),
+    ])
+    def test_response_format(self, settings, response_format, expected):
+        """Test que se pide el formato de respuesta configurado"""
+        settings.OPENAI_RESPONSE = {'FORMAT': response_format}
+        self.service.client.chat.completions.create.return_value = fake_completion(VALID_PLAN)
+
+        self.service.generate_training_plan('BEG', 'STRENGTH', 3)
+        kwargs = self.service.client.chat.completions.create.call_args.kwargs
+        assert kwargs.get('response_format') == expected
+
+class TestAsyncOpenAIService:
+
+    def setup_method(self):
+        caches['training_plans'].clear()
+        self.service = AsyncOpenAIService(plan_cache=PlanCache(alias='training_plans'))
+        self.service.client = MagicMock()
+        self.service.client.chat.completions.create = AsyncMock(
+            return_value=fake_completion(VALID_PLAN)
+        )
+
+    def test_generate_and_cache(self):
+        """Test que el servicio async genera el plan y lo reutiliza desde la caché"""
+        generate = async_to_sync(self.service.generate_training_plan)
+        assert generate('BEG', 'STRENGTH', 3) == VALID_PLAN
+        assert generate('BEG', 'STRENGTH', 3) == VALID_PLAN
+        assert self.service.client.chat.completions.create.await_count == 1
+
+
+class TestOpenAIClientRegistry:
+
+    def test_services_share_one_client(self):
+        """Test que todas las instancias del servicio reutilizan el mismo cliente"""
+        assert OpenAIService().client is OpenAIService().client
+        assert get_openai_client() is OpenAIService().client
+
+    def test_client_uses_configuration(self, settings):
+        """Test que el cliente usa la base_url y los timeouts configurados"""
+        settings.OPENAI_CLIENT = {
+            'BASE_URL': 'http://127.0.0.1:9999/v1',
+            'CONNECT_TIMEOUT': 1,
+            'READ_TIMEOUT': 3,
+        }
+        client = get_openai_client()
+
+        assert str(client.base_url) == 'http://127.0.0.1:9999/v1/'
+        assert client.timeout.connect == 1
+        assert client.timeout.read == 3
+
+    def test_async_client_shared_within_event_loop(self):
+        """Test que las corrutinas de un mismo loop comparten cliente async"""
+        async def get_two():
+            return get_async_openai_client(), get_async_openai_client()
+
+        first, second = async_to_sync(get_two)()
+        assert first is second
+
+
+class TestPlanDayStreamParser:
+
+    def setup_method(self):
+        self.plan = {
+            "dias": [
+                {"dia": "Lunes", "ejercicios": [{"nombre": "Remo {con} barra", "series": 4,
+                                                  "repeticiones": "6-8", "descanso": "120"}]},
+                {"dia": "Jueves", "ejercicios": []}
+            ]
+        }
+        self.text = json.dumps(self.plan, ensure_ascii=False)
+
+    def test_days_emitted_as_they_close(self):
+        """Test que cada día se devuelve en cuanto su objeto JSON se cierra"""
+        parser = PlanDayStreamParser()
+        first_day_end = self.text.index('"Jueves"')
+
+        assert parser.feed(self.text[:first_day_end]) == [self.plan['dias'][0]]
+        assert parser.feed(self.text[first_day_end:]) == [self.plan['dias'][1]]
+        assert json.loads(parser.text) == self.plan
+
+    def test_single_character_chunks(self):
+        """Test que el parser soporta fragmentos de cualquier tamaño"""
+        parser = PlanDayStreamParser()
+        days = []
+        for char in self.text:
+            days.extend(parser.feed(char))
+        assert days == self.plan['dias']
+
+    def test_service_streams_days(self):
+        """Test que el servicio emite los días y después el plan completo"""
+        caches['training_plans'].clear()
+        service = OpenAIService(plan_cache=PlanCache(alias='training_plans'))
+        service.client = MagicMock()
+        service.client.chat.completions.create.return_value = fake_stream(json.dumps(VALID_PLAN))
+
+        events = list(service.stream_training_plan('BEG', 'STRENGTH', 3))
+
+        assert events == [('day', VALID_PLAN['dias'][0]), ('plan', VALID_PLAN)]
+        # El plan queda cacheado para las siguientes peticiones
+        assert list(service.stream_training_plan('BEG', 'STRENGTH', 3)) == events
+        assert service.client.chat.completions.create.call_count == 1
+
+
+class TestRuleBasedPlanGenerator:
+
+    def setup_method(self):
+        self.generator = RuleBasedPlanGenerator()
+        self.validator = OpenAIService()
+
+    @pytest.mark.parametrize('experience_level', ['BEG', 'INT', 'ADV'])
+    @pytest.mark.parametrize('fitness_goal', ['STRENGTH', 'HYPERTROPHY', 'ENDURANCE', 'WEIGHT_LOSS', 'MAINTENANCE'])
+    @pytest.mark.parametrize('available_days', [2, 3, 4, 5, 6, 7])
+    def test_plans_pass_validation(self, experience_level, fitness_goal, available_days):
+        """Test que los planes generados por reglas cumplen el formato de OpenAI"""
+        plan = self.generator.generate_training_plan(experience_level, fitness_goal, available_days)
+
+        assert self.validator._validate_response(plan)
+        assert len(plan['dias']) == available_days
+        assert all(len(dia['ejercicios']) >= 4 for dia in plan['dias'])
+
+    def test_uses_goal_configuration(self):
+        """Test que repeticiones y descansos salen de la configuración del objetivo"""
+        plan = self.generator.generate_training_plan('BEG', 'STRENGTH', 3)
+        ejercicio = plan['dias'][0]['ejercicios'][0]
+
+        assert plan['dias'][0]['dia'] == 'Lunes'
+        assert ejercicio['repeticiones'] == '4-8'
+        assert ejercicio['descanso'] in ('120', '180')
+
+    def test_deterministic(self):
+        """Test que el mismo perfil produce siempre el mismo plan"""
+        assert (self.generator.generate_training_plan('INT', 'HYPERTROPHY', 4)
+                == self.generator.generate_training_plan('INT', 'HYPERTROPHY', 4))
+
+
+class TestPlanStats:
+
+    def test_counts_and_duration(self):
+        """Test de recuentos y duración media por sesión"""
+        plan = {"dias": [
+            {"dia": "Lunes", "ejercicios": [
+                {"series": 4, "descanso": "120"},
+                {"series": "3-5", "descanso": "2 minutos"},
+            ]},
+            {"dia": "Jueves", "ejercicios": [{"series": "3", "descanso": "60-90 segundos"}]},
+        ]}
+        stats = compute_plan_stats(plan)
+
+        assert stats['day_count'] == 2
+        assert stats['exercise_count'] == 3
+        assert stats['total_sets'] == 11
+        # (4 x 165 + 4 x 165 + 3 x 120) s = 1680 s en 2 sesiones = 14 min
+        assert stats['estimated_duration'] == 14
+
+    @pytest.mark.parametrize('exercises', [None, {}, {"dias": "lunes"}, {"dias": [None, {"ejercicios": 3}]}])
+    def test_malformed_plans(self, exercises):
+        """Test que los planes mal formados no rompen el cálculo"""
+        stats = compute_plan_stats(exercises)
+        assert stats['exercise_count'] == 0
+        assert stats['total_sets'] == 0
+
+    def test_negative_values_count_as_zero(self):
+        """Test que las series y descansos negativos no dejan estadísticas negativas"""
+        stats = compute_plan_stats({"dias": [{"dia": "Lunes", "ejercicios": [
+            {"series": -4, "descanso": "90"},
+            {"series": 3, "descanso": -600},
+        ]}]})
+
+        assert stats['total_sets'] == 3
+        # Solo cuentan las 3 series del segundo ejercicio, sin descanso: 135 s
+        assert stats['estimated_duration'] == 2
+
+
+def timeout_error():
+    return openai.APITimeoutError(request=httpx.Request('POST', 'http://test'))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCircuitBreaker:
+
+    def setup_method(self):
+        metrics.reset()
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(
+            'test', window_size=4, min_calls=4, failure_rate=0.5,
+            open_seconds=10, clock=self.clock
+        )
+
+    def test_opens_when_failure_rate_reached(self):
+        """Test que el circuito se abre al alcanzar la tasa de fallos"""
+        for outcome in (True, True, False):
+            self.breaker.record_success() if outcome else self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.CLOSED
+
+        self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.OPEN
+        assert not self.breaker.allow_request()
+        assert metrics.get('circuit_breaker.test.open') == 1
+
+    def test_half_open_probe_closes_circuit(self):
+        """Test que tras el tiempo de apertura una sonda con éxito cierra el circuito"""
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.clock.now = 10
+
+        assert self.breaker.allow_request()
+        # Solo se permite una sonda simultánea
+        assert not self.breaker.allow_request()
+        self.breaker.record_success()
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        assert metrics.get('circuit_breaker.test.half_open') == 1
+
+    def test_half_open_failure_reopens_circuit(self):
+        """Test que una sonda fallida vuelve a abrir el circuito"""
+        for _ in range(4):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        self.breaker.allow_request()
+        self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.OPEN
+
+
+class TestCallWithResilience:
+
+    def setup_method(self):
+        self.breaker = CircuitBreaker('test', min_calls=10)
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001)
+        self.timeouts = []
+
+    def call(self, fn, deadline=None):
+        return call_with_resilience(fn, self.breaker, self.policy, deadline or Deadline(5))
+
+    def test_retries_transient_errors(self):
+        """Test que los errores transitorios se reintentan"""
+        outcomes = [timeout_error(), timeout_error(), 'ok']
+
+        def fn(timeout):
+            self.timeouts.append(timeout)
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        assert self.call(fn) == 'ok'
+        assert len(self.timeouts) == 3
+        # Cada intento recibe como timeout lo que queda del plazo
+        assert all(0 < timeout <= 5 for timeout in self.timeouts)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test que los reintentos están acotados"""
+        def fn(timeout):
+            self.timeouts.append(timeout)
+            raise timeout_error()
+
+        with pytest.raises(openai.APITimeoutError):
+            self.call(fn)
+        assert len(self.timeouts) == 3
+
+    def test_non_transient_errors_are_not_retried(self):
+        """Test que los errores no transitorios no se reintentan"""
+        def fn(timeout):
+            self.timeouts.append(timeout)
+            raise ValueError('respuesta inválida')
+
+        with pytest.raises(ValueError):
+            self.call(fn)
+        assert len(self.timeouts) == 1
+
+    def test_non_transient_errors_do_not_count_as_success(self):
+        """Test que un error no transitorio no cuenta como éxito en el circuit breaker"""
+        def fn(timeout):
+            raise ValueError('respuesta inválida')
+
+        breaker = CircuitBreaker('test', min_calls=2, failure_rate=1.0, open_seconds=0)
+        breaker.record_failure()
+        with pytest.raises(ValueError):
+            call_with_resilience(fn, breaker, self.policy, Deadline(5))
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        # La sonda semiabierta se libera sin cerrar el circuito
+        with pytest.raises(ValueError):
+            call_with_resilience(fn, breaker, self.policy, Deadline(5))
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+    def test_expired_deadline(self):
+        """Test que no se intenta la llamada con el plazo agotado"""
+        with pytest.raises(DeadlineExceededError):
+            self.call(lambda timeout: 'ok', deadline=Deadline(0))
+
+    def test_open_circuit_rejects_calls(self):
+        """Test que con el circuito abierto la llamada falla sin ejecutarse"""
+        breaker = CircuitBreaker('test', min_calls=1)
+        breaker.record_failure()
+        with pytest.raises(CircuitOpenError):
+            call_with_resilience(lambda timeout: 'ok', breaker, self.policy, Deadline(5))
+
+    def test_service_reports_unavailable_upstream(self, settings):
+        """Test que el servicio convierte los fallos de disponibilidad en UpstreamUnavailableError"""
+        settings.OPENAI_RESILIENCE = {'MAX_ATTEMPTS': 1, 'BREAKER_MIN_CALLS': 100}
+        service = OpenAIService(plan_cache=PlanCache(enabled=False))
+        service.client = MagicMock()
+        service.client.chat.completions.create.side_effect = timeout_error()
+
+        with pytest.raises(UpstreamUnavailableError):
+            service.generate_training_plan('BEG', 'STRENGTH', 3)
+
+
+class TestFakeOpenAIServer:
+
+    def test_service_against_local_server(self, settings):
+        """Test que el servicio funciona contra el servidor OpenAI simulado de los benchmarks"""
+        from benchmarks.fake_openai import FakeOpenAIServer
+
+        with FakeOpenAIServer() as server:
+            settings.OPENAI_CLIENT = {'BASE_URL': server.base_url}
+            service = OpenAIService(plan_cache=PlanCache(enabled=False))
+
+            plan = service.generate_training_plan('INT', 'HYPERTROPHY', 4)
+            events = list(service.stream_training_plan('INT', 'HYPERTROPHY', 4))
+
+        assert service._validate_response(plan)
+        assert events[-1] == ('plan', plan)
+        assert [payload for kind, payload in events[:-1]] == plan['dias']
+
+
+class TestSingleFlight:
+
+    def setup_method(self):
+        self.flight = SingleFlight()
+        self.calls = 0
+
+    def slow_call(self):
+        self.calls += 1
+        time.sleep(0.2)
+        return {'dias': []}
+
+    def run_concurrently(self, fn, count=5):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fn()))
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test que las llamadas simultáneas con la misma clave se ejecutan una vez"""
+        results = self.run_concurrently(lambda: self.flight.do('plan:x', self.slow_call))
+
+        assert self.calls == 1
+        assert results == [{'dias': []}] * 5
+
+    def test_followers_receive_leader_error(self):
+        """Test que los seguidores reciben la excepción del líder"""
+        def failing_call():
+            time.sleep(0.2)
+            raise ValueError('fallo')
+
+        errors = []
+
+        def call():
+            try:
+                self.flight.do('plan:x', failing_call)
+            except ValueError as e:
+                errors.append(e)
+
+        self.run_concurrently(call, count=3)
+        assert len(errors) == 3
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Test que una llamada posterior vuelve a ejecutarse"""
+        self.flight.do('plan:x', self.slow_call)
+        self.flight.do('plan:x', self.slow_call)
+        assert self.calls == 2
+
+    def test_service_coalesces_identical_profiles(self):
+        """Test que el servicio hace una sola llamada a OpenAI para perfiles idénticos simultáneos"""
+        service = OpenAIService(plan_cache=PlanCache(enabled=False))
+        service.client = MagicMock()
+
+        def slow_completion(**kwargs):
+            time.sleep(0.2)
+            return fake_completion(VALID_PLAN)
+
+        service.client.chat.completions.create.side_effect = slow_completion
+        metrics.reset()
+        results = self.run_concurrently(
+            lambda: service.generate_training_plan('BEG', 'STRENGTH', 3)
+        )
+
+        assert results == [VALID_PLAN] * 5
+        assert service.client.chat.completions.create.call_count == 1
+        # Los seguidores no suman tokens de una petición que no enviaron
+        assert metrics.get('openai.prompts') == 1
+
+
+class TestAsyncSingleFlight:
+
+    def setup_method(self):
+        self.flight = AsyncSingleFlight()
+        self.calls = 0
+
+    async def slow_call(self):
+        self.calls += 1
+        await asyncio.sleep(0.1)
+        return {'dias': []}
+
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        """Test que si se cancela el líder un seguidor toma el relevo"""
+        async def scenario():
+            leader = asyncio.ensure_future(self.flight.do('plan:x', self.slow_call))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.flight.do('plan:x', self.slow_call))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        assert async_to_sync(scenario)() == {'dias': []}
+        assert self.calls == 2
+
+    def test_followers_share_leader_result(self):
+        """Test que los seguidores reciben el resultado del líder"""
+        async def scenario():
+            return await asyncio.gather(*[
+                self.flight.do('plan:x', self.slow_call) for _ in range(3)
+            ])
+
+        assert async_to_sync(scenario)() == [{'dias': []}] * 3
+        assert self.calls == 1
+
+
+class TestProcessLock:
+
+    def test_noop_without_lock_dir(self, settings):
+        """Test que sin LOCK_DIR no se bloquea entre procesos"""
+        settings.TRAINING_PLAN_SINGLE_FLIGHT = {'LOCK_DIR': None}
+        with process_lock('plan:x') as locked:
+            assert not locked
+
+    def test_lock_with_lock_dir(self, settings, tmp_path):
+        """Test que con LOCK_DIR se obtiene el bloqueo por fichero"""
+        settings.TRAINING_PLAN_SINGLE_FLIGHT = {'LOCK_DIR': str(tmp_path), 'LOCK_TIMEOUT': 1}
+        with process_lock('plan:x') as locked:
+            assert locked
+        assert len(list(tmp_path.iterdir())) == 1
+
+    def test_async_lock_waits_for_holder(self, settings, tmp_path):
+        """Test que la versión async comparte el bloqueo y respeta LOCK_TIMEOUT"""
+        settings.TRAINING_PLAN_SINGLE_FLIGHT = {'LOCK_DIR': str(tmp_path), 'LOCK_TIMEOUT': 0.1}
+
+        async def acquire():
+            async with aprocess_lock('plan:x') as locked:
+                return locked
+
+        with process_lock('plan:x'):
+            assert async_to_sync(acquire)() is False
+        assert async_to_sync(acquire)() is True
+
+    def test_async_service_rechecks_cache_under_lock(self, settings, tmp_path):
+        """Test que el servicio async no llama a OpenAI si otro proceso ya guardó el plan"""
+        settings.TRAINING_PLAN_SINGLE_FLIGHT = {'LOCK_DIR': str(tmp_path), 'LOCK_TIMEOUT': 1}
+        service = AsyncOpenAIService(plan_cache=PlanCache(enabled=False))
+        service.client = MagicMock()
+        service.client.chat.completions.create = AsyncMock(return_value=fake_completion(VALID_PLAN))
+        # Primera lectura antes del bloqueo; la segunda, ya con él, encuentra el plan
+        service.plan_cache.aget = AsyncMock(side_effect=[None, VALID_PLAN])
+
+        assert async_to_sync(service.generate_training_plan)('BEG', 'STRENGTH', 3) == VALID_PLAN
+        service.client.chat.completions.create.assert_not_called()
+
+
+class TestRateLimiter:
+
+    def test_spaces_calls(self):
+        """Test que las llamadas se reparten a intervalos de 1/rate segundos"""
+        clock = FakeClock()
+        waits = []
+        limiter = RateLimiter(4, clock=clock, sleep=waits.append)
+        for _ in range(3):
+            limiter.acquire()
+        assert waits == [0.25, 0.5]
+
+        # Pasado el intervalo no se espera
+        clock.now = 10
+        limiter.acquire()
+        assert waits == [0.25, 0.5]
+
+    def test_unlimited(self):
+        """Test que con rate 0 no se limita"""
+        waits = []
+        limiter = RateLimiter(0, sleep=waits.append)
+        for _ in range(5):
+            limiter.acquire()
+        assert waits == []
+
+
+@pytest.mark.django_db
+class TestBatchGeneration:
+
+    def setup_method(self):
+        metrics.reset()
+        self.profiles = []
+        for index, (level, conditions) in enumerate([
+            ('BEG', ''), ('BEG', ' '), ('BEG', ''), ('INT', 'Rodilla  operada'), ('INT', 'rodilla operada')
+        ]):
+            user = User.objects.create_user(username=f'socio{index}', password='testpass1234')
+            profile = user.profile
+            profile.experience_level = level
+            profile.fitness_goal = 'STRENGTH'
+            profile.available_days = 3
+            profile.health_conditions = conditions
+            profile.save()
+            self.profiles.append(profile)
+
+    def test_groups_equivalent_profiles(self):
+        """Test que los perfiles con las mismas entradas del prompt se agrupan"""
+        groups = group_profiles(UserProfile.objects.order_by('user_id'))
+        assert sorted(len(members) for members in groups.values()) == [2, 3]
+
+    def test_one_generation_per_group(self):
+        """Test que se genera una vez por grupo y se crea un plan por usuario"""
+        with patch('apps.training.services.batch_generation.generate_plan_data',
+                   side_effect=lambda profile, engine: RuleBasedPlanGenerator().generate_training_plan(
+                       profile.experience_level, profile.fitness_goal, profile.available_days)) as generate:
+            result = generate_plans_for_profiles(UserProfile.objects.all(), engine='openai', rate=0)
+
+        assert generate.call_count == 2
+        assert result == {'created': 5, 'generations': 2, 'failed': []}
+        plans = TrainingPlan.objects.order_by('user_id')
+        assert [plan.difficulty for plan in plans] == ['BEG', 'BEG', 'BEG', 'INT', 'INT']
+        assert all(plan.day_count == 3 for plan in plans)
+        assert PlanDay.objects.count() == 15
+        assert metrics.get('plan_batch.generations') == 2
+
+    def test_failed_group_does_not_block_others(self):
+        """Test que un grupo fallido se informa y el resto se guarda"""
+        def generate(profile, engine):
+            if profile.experience_level == 'INT':
+                raise ValidationError('OpenAI no está disponible')
+            return RuleBasedPlanGenerator().generate_training_plan('BEG', 'STRENGTH', 3)
+
+        with patch('apps.training.services.batch_generation.generate_plan_data', side_effect=generate):
+            result = generate_plans_for_profiles(UserProfile.objects.all(), rate=0)
+
+        assert result['created'] == 3
+        assert sorted(failure['user'] for failure in result['failed']) == [
+            self.profiles[3].user_id, self.profiles[4].user_id
+        ]
+        assert TrainingPlan.objects.count() == 3
+
+    def test_command(self):
+        """Test del comando generate_plans con el motor por reglas"""
+        out = StringIO()
+        call_command('generate_plans', '--dry-run', stdout=out)
+        assert '5 usuarios, 2 generaciones distintas' in out.getvalue()
+        assert not TrainingPlan.objects.exists()
+
+        out = StringIO()
+        call_command('generate_plans', '--engine', 'rules', '--experience-level', 'BEG', stdout=out)
+        assert '3 planes creados con 1 generaciones' in out.getvalue()
+        assert TrainingPlan.objects.count() == 3
+
+
+# pytest apps/training/tests/test_services.py -v
@@ -1,9 +1,21 @@
+import json
 import pytest
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from apps.training.models import TrainingPlan
+from unittest.mock import AsyncMock, patch
+from asgiref.sync import async_to_sync
+from django.core.exceptions import ValidationError
+from django.test import AsyncClient, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.training.models import TrainingPlan, PlanGenerationJob, PlanExercise
+from apps.training.services.plan_jobs import process_pending_jobs, run_job
+from datetime import timedelta
+from django.utils import timezone
+from apps.training.services import metrics
 
 @pytest.mark.django_db
 class TestTrainingPlanViews:
@@ -62,6 +74,14 @@ class TestTrainingPlanViews:
         assert response.data['plan_type'] == 'STRENGTH'
         assert response.data['user']['username'] == 'testuser'
 
+    def test_create_rejects_negative_series(self):
+        """Test que un plan con series negativas devuelve 400 en lugar de romper al guardar"""
+        self.plan_data['exercises']['dias'][0]['ejercicios'][0]['series'] = -4
+        response = self.client.post(self.list_create_url, self.plan_data, format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not TrainingPlan.objects.exists()
+
     def test_list_training_plans(self):
         """Test listar planes de entrenamiento"""
         # Crear algunos planes
@@ -70,7 +90,194 @@ class TestTrainingPlanViews:
         
         response = self.client.get(self.list_create_url)
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 2
+        assert len(response.data['results']) == 2
+        assert response.data['next'] is None
+
+    def test_list_training_plans_cursor_pagination(self, settings):
+        """Test que el listado se recorre por cursor, del más reciente al más antiguo"""
+        settings.TRAINING_PLAN_PAGINATION = {'PAGE_SIZE': 2, 'MAX_PAGE_SIZE': 3}
+        plans = [TrainingPlan.objects.create(user=self.user, **self.plan_data) for _ in range(5)]
+
+        seen = []
+        url = self.list_create_url
+        while url:
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data['results']) <= 2
+            seen.extend(plan['id'] for plan in response.data['results'])
+            url = response.data['next']
+
+        assert seen == [plan.id for plan in reversed(plans)]
+
+        response = self.client.get(self.list_create_url, {'page_size': 50})
+        assert len(response.data['results']) == 3
+
+    def test_cursor_pagination_with_equal_timestamps(self, settings):
+        """Test que el cursor usa (created_at, id): los empates no se saltan ni se repiten"""
+        settings.TRAINING_PLAN_PAGINATION = {'PAGE_SIZE': 2, 'MAX_PAGE_SIZE': 3}
+        plans = [TrainingPlan.objects.create(user=self.user, **self.plan_data) for _ in range(5)]
+        TrainingPlan.objects.update(created_at=timezone.now())
+
+        seen = []
+        url = self.list_create_url
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            assert not any('OFFSET' in q['sql'] for q in context.captured_queries)
+            seen.extend(plan['id'] for plan in response.data['results'])
+            previous, url = response.data['previous'], response.data['next']
+        assert seen == [plan.id for plan in reversed(plans)]
+
+        # Hacia atrás desde la última página
+        response = self.client.get(previous)
+        assert [plan['id'] for plan in response.data['results']] == seen[2:4]
+
+        response = self.client.get(self.list_create_url, {'ordering': 'created_at'})
+        assert [plan['id'] for plan in response.data['results']] == [plans[0].id, plans[1].id]
+        response = self.client.get(response.data['next'])
+        assert [plan['id'] for plan in response.data['results']] == [plans[2].id, plans[3].id]
+
+    def test_list_training_plans_summary(self):
+        """Test que la vista resumen devuelve recuentos sin leer los ejercicios"""
+        exercises = {"dias": [
+            {"dia": "Lunes", "ejercicios": [{"nombre": "Sentadillas"}, {"nombre": "Zancadas"}]},
+            {"dia": "Jueves", "ejercicios": [{"nombre": "Dominadas"}]}
+        ]}
+        TrainingPlan.objects.create(user=self.user, **{**self.plan_data, 'exercises': exercises})
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_create_url, {'view': 'summary'})
+
+        assert response.status_code == status.HTTP_200_OK
+        plan = response.data['results'][0]
+        assert 'exercises' not in plan
+        assert plan['day_count'] == 2
+        assert plan['exercise_count'] == 3
+        plan_query = next(q['sql'] for q in context.captured_queries if 'training_trainingplan' in q['sql'])
+        # Los recuentos salen de sus columnas: el JSON de ejercicios no se lee
+        assert '"exercises"' not in plan_query
+
+    def test_list_training_plans_sparse_fields(self):
+        """Test que ?fields= limita los campos devueltos"""
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+
+        response = self.client.get(self.list_create_url, {'fields': 'id,plan_type'})
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'plan_type'}
+
+        response = self.client.get(self.list_create_url, {'fields': 'id,password'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_list_training_plans_filters(self):
+        """Test de filtros, búsqueda por ejercicio y orden del listado"""
+        strength = TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        cardio = TrainingPlan.objects.create(user=self.user, **{
+            **self.plan_data,
+            'plan_type': 'CARDIO',
+            'difficulty': 'INT',
+            'is_active': False,
+            'exercises': {"dias": [{"dia": "Martes", "ejercicios": [{"nombre": "Remo"}]}]}
+        })
+
+        def ids(params):
+            response = self.client.get(self.list_create_url, params)
+            assert response.status_code == status.HTTP_200_OK
+            return [plan['id'] for plan in response.data['results']]
+
+        assert ids({'plan_type': 'CARDIO'}) == [cardio.id]
+        assert ids({'difficulty': 'BEG', 'is_active': 'true'}) == [strength.id]
+        assert ids({'is_active': 'false'}) == [cardio.id]
+        assert ids({'exercise': 'press de BANCA'}) == [strength.id]
+        assert ids({'created_after': '2000-01-01', 'ordering': 'created_at'}) == [strength.id, cardio.id]
+        assert ids({'created_before': '2000-01-01'}) == []
+
+        for params in ({'plan_type': 'YOGA'}, {'is_active': 'maybe'}, {'created_after': 'ayer'}):
+            response = self.client.get(self.list_create_url, params)
+            assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_conditional_requests(self):
+        """Test de ETag/Last-Modified: 304 sin cambios y nuevo ETag tras escribir"""
+        plan = TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        url = reverse('training-plan-detail', kwargs={'pk': plan.pk})
+
+        response = self.client.get(self.list_create_url)
+        etag = response['ETag']
+        assert response.has_header('Last-Modified')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert not response.content
+        assert not any('training_trainingplan' in q['sql'] for q in context.captured_queries)
+
+        response = self.client.get(self.list_create_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # Cada representación tiene su propio ETag
+        response = self.client.get(self.list_create_url, {'view': 'summary'}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        response = self.client.get(self.list_create_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        # El detalle también responde 304 y rechaza escrituras con un If-Match anticuado
+        detail_etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        response = self.client.patch(url, {'is_active': False}, format='json', HTTP_IF_MATCH=detail_etag)
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        plan.refresh_from_db()
+        assert plan.is_active
+
+    def test_list_response_cache(self, settings):
+        """Test que las lecturas repetidas salen de la caché y una escritura las invalida"""
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': True}
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        self.client.get(self.list_create_url)
+        before = metrics.snapshot('response_cache.')
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.list_create_url)
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()['results']) == 1
+        assert not any('training_trainingplan' in q['sql'] or 'users_userprofile' in q['sql']
+                       for q in context.captured_queries)
+        assert metrics.get('response_cache.hits') == before.get('response_cache.hits', 0) + 1
+
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        response = self.client.get(self.list_create_url)
+        assert len(response.json()['results']) == 2
+
+    def test_response_cache_disabled(self, settings):
+        """Test que con la caché desactivada cada lectura consulta la base de datos"""
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': False}
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        self.client.get(self.list_create_url)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.list_create_url)
+        assert any('training_trainingplan' in q['sql'] for q in context.captured_queries)
+
+    def test_conditional_update(self):
+        """Test de If-Match: 412 si el plan cambió desde la lectura"""
+        plan = TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        url = reverse('training-plan-detail', kwargs={'pk': plan.pk})
+        etag = self.client.get(url)['ETag']
+
+        response = self.client.patch(url, {'is_active': False}, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        new_etag = response['ETag']
+        assert new_etag != etag
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=new_etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = self.client.patch(url, {'is_active': True}, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        plan.refresh_from_db()
+        assert plan.is_active is False
 
     def test_get_training_plan_detail(self):
         """Test obtener detalle de un plan"""
@@ -105,3 +312,359 @@ class TestTrainingPlanViews:
         response = self.client.delete(url)
         assert response.status_code == status.HTTP_204_NO_CONTENT
         assert not TrainingPlan.objects.filter(id=plan.id).exists()
+
+
+
+@pytest.mark.django_db
+class TestBulkImportExportViews:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='coach', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.bulk_url = reverse('training-plan-bulk')
+        self.export_url = reverse('training-plan-export')
+        self.plan_data = {
+            'plan_type': 'STRENGTH',
+            'difficulty': 'INT',
+            'exercises': {
+                "dias": [
+                    {
+                        "dia": "Lunes",
+                        "ejercicios": [
+                            {"nombre": "Sentadillas", "series": 4, "repeticiones": "8-10", "descanso": "120"},
+                            {"nombre": "Press de banca", "series": 3, "repeticiones": "8-10", "descanso": "90"}
+                        ]
+                    }
+                ]
+            },
+            'is_active': True
+        }
+
+    def _post_lines(self, lines):
+        body = ''.join(line + '\n' for line in lines)
+        return self.client.generic('POST', self.bulk_url, body, content_type='application/x-ndjson')
+
+    def _export(self, params=''):
+        response = self.client.get(self.export_url + params)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        body = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in body.splitlines()]
+
+    def test_import_creates_plans_in_chunks(self):
+        """Test que la importación crea todos los planes con estadísticas y estructura"""
+        lines = [json.dumps({**self.plan_data, 'difficulty': level}) for level in ('BEG', 'INT', 'ADV', 'INT', 'BEG')]
+        self.user.profile.refresh_from_db()
+        version = self.user.profile.data_version
+
+        with override_settings(TRAINING_PLAN_BULK={'CHUNK_SIZE': 2}):
+            response = self._post_lines(lines + [''])
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data == {'created': 5}
+        plans = TrainingPlan.objects.filter(user=self.user)
+        assert plans.count() == 5
+        assert all(plan.exercise_count == 2 and plan.total_sets == 7 for plan in plans)
+        assert PlanExercise.objects.filter(plan__user=self.user).count() == 10
+        assert TrainingPlan.objects.with_exercise('sentadillas').filter(user=self.user).count() == 5
+        # Una sola invalidación para toda la importación, no una por lote
+        self.user.profile.refresh_from_db()
+        assert self.user.profile.data_version == version + 1
+
+    def test_import_is_all_or_nothing(self):
+        """Test que una línea no válida anula la importación y se informa por línea"""
+        lines = [
+            json.dumps(self.plan_data),
+            '{no es json',
+            json.dumps({**self.plan_data, 'exercises': {'semanas': []}}),
+            json.dumps(self.plan_data),
+        ]
+        with override_settings(TRAINING_PLAN_BULK={'CHUNK_SIZE': 1}):
+            response = self._post_lines(lines)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [error['line'] for error in response.data['errors']] == [2, 3]
+        assert 'exercises' in response.data['errors'][1]['errors']
+        assert not TrainingPlan.objects.filter(user=self.user).exists()
+
+    def test_import_line_limit(self):
+        """Test que se rechazan las importaciones con más líneas de las permitidas"""
+        with override_settings(TRAINING_PLAN_BULK={'MAX_LINES': 2}):
+            response = self._post_lines([json.dumps(self.plan_data)] * 3)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['errors'][0]['line'] == 3
+        assert not TrainingPlan.objects.exists()
+
+    def test_import_requires_ndjson(self):
+        """Test que solo se acepta el tipo de contenido JSON Lines"""
+        response = self.client.post(self.bulk_url, self.plan_data, format='json')
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+    def test_export_streams_own_plans(self):
+        """Test que la exportación devuelve una línea por plan del usuario, en orden"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        TrainingPlan.objects.create(user=other, **self.plan_data)
+        plans = [TrainingPlan.objects.create(user=self.user, **self.plan_data) for _ in range(3)]
+
+        with override_settings(TRAINING_PLAN_BULK={'EXPORT_CHUNK_SIZE': 2}):
+            rows = self._export()
+
+        assert [row['id'] for row in rows] == [plan.id for plan in reversed(plans)]
+        assert 'user' not in rows[0]
+        assert rows[0]['exercises'] == self.plan_data['exercises']
+        assert rows[0]['total_sets'] == 7
+
+    def test_export_filters(self):
+        """Test que la exportación acepta los filtros del listado"""
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        TrainingPlan.objects.create(user=self.user, **{**self.plan_data, 'is_active': False})
+
+        assert len(self._export('?is_active=false')) == 1
+        assert self.client.get(self.export_url + '?difficulty=XXX').status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_export_round_trip(self):
+        """Test que una exportación se puede importar tal cual"""
+        TrainingPlan.objects.create(user=self.user, **self.plan_data)
+        lines = [json.dumps(row) for row in self._export()]
+
+        response = self._post_lines(lines)
+        assert response.status_code == status.HTTP_201_CREATED
+        assert TrainingPlan.objects.filter(user=self.user).count() == 2
+
+@pytest.mark.django_db
+class TestGenerateTrainingPlanViews:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.generate_url = reverse('generate-training-plan')
+        self.plan_data = {
+            "dias": [
+                {
+                    "dia": "Lunes",
+                    "ejercicios": [
+                        {
+                            "nombre": "Sentadillas",
+                            "series": 4,
+                            "repeticiones": "6-8",
+                            "descanso": "120"
+                        }
+                    ]
+                }
+            ]
+        }
+
+    def test_generate_returns_pending_job(self):
+        """Test que la generación se encola y responde 202"""
+        response = self.client.post(self.generate_url)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['status'] == PlanGenerationJob.STATUS_PENDING
+        assert response['Location'] == reverse(
+            'plan-generation-job-detail', kwargs={'pk': response.data['id']}
+        )
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_job_status_after_processing(self, mock_service):
+        """Test que el estado del trabajo incluye el plan una vez generado"""
+        mock_service.return_value.generate_training_plan.return_value = self.plan_data
+        job_id = self.client.post(self.generate_url).data['id']
+
+        run_job(job_id)
+
+        response = self.client.get(reverse('plan-generation-job-detail', kwargs={'pk': job_id}))
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['status'] == PlanGenerationJob.STATUS_DONE
+        assert response.data['plan']['exercises'] == self.plan_data
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_failed_job_reports_error(self, mock_service):
+        """Test que un error de OpenAI deja el trabajo como fallido"""
+        mock_service.return_value.generate_training_plan.side_effect = Exception('timeout')
+        job_id = self.client.post(self.generate_url).data['id']
+
+        job = run_job(job_id)
+
+        assert job.status == PlanGenerationJob.STATUS_FAILED
+        assert job.error == 'timeout'
+        assert not TrainingPlan.objects.exists()
+
+    def test_job_runs_only_once(self):
+        """Test que un trabajo ya reclamado no se vuelve a ejecutar"""
+        job = PlanGenerationJob.objects.create(
+            user=self.user,
+            status=PlanGenerationJob.STATUS_RUNNING
+        )
+        assert run_job(job.pk) is None
+
+    def test_stale_job_reclaimed_on_poll(self):
+        """Test que un trabajo abandonado por un reinicio vuelve a pendiente al consultarlo"""
+        stale = PlanGenerationJob.objects.create(
+            user=self.user,
+            status=PlanGenerationJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(minutes=10)
+        )
+        recent = PlanGenerationJob.objects.create(
+            user=self.user,
+            status=PlanGenerationJob.STATUS_RUNNING,
+            started_at=timezone.now()
+        )
+        before = metrics.get('plan_jobs.reclaimed')
+
+        response = self.client.get(reverse('plan-generation-job-detail', kwargs={'pk': stale.pk}))
+        assert response.data['status'] == PlanGenerationJob.STATUS_PENDING
+        response = self.client.get(reverse('plan-generation-job-detail', kwargs={'pk': recent.pk}))
+        assert response.data['status'] == PlanGenerationJob.STATUS_RUNNING
+        assert metrics.get('plan_jobs.reclaimed') == before + 1
+
+    def test_worker_sweeps_stale_jobs(self, settings):
+        """Test que en modo worker process_pending_jobs recupera y ejecuta los trabajos abandonados"""
+        settings.TRAINING_PLAN_JOBS = {**settings.TRAINING_PLAN_JOBS, 'MODE': 'worker'}
+        stale = PlanGenerationJob.objects.create(
+            user=self.user,
+            engine=PlanGenerationJob.ENGINE_RULES,
+            status=PlanGenerationJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(minutes=10)
+        )
+        # En modo worker un pendiente antiguo solo está esperando, no se toca
+        waiting = PlanGenerationJob.objects.create(user=self.user, engine=PlanGenerationJob.ENGINE_RULES)
+        PlanGenerationJob.objects.filter(pk=waiting.pk).update(created_at=timezone.now() - timedelta(hours=1))
+
+        assert process_pending_jobs() == 2
+        stale.refresh_from_db()
+        assert stale.status == PlanGenerationJob.STATUS_DONE
+
+    def test_generate_with_rules_engine(self):
+        """Test que el motor por reglas devuelve el plan sin esperar a OpenAI"""
+        response = self.client.post(self.generate_url, {'engine': 'rules'}, format='json')
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['status'] == PlanGenerationJob.STATUS_DONE
+        assert len(response.data['plan']['exercises']['dias']) == self.user.profile.available_days
+
+    def test_generate_with_invalid_engine(self):
+        """Test que se rechaza un motor desconocido"""
+        response = self.client.post(self.generate_url, {'engine': 'otro'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_auto_engine_falls_back_to_rules(self, mock_service):
+        """Test que con el motor auto un fallo de OpenAI se resuelve con reglas"""
+        mock_service.return_value.generate_training_plan.side_effect = ValidationError('timeout')
+        job_id = self.client.post(self.generate_url, {'engine': 'auto'}, format='json').data['id']
+
+        job = run_job(job_id)
+
+        assert job.status == PlanGenerationJob.STATUS_DONE
+        assert job.plan.exercises['dias']
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_openai_engine_does_not_fall_back(self, mock_service):
+        """Test que con el motor openai un fallo deja el trabajo como fallido"""
+        mock_service.return_value.generate_training_plan.side_effect = ValidationError('timeout')
+        job_id = self.client.post(self.generate_url, {'engine': 'openai'}, format='json').data['id']
+
+        assert run_job(job_id).status == PlanGenerationJob.STATUS_FAILED
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_stream_generation(self, mock_service):
+        """Test que la generación por streaming emite días y el plan guardado"""
+        mock_service.return_value.stream_training_plan.return_value = iter([
+            ('day', self.plan_data['dias'][0]),
+            ('plan', self.plan_data),
+        ])
+
+        response = self.client.post(reverse('generate-training-plan-stream'))
+        body = b''.join(response.streaming_content).decode()
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/event-stream'
+        assert body.startswith('event: day\n')
+        assert 'event: done\n' in body
+        assert TrainingPlan.objects.filter(user=self.user).count() == 1
+
+    @patch('apps.training.services.plan_generation.OpenAIService')
+    def test_stream_generation_error(self, mock_service):
+        """Test que un error de generación se envía como evento error"""
+        mock_service.return_value.stream_training_plan.side_effect = ValidationError('JSON inválido')
+
+        response = self.client.post(reverse('generate-training-plan-stream'))
+        body = b''.join(response.streaming_content).decode()
+
+        assert body.startswith('event: error\n')
+        assert not TrainingPlan.objects.exists()
+
+    def test_cannot_see_other_users_jobs(self):
+        """Test que un usuario no puede consultar trabajos ajenos"""
+        other = User.objects.create_user(username='other', password='testpass123')
+        job = PlanGenerationJob.objects.create(user=other)
+
+        response = self.client.get(reverse('plan-generation-job-detail', kwargs={'pk': job.pk}))
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestAsyncGenerateTrainingPlanView:
+    def setup_method(self):
+        self.client = AsyncClient()
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.url = reverse('generate-training-plan-async')
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.plan_data = {
+            "dias": [
+                {
+                    "dia": "Lunes",
+                    "ejercicios": [
+                        {
+                            "nombre": "Sentadillas",
+                            "series": 4,
+                            "repeticiones": "6-8",
+                            "descanso": "120"
+                        }
+                    ]
+                }
+            ]
+        }
+
+    @patch('apps.training.services.plan_generation.AsyncOpenAIService')
+    def test_generate_plan(self, mock_service):
+        """Test que la vista async genera y guarda el plan"""
+        mock_service.return_value.generate_training_plan = AsyncMock(return_value=self.plan_data)
+
+        response = async_to_sync(self.client.post)(
+            self.url, headers={'Authorization': f'Bearer {self.token}'}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()['exercises'] == self.plan_data
+        assert TrainingPlan.objects.filter(user=self.user).count() == 1
+
+    def test_generate_plan_with_rules_engine(self):
+        """Test que la vista async admite el motor por reglas"""
+        response = async_to_sync(self.client.post)(
+            self.url,
+            {'engine': 'rules'},
+            content_type='application/json',
+            headers={'Authorization': f'Bearer {self.token}'}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()['exercises']['dias']
+
+    def test_requires_authentication(self):
+        """Test que la vista async rechaza peticiones sin token"""
+        response = async_to_sync(self.client.post)(self.url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_rejects_invalid_token(self):
+        """Test que la vista async rechaza tokens inválidos"""
+        response = async_to_sync(self.client.post)(
+            self.url, headers={'Authorization': 'Bearer invalido'}
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
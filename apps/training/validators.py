@@ -0,0 +1,155 @@
+import copy
+import json
+import re
+from typing import Any, Callable, Dict, Optional
+
+
+# Formato del JSON de ejercicios de un plan. Se envía tal cual a OpenAI como
+# esquema de salida estructurada (modo estricto: todo obligatorio y sin
+# propiedades adicionales) y se compila para validar planes de cualquier origen
+PLAN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "dias": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "dia": {"type": "string"},
+                    "ejercicios": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "nombre": {"type": "string"},
+                                "series": {"type": "integer"},
+                                "repeticiones": {"type": "string"},
+                                "descanso": {"type": "string"},
+                            },
+                            "required": ["nombre", "series", "repeticiones", "descanso"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["dia", "ejercicios"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["dias"],
+    "additionalProperties": False,
+}
+
+# Series admitidas por ejercicio. Solo las comprueba la validación local: no
+# están en PLAN_SCHEMA porque el modo estricto de OpenAI no admite minimum/maximum
+MIN_SERIES = 1
+MAX_SERIES = 20
+
+Check = Callable[[Any, str], Optional[str]]
+
+_TYPE_NAMES = {'string': 'un texto', 'integer': 'un entero', 'object': 'un objeto', 'array': 'una lista'}
+
+_SCALAR_CHECKS = {
+    'string': lambda value: isinstance(value, str),
+    # En JSON true/false no son enteros, aunque en Python bool herede de int
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+}
+
+
+def _child(path: str, name: str) -> str:
+    return f'{path}.{name}' if path else name
+
+
+def _compile(schema: Dict[str, Any]) -> Check:
+    """
+    Convierte un esquema (el subconjunto de JSON Schema de PLAN_SCHEMA, más
+    ``minimum``/``maximum`` en los enteros) en funciones anidadas que recorren
+    el valor una sola vez y devuelven el primer error con su ruta, o None.
+    ``additionalProperties`` no se comprueba: los planes guardados pueden
+    llevar claves de más.
+    """
+    kind = schema['type']
+    expected = f"debe ser {_TYPE_NAMES[kind]}"
+
+    if kind == 'object':
+        required = tuple(schema.get('required', ()))
+        properties = tuple((name, _compile(sub)) for name, sub in schema.get('properties', {}).items())
+
+        def check(value, path):
+            if not isinstance(value, dict):
+                return f"{path or 'El plan'} {expected}"
+            for name in required:
+                if name not in value:
+                    return f"Falta {_child(path, name)}"
+            for name, check_property in properties:
+                if name in value:
+                    error = check_property(value[name], _child(path, name))
+                    if error:
+                        return error
+            return None
+        return check
+
+    if kind == 'array':
+        check_item = _compile(schema['items'])
+
+        def check(value, path):
+            if not isinstance(value, list):
+                return f"{path} {expected}"
+            for index, item in enumerate(value):
+                error = check_item(item, f'{path}[{index}]')
+                if error:
+                    return error
+            return None
+        return check
+
+    is_valid = _SCALAR_CHECKS[kind]
+    if 'minimum' in schema or 'maximum' in schema:
+        low, high = schema['minimum'], schema['maximum']
+
+        def check(value, path):
+            if not is_valid(value):
+                return f"{path} {expected}"
+            if not low <= value <= high:
+                return f"{path} debe estar entre {low} y {high}"
+            return None
+        return check
+
+    def check(value, path):
+        return None if is_valid(value) else f"{path} {expected}"
+    return check
+
+
+def _with_series_range(schema: Dict[str, Any]) -> Dict[str, Any]:
+    bounded = copy.deepcopy(schema)
+    exercise = bounded['properties']['dias']['items']['properties']['ejercicios']['items']
+    exercise['properties']['series'].update(minimum=MIN_SERIES, maximum=MAX_SERIES)
+    return bounded
+
+
+_check_plan = _compile(_with_series_range(PLAN_SCHEMA))
+
+
+def validate_plan(plan: Any) -> Optional[str]:
+    """Primer error de formato del plan, p. ej. ``dias[0].ejercicios[2].series debe ser un entero``, o None"""
+    return _check_plan(plan, '')
+
+
+_FENCE = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL | re.IGNORECASE)
+_decoder = json.JSONDecoder()
+
+
+def salvage_json(content: str) -> Any:
+    """
+    Rescata el JSON de una respuesta casi válida del modelo: dentro de un
+    bloque de código o con texto antes o después. Lanza ValueError si no
+    hay ningún objeto JSON completo que leer.
+    """
+    fenced = _FENCE.search(content)
+    if fenced:
+        content = fenced.group(1)
+    start = content.find('{')
+    if start == -1:
+        raise ValueError('La respuesta no contiene un objeto JSON')
+    # raw_decode lee el primer valor completo e ignora lo que venga detrás
+    value, _ = _decoder.raw_decode(content, start)
+    return value
@@ -1,5 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import UserProfile
+from apps.training.services.batch_generation import generate_plans_for_profiles
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -7,3 +8,19 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('gender', 'experience_level', 'fitness_goal')
     search_fields = ('user__username', 'user__email')
     ordering = ('user__username',)
+    actions = ('generate_training_plans',)
+
+    @admin.action(description='Generar plan de entrenamiento para los perfiles seleccionados')
+    def generate_training_plans(self, request, queryset):
+        """Genera los planes en la propia petición; para gimnasios enteros, mejor ``manage.py generate_plans``"""
+        result = generate_plans_for_profiles(queryset)
+        self.message_user(
+            request,
+            f"{result['created']} planes creados con {result['generations']} generaciones"
+        )
+        if result['failed']:
+            self.message_user(
+                request,
+                f"Falló la generación para {len(result['failed'])} usuarios",
+                level=messages.WARNING
+            )
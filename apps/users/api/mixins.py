@@ -0,0 +1,111 @@
+import hashlib
+from django.http import HttpResponse
+from django.utils.http import http_date, parse_http_date_safe, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+from apps.users.services.response_cache import ResponseCache
+from apps.users.services.user_service import get_data_version
+
+
+class _ConditionalResponse(Exception):
+    """Corta la petición antes del handler con una respuesta ya resuelta (304, 412 o cacheada)"""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class UserDataConditionalMixin:
+    """
+    Peticiones condicionales y caché de respuestas sobre los datos del usuario autenticado.
+
+    El ETag se deriva de ``UserProfile.data_version``, que se incrementa en
+    cada escritura del perfil o de los planes, junto con la ruta completa y
+    el formato de respuesta, así que es fuerte para cada representación.
+    ``If-None-Match`` e ``If-Modified-Since`` responden 304 antes de
+    consultar ni serializar nada; ``If-Match`` en PUT, PATCH y DELETE
+    responde 412 si el cliente no tiene la última versión. Las respuestas
+    GET se guardan en ``ResponseCache`` para la misma versión.
+    """
+    conditional_write_methods = ('PUT', 'PATCH', 'DELETE')
+    # La API navegable incluye el token CSRF de la sesión: no se cachea
+    cacheable_formats = ('json',)
+
+    def get_variant(self, request):
+        # URL absoluta: los enlaces de paginación incluyen el host
+        return f'{request.build_absolute_uri()}:{request.accepted_renderer.format}'
+
+    def get_etag(self, request, state):
+        version, modified_at = state
+        variant = f'{request.user.pk}:{version}:{modified_at.timestamp()}:{self.get_variant(request)}'
+        return quote_etag(hashlib.sha256(variant.encode()).hexdigest()[:32])
+
+    def get_request_data_version(self, request):
+        # La autenticación completa ya leyó la versión junto con el perfil
+        state = getattr(request.user, 'data_version_state', None)
+        return state if state is not None else get_data_version(request.user.pk)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.data_version = self.get_request_data_version(request)
+        if self.data_version is None:
+            return
+        etag = self.get_etag(request, self.data_version)
+
+        if request.method in ('GET', 'HEAD'):
+            self.check_not_modified(request, etag)
+            self.response_cache = ResponseCache(
+                enabled=None if request.accepted_renderer.format in self.cacheable_formats else False
+            )
+            self.response_cache_key = self.response_cache.make_key(request.user.pk, self.get_variant(request))
+            cached = self.response_cache.get(self.response_cache_key, self.data_version)
+            if cached is not None:
+                raise _ConditionalResponse(HttpResponse(
+                    cached['content'], content_type=cached['content_type']
+                ))
+        elif request.method in self.conditional_write_methods:
+            if_match = request.headers.get('If-Match')
+            if if_match and if_match.strip() != '*' and etag not in parse_etags(if_match):
+                raise _ConditionalResponse(Response(
+                    {'detail': 'El recurso ha cambiado desde la última lectura'},
+                    status=status.HTTP_412_PRECONDITION_FAILED
+                ))
+
+    def check_not_modified(self, request, etag):
+        modified_at = self.data_version[1]
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            not_modified = etag in parse_etags(if_none_match) or if_none_match.strip() == '*'
+        else:
+            since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+            not_modified = since is not None and int(modified_at.timestamp()) <= since
+        if not_modified:
+            raise _ConditionalResponse(Response(status=status.HTTP_304_NOT_MODIFIED))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'data_version', None) is None:
+            return response
+        if response.status_code not in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            return response
+
+        if request.method in ('GET', 'HEAD'):
+            state = self.data_version
+            if response.status_code == status.HTTP_200_OK and isinstance(response, Response):
+                response.render()
+                self.response_cache.set(
+                    self.response_cache_key, state, response.content, response['Content-Type']
+                )
+        else:
+            # La escritura ya incrementó la versión: se emite el ETag nuevo
+            state = get_data_version(request.user.pk)
+            if state is None:
+                return response
+
+        response['ETag'] = self.get_etag(request, state)
+        response['Last-Modified'] = http_date(state[1].timestamp())
+        return response
@@ -1,6 +1,9 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
 from apps.users.models import UserProfile
+from apps.users.services.token_service import TOKEN_VERSION_CLAIM
+from apps.users.services.password_service import hash_password
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -11,11 +14,13 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=validated_data['password']
+        # Como create_user, pero dentro del límite de hashes simultáneos
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email', ''))
         )
+        user.password = hash_password(validated_data['password'])
+        user.save()
         return user
 
 
@@ -61,3 +66,17 @@ class UserProfileSerializer(serializers.ModelSerializer):
             setattr(profile, attr, value)
         profile.save()
         return profile
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Añade al token los claims que usa la autenticación sin estado:
+    nombre de usuario y versión de los tokens para poder revocarlos.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token[TOKEN_VERSION_CLAIM] = user.profile.token_version
+        return token
@@ -3,12 +3,13 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from apps.users.api.views import UserRegistrationView, UserProfileView
+from apps.users.api.views import UserRegistrationView, UserProfileView, RevokeTokensView
 
 urlpatterns = [
     # Auth URLs
     path('token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/revoke/', RevokeTokensView.as_view(), name='token_revoke'),
     # User URLs
     path('users/register/', UserRegistrationView.as_view(), name='user-register'),
     path('users/profile/', UserProfileView.as_view(), name='user-profile'),
@@ -1,16 +1,29 @@
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from django.contrib.auth.models import User
 from apps.users.api.serializers import UserSerializer, UserProfileSerializer
+from apps.users.api.mixins import UserDataConditionalMixin
+from apps.users.services.token_service import revoke_tokens
 
 class UserRegistrationView(generics.CreateAPIView):
     queryset = User.objects.all()
     permission_classes = (AllowAny,)
     serializer_class = UserSerializer
 
-class UserProfileView(generics.RetrieveUpdateAPIView):
+class UserProfileView(UserDataConditionalMixin, generics.RetrieveUpdateAPIView):
     serializer_class = UserProfileSerializer
     permission_classes = (IsAuthenticated,)
 
     def get_object(self):
-        return self.request.user.profile
\ No newline at end of file
+        return self.request.user.profile
+
+
+class RevokeTokensView(APIView):
+    """Cierra todas las sesiones: revoca los JWT emitidos hasta ahora para el usuario"""
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        revoke_tokens(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from apps.training.services import metrics
+from apps.users.services.token_service import get_token_version, is_token_revoked
+from apps.users.services.user_service import get_data_version
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'USER_AUTH_CACHE', {})
+
+
+def _revoked():
+    return AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    Autenticación JWT que carga el perfil junto con el usuario.
+
+    Las vistas que usan ``request.user.profile`` no hacen una segunda
+    consulta. Con ``USER_AUTH_CACHE`` activo, el usuario y su perfil se
+    guardan en caché junto con la versión de sus datos; cualquier escritura
+    del usuario o del perfil cambia la versión y descarta la copia. La
+    versión leída queda en ``user.data_version_state`` para los ETag.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = self._get_cached_user(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            self._cache_user(user_id, user)
+            profile = getattr(user, 'profile', None)
+            if profile is not None:
+                user.data_version_state = (profile.data_version, profile.data_modified_at)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        profile = getattr(user, 'profile', None)
+        if profile is not None and is_token_revoked(validated_token, profile.token_version):
+            raise _revoked()
+
+        return user
+
+    @staticmethod
+    def _cache_key(user_id) -> str:
+        return f'auth-user:{user_id}'
+
+    def _get_cached_user(self, user_id):
+        config = _get_config()
+        if not config.get('ENABLED', False):
+            return None
+        entry = caches[config.get('ALIAS', 'default')].get(self._cache_key(user_id))
+        if entry is not None and entry['version'] == get_data_version(entry['user'].pk):
+            metrics.increment('auth_cache.hits')
+            entry['user'].data_version_state = entry['version']
+            return entry['user']
+        metrics.increment('auth_cache.misses')
+        return None
+
+    def _cache_user(self, user_id, user) -> None:
+        config = _get_config()
+        if not config.get('ENABLED', False):
+            return
+        version = get_data_version(user.pk)
+        if version is None:
+            return
+        caches[config.get('ALIAS', 'default')].set(
+            self._cache_key(user_id),
+            {'version': version, 'user': user},
+            config.get('TIMEOUT', 300)
+        )
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuario construido solo con los claims firmados del token.
+
+    Basta para filtrar por ``pk``; el ``User`` completo (con su perfil) se
+    carga la primera vez que se accede a ``user`` o ``profile``.
+    """
+
+    @cached_property
+    def user(self):
+        return ProfileJWTAuthentication().get_user(self.token)
+
+    @property
+    def profile(self):
+        return self.user.profile
+
+
+class StatelessJWTAuthentication(ProfileJWTAuthentication):
+    """
+    Modo sin consulta de usuario para vistas que lo activan explícitamente.
+
+    En métodos de lectura devuelve un ``ClaimsUser`` sin tocar la base de
+    datos: solo comprueba la firma y que la versión del token no esté
+    revocada, con la versión vigente en una caché en memoria. Las escrituras
+    siguen cargando el usuario completo.
+    """
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not getattr(self, 'stateless', False):
+            return super().get_user(validated_token)
+
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user_id = validated_token[api_settings.USER_ID_CLAIM]
+        if is_token_revoked(validated_token, get_token_version(user_id)):
+            raise _revoked()
+        metrics.increment('auth.stateless')
+        return ClaimsUser(validated_token)
@@ -0,0 +1,21 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+from apps.users.services.password_service import check_user_password, hash_password
+
+
+class PooledModelBackend(ModelBackend):
+    """ModelBackend que limita los hashes simultáneos con el semáforo de password_service"""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Mismo coste que con un usuario existente, para no revelar cuáles existen
+            hash_password(password)
+        else:
+            if check_user_password(user, password) and self.user_can_authenticate(user):
+                return user
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, ScryptPasswordHasher
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'PASSWORD_HASHING', {})
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    """
+    scrypt con parámetros configurables en ``PASSWORD_HASHING``.
+
+    Los parámetros van en cada hash, así que cambiarlos no invalida las
+    contraseñas existentes: se rehashean en el siguiente login.
+    """
+
+    @property
+    def work_factor(self):
+        return _get_config().get('SCRYPT_WORK_FACTOR', 2 ** 14)
+
+    @property
+    def block_size(self):
+        return _get_config().get('SCRYPT_BLOCK_SIZE', 8)
+
+    @property
+    def parallelism(self):
+        return _get_config().get('SCRYPT_PARALLELISM', 2)
+
+    @property
+    def maxmem(self):
+        # Límite, no reserva: debe admitir también hashes con parámetros anteriores mayores
+        return _get_config().get('SCRYPT_MAXMEM', 256 * 1024 * 1024)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id con parámetros configurables; requiere ``argon2-cffi``"""
+
+    @property
+    def time_cost(self):
+        return _get_config().get('ARGON2_TIME_COST', 2)
+
+    @property
+    def memory_cost(self):
+        return _get_config().get('ARGON2_MEMORY_COST', 19 * 1024)
+
+    @property
+    def parallelism(self):
+        return _get_config().get('ARGON2_PARALLELISM', 1)
@@ -1,6 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+# Campos de versión del usuario; solo se modifican con update()
+VERSION_FIELDS = ('data_version', 'data_modified_at', 'token_version')
 
 class UserProfile(models.Model):
     EXPERIENCE_LEVELS = [
@@ -41,6 +45,21 @@ class UserProfile(models.Model):
     available_days = models.IntegerField(default=3)
     health_conditions = models.TextField(blank=True)
 
+    # Versión de los datos del usuario (perfil y planes), para ETag y Last-Modified
+    data_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versión de los datos'
+    )
+    data_modified_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Última modificación de los datos'
+    )
+    # Los JWT emitidos con una versión anterior quedan revocados
+    token_version = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Versión de los tokens'
+    )
+
     def clean(self):
         if self.weight <= 0:
             raise ValidationError('El peso debe ser mayor que 0')
@@ -50,6 +69,13 @@ class UserProfile(models.Model):
 
     def save(self, *args, **kwargs):
         self.clean()
+        # La versión se incrementa en la base de datos; guardar el valor en
+        # memoria podría deshacer un incremento concurrente
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in VERSION_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -0,0 +1,59 @@
+import threading
+from typing import Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+from django.contrib.auth.models import User
+from apps.training.services import metrics
+
+
+_slots: Optional[threading.BoundedSemaphore] = None
+_slots_lock = threading.Lock()
+
+
+def get_slots() -> threading.BoundedSemaphore:
+    """
+    Límite de hashes de contraseñas simultáneos en el proceso, creado en el primer uso.
+
+    El hash se calcula en el hilo de la petición: el semáforo solo acota
+    cuántos (CPU y memoria puros) se calculan a la vez para que en un pico
+    de registros el resto espere su turno en lugar de competir por los
+    núcleos, sin un salto a otro hilo por cada hash.
+    """
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(
+                getattr(settings, 'PASSWORD_HASHING', {}).get('MAX_WORKERS', 2)
+            )
+        return _slots
+
+
+def _verify(raw_password: str, encoded: str) -> Tuple[bool, Optional[str]]:
+    """Comprueba la contraseña y, si el hash está anticuado, calcula el nuevo"""
+    is_correct, must_update = verify_password(raw_password, encoded)
+    if is_correct and must_update:
+        return True, make_password(raw_password)
+    return is_correct, None
+
+
+def hash_password(raw_password: str) -> str:
+    metrics.increment('password.hashes')
+    with get_slots():
+        return make_password(raw_password)
+
+
+def _apply(user: User, is_correct: bool, new_encoded: Optional[str]) -> bool:
+    if new_encoded is not None:
+        # Rehash transparente al entrar: algoritmo o parámetros han cambiado
+        user.password = new_encoded
+        user.save(update_fields=['password'])
+        metrics.increment('password.rehashes')
+    return is_correct
+
+
+def check_user_password(user: User, raw_password: str) -> bool:
+    """Equivalente a ``user.check_password``, dentro del límite de hashes simultáneos"""
+    metrics.increment('password.checks')
+    with get_slots():
+        result = _verify(raw_password, user.password)
+    return _apply(user, *result)
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.core.cache import caches
+from apps.training.services import metrics
+
+
+class ResponseCache:
+    """
+    Caché de respuestas renderizadas por usuario sobre el framework de caché de Django.
+
+    Cada entrada guarda la versión de los datos del usuario con la que se
+    generó; si al leerla la versión ha cambiado, la entrada se descarta
+    (``response_cache.evictions``). Así cualquier escritura invalida todas
+    las respuestas del usuario sin tener que enumerarlas.
+    """
+
+    def __init__(self, alias: Optional[str] = None, timeout: Optional[int] = None,
+                 enabled: Optional[bool] = None):
+        config = getattr(settings, 'USER_RESPONSE_CACHE', {})
+        self.alias = alias or config.get('ALIAS', 'default')
+        self.timeout = timeout if timeout is not None else config.get('TIMEOUT', 300)
+        self.enabled = enabled if enabled is not None else config.get('ENABLED', False)
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(user_id: int, variant: str) -> str:
+        return f'response:{user_id}:' + hashlib.sha256(variant.encode('utf-8')).hexdigest()
+
+    def get(self, key: str, version: Any) -> Optional[Dict[str, Any]]:
+        """Devuelve ``{'content', 'content_type'}`` si hay respuesta para esta versión"""
+        if not self.enabled:
+            return None
+        entry = self.backend.get(key)
+        if entry is None:
+            metrics.increment('response_cache.misses')
+            return None
+        if entry['version'] != version:
+            metrics.increment('response_cache.evictions')
+            metrics.increment('response_cache.misses')
+            self.backend.delete(key)
+            return None
+        metrics.increment('response_cache.hits')
+        return entry
+
+    def set(self, key: str, version: Any, content: bytes, content_type: str) -> None:
+        if not self.enabled:
+            return
+        self.backend.set(key, {
+            'version': version,
+            'content': content,
+            'content_type': content_type,
+        }, self.timeout)
+        metrics.increment('response_cache.sets')
+
+    def stats(self) -> Dict[str, int]:
+        return metrics.snapshot('response_cache.')
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from apps.users.models import UserProfile
+from apps.users.services.user_service import bump_data_version
+
+
+TOKEN_VERSION_CLAIM = 'token_version'
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'JWT_REVOCATION', {})
+
+
+def _cache():
+    return caches[_get_config().get('ALIAS', 'default')]
+
+
+def _version_key(user_id) -> str:
+    return f'token-version:{user_id}'
+
+
+def get_token_version(user_id) -> int:
+    """
+    Versión vigente de los tokens del usuario.
+
+    Se guarda en una caché en memoria del proceso durante ``TIMEOUT``
+    segundos: una revocación tarda como mucho ese tiempo en llegar al resto
+    de procesos. Un usuario sin perfil tiene la versión 0, como en
+    ProfileJWTAuthentication; un usuario que no existe no tiene tokens
+    válidos (None).
+    """
+    key = _version_key(user_id)
+    version = _cache().get(key)
+    if version is None:
+        version = UserProfile.objects.filter(user_id=user_id).values_list(
+            'token_version', flat=True
+        ).first()
+        if version is None:
+            if not User.objects.filter(pk=user_id).exists():
+                return None
+            version = 0
+        _cache().set(key, version, _get_config().get('TIMEOUT', 60))
+    return version
+
+
+def is_token_revoked(token, current_version) -> bool:
+    """Los tokens sin versión se emitieron antes de cualquier revocación: versión 0"""
+    return current_version is None or token.get(TOKEN_VERSION_CLAIM, 0) < current_version
+
+
+def forget_token_version(user_id) -> None:
+    """Descarta la versión cacheada en este proceso, ahora y al confirmar la transacción"""
+    _cache().delete(_version_key(user_id))
+    transaction.on_commit(lambda: _cache().delete(_version_key(user_id)))
+
+
+def revoke_tokens(user_id) -> None:
+    """Revoca todos los JWT emitidos hasta ahora para el usuario"""
+    UserProfile.objects.filter(user_id=user_id).update(token_version=F('token_version') + 1)
+    # El usuario autenticado cacheado lleva la versión antigua del perfil
+    bump_data_version(user_id)
+    forget_token_version(user_id)
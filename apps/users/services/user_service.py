@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.users.models import UserProfile
+
+
+def _get_config() -> dict:
+    return getattr(settings, 'USER_RESPONSE_CACHE', {})
+
+
+def _version_key(user_id: int) -> str:
+    return f'user-data-version:{user_id}'
+
+
+def _forget_versions(user_ids) -> None:
+    config = _get_config()
+    if config.get('ENABLED', False):
+        caches[config.get('ALIAS', 'default')].delete_many([_version_key(pk) for pk in user_ids])
+
+
+def bump_data_version(*user_ids: int) -> None:
+    """
+    Incrementa la versión de los datos de los usuarios indicados.
+
+    Se llama en cada escritura de perfil o planes, dentro de la misma
+    transacción, para invalidar los ETag, Last-Modified y respuestas
+    cacheadas ya emitidos. La versión cacheada se borra ahora y otra vez al
+    confirmar, por si otra petición la volvió a leer antes del commit.
+    """
+    UserProfile.objects.filter(user_id__in=user_ids).update(
+        data_version=F('data_version') + 1,
+        data_modified_at=timezone.now()
+    )
+    _forget_versions(user_ids)
+    transaction.on_commit(lambda: _forget_versions(user_ids))
+
+
+def get_data_version(user_id: int):
+    """
+    ``(data_version, data_modified_at)`` del usuario, o None si no tiene perfil.
+    Con la caché de respuestas activa se lee de la caché.
+    """
+    config = _get_config()
+    cache = caches[config.get('ALIAS', 'default')] if config.get('ENABLED', False) else None
+    if cache is not None:
+        state = cache.get(_version_key(user_id))
+        if state is not None:
+            return state
+
+    state = UserProfile.objects.filter(user_id=user_id).values_list(
+        'data_version', 'data_modified_at'
+    ).first()
+    if cache is not None and state is not None:
+        cache.set(_version_key(user_id), state, config.get('VERSION_TIMEOUT', 60))
+    return state
@@ -1,10 +1,16 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from apps.users.models import UserProfile
+from apps.users.services.user_service import bump_data_version
+from apps.users.services.token_service import forget_token_version, revoke_tokens
+
+# Campos de User que no afectan a la API ni a la autenticación: guardarlos no cambia la versión
+UNVERSIONED_USER_FIELDS = frozenset(('last_login',))
+
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
+def create_user_profile(sender, instance, created, update_fields=None, **kwargs):
     if created:
         UserProfile.objects.create(
             user=instance,
@@ -13,4 +19,24 @@ def create_user_profile(sender, instance, created, **kwargs):
             age=18,    
             experience_level='BEG',
             fitness_goal='STRENGTH'
-        )
\ No newline at end of file
+        )
+    elif not instance.is_active:
+        # Un usuario desactivado no debe seguir entrando con tokens sin estado
+        revoke_tokens(instance.pk)
+    elif update_fields is None or not UNVERSIONED_USER_FIELDS.issuperset(update_fields):
+        # Los datos del usuario aparecen anidados en perfil y planes
+        bump_data_version(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+def bump_profile_version(sender, instance, created, **kwargs):
+    # También al crearlo: descarta versiones cacheadas de un usuario anterior con el mismo id
+    bump_data_version(instance.user_id)
+    if created:
+        forget_token_version(instance.user_id)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_user_tokens(sender, instance, **kwargs):
+    # Sin esto la versión cacheada seguiría aceptando sus tokens sin estado
+    forget_token_version(instance.pk)
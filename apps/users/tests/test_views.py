@@ -1,9 +1,19 @@
+import threading
+import time
 import pytest
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from django.contrib.auth.models import User
 from apps.users.models import UserProfile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.test import override_settings
+from apps.training.services import metrics
+from apps.users.services import password_service
 
 @pytest.mark.django_db
 class TestUserViews:
@@ -82,4 +92,230 @@ class TestUserViews:
         for key, value in self.profile_data.items():
             assert response.data[key] == value
 
-        # pytest apps/users/tests/test_views.py -v
\ No newline at end of file
+    def test_profile_conditional_requests(self, settings):
+        """Test de ETag en el perfil: 304 sin cambios, 412 con If-Match obsoleto"""
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': True}
+        user = User.objects.create_user(**self.user_data)
+        self.client.force_authenticate(user=user)
+
+        etag = self.client.get(self.profile_url)['ETag']
+        response = self.client.get(self.profile_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = self.client.patch(self.profile_url, {'age': 31}, HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        response = self.client.patch(self.profile_url, {'age': 32}, HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert UserProfile.objects.get(user=user).age == 31
+
+        # La lectura siguiente no puede salir de la caché anterior a la escritura
+        response = self.client.get(self.profile_url)
+        assert response.data['age'] == 31
+
+
+
+@pytest.mark.django_db
+class TestProfileAuthenticationQueries:
+    """La autenticación JWT carga el perfil en la misma consulta que el usuario"""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+        self.profile_url = reverse('user-profile')
+
+    def profile_queries(self, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.profile_url, params)
+        assert response.status_code == status.HTTP_200_OK
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_profile_loaded_with_user(self, settings):
+        """Test que sin cachés el perfil no necesita una consulta propia"""
+        settings.USER_AUTH_CACHE = {**settings.USER_AUTH_CACHE, 'ENABLED': False}
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': False}
+
+        queries = self.profile_queries()
+        # Usuario con su perfil (JOIN), que ya trae la versión de los datos para el ETag
+        assert len(queries) == 1
+        assert 'JOIN "users_userprofile"' in queries[0]
+
+    def test_cached_user_and_profile(self, settings):
+        """Test que con la caché activa la autenticación no consulta la base de datos"""
+        settings.USER_AUTH_CACHE = {**settings.USER_AUTH_CACHE, 'ENABLED': True}
+        settings.USER_RESPONSE_CACHE = {**settings.USER_RESPONSE_CACHE, 'ENABLED': True}
+        self.profile_queries()
+        # Otra URL no está en la caché de respuestas, pero usuario, perfil y versión sí
+        assert self.profile_queries({'variant': 1}) == []
+
+        # Una escritura del perfil invalida la copia cacheada
+        self.user.profile.age = 40
+        self.user.profile.save()
+        response = self.client.get(self.profile_url)
+        assert response.data['age'] == 40
+
+
+
+@pytest.mark.django_db
+class TestStatelessAuthentication:
+    """Modo sin estado: lecturas sin consultar el usuario y revocación por versión"""
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client = APIClient()
+        self.plans_url = reverse('training-plan-list')
+
+    def login(self):
+        response = self.client.post(reverse('token_obtain_pair'), {
+            'username': 'testuser',
+            'password': 'testpass123'
+        })
+        token = response.data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return AccessToken(token)
+
+    def test_token_claims(self):
+        """Test que el token lleva usuario y versión de tokens"""
+        token = self.login()
+        assert token['username'] == 'testuser'
+        assert token['token_version'] == 0
+
+    def test_reads_skip_user_query(self):
+        """Test que las lecturas de planes no consultan la tabla de usuarios"""
+        self.login()
+        self.client.get(self.plans_url)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.plans_url, {'is_active': 'true'})
+        assert response.status_code == status.HTTP_200_OK
+        assert not any('FROM "auth_user"' in query['sql'] for query in context.captured_queries)
+
+    def test_revoked_tokens_rejected(self):
+        """Test que tras revocar los tokens los anteriores dejan de valer en todos los modos"""
+        self.login()
+        assert self.client.get(self.plans_url).status_code == status.HTTP_200_OK
+
+        response = self.client.post(reverse('token_revoke'))
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        assert self.client.get(self.plans_url).status_code == status.HTTP_401_UNAUTHORIZED
+        assert self.client.get(reverse('user-profile')).status_code == status.HTTP_401_UNAUTHORIZED
+
+        token = self.login()
+        assert token['token_version'] == 1
+        assert self.client.get(self.plans_url).status_code == status.HTTP_200_OK
+
+    def test_deactivated_user_rejected(self):
+        """Test que desactivar al usuario revoca sus tokens sin estado"""
+        self.login()
+        self.client.get(self.plans_url)
+
+        self.user.is_active = False
+        self.user.save()
+        assert self.client.get(self.plans_url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_user_without_profile(self):
+        """Test que un usuario sin perfil se acepta como en la autenticación completa (versión 0)"""
+        UserProfile.objects.filter(user=self.user).delete()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+        assert self.client.get(self.plans_url).status_code == status.HTTP_200_OK
+
+        # Un usuario eliminado sigue sin tokens válidos
+        self.user.delete()
+        assert self.client.get(self.plans_url).status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db
+class TestPasswordHashing:
+    def setup_method(self):
+        self.client = APIClient()
+        self.token_url = reverse('token_obtain_pair')
+
+    def test_register_uses_tuned_hasher(self):
+        """Test que el registro guarda el hash con el algoritmo y parámetros configurados"""
+        response = self.client.post(reverse('user-register'), {
+            'username': 'hashuser',
+            'email': 'Hash@Example.COM',
+            'password': 'testpass1234'
+        })
+        assert response.status_code == status.HTTP_201_CREATED
+        user = User.objects.get(username='hashuser')
+        assert user.email == 'Hash@example.com'
+        assert user.password.startswith('scrypt$')
+        assert identify_hasher(user.password).safe_summary(user.password)['work factor'] == 2 ** 14
+        assert user.check_password('testpass1234')
+        assert UserProfile.objects.filter(user=user).exists()
+
+    def test_login_rehashes_legacy_password(self):
+        """Test que un hash PBKDF2 se sustituye por el configurado al obtener un token"""
+        user = User.objects.create_user(username='legacy')
+        user.password = make_password('testpass1234', hasher='pbkdf2_sha256')
+        user.save(update_fields=['password'])
+        before = metrics.get('password.rehashes')
+
+        response = self.client.post(self.token_url, {'username': 'legacy', 'password': 'testpass1234'})
+        assert response.status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert user.password.startswith('scrypt$')
+        assert metrics.get('password.rehashes') == before + 1
+
+        # Ya actualizado, el siguiente login no vuelve a rehashear
+        self.client.post(self.token_url, {'username': 'legacy', 'password': 'testpass1234'})
+        assert metrics.get('password.rehashes') == before + 1
+
+    def test_login_rehashes_when_parameters_change(self):
+        """Test que cambiar el work factor rehashea la contraseña en el siguiente login"""
+        user = User.objects.create_user(username='tuned', password='testpass1234')
+        old_hash = user.password
+
+        with override_settings(PASSWORD_HASHING={**settings.PASSWORD_HASHING, 'SCRYPT_WORK_FACTOR': 2 ** 15}):
+            response = self.client.post(self.token_url, {'username': 'tuned', 'password': 'testpass1234'})
+        assert response.status_code == status.HTTP_200_OK
+        user.refresh_from_db()
+        assert user.password != old_hash
+        assert identify_hasher(user.password).safe_summary(user.password)['work factor'] == 2 ** 15
+
+    def test_wrong_password_and_unknown_user(self):
+        """Test que las credenciales incorrectas se rechazan sin tocar el hash"""
+        user = User.objects.create_user(username='wrongpass', password='testpass1234')
+        old_hash = user.password
+        for username in ('wrongpass', 'missing'):
+            response = self.client.post(self.token_url, {'username': username, 'password': 'otra-clave'})
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        user.refresh_from_db()
+        assert user.password == old_hash
+
+    def test_concurrent_hashes_capped(self, monkeypatch):
+        """Test que no se calculan más hashes a la vez que MAX_WORKERS, en el hilo de la petición"""
+        monkeypatch.setattr(password_service, '_slots', threading.BoundedSemaphore(2))
+        running, peak, threads = [0], [0], set()
+        lock = threading.Lock()
+
+        def slow_make_password(raw_password):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+                threads.add(threading.current_thread().name)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return 'hash'
+
+        monkeypatch.setattr(password_service, 'make_password', slow_make_password)
+        workers = [threading.Thread(target=password_service.hash_password, args=('clave',), name=f'req-{i}')
+                   for i in range(6)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert peak[0] == 2
+        assert threads == {f'req-{i}' for i in range(6)}
+
+        # pytest apps/users/tests/test_views.py -v
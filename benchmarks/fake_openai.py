@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from apps.training.services.rule_based_generator import RuleBasedPlanGenerator
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+        time.sleep(self.server.latency)
+
+        content = json.dumps(self.server.plan, ensure_ascii=False)
+        if body.get('stream'):
+            self._send_stream(content)
+        else:
+            self._send_json({
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': body.get('model', 'gpt-3.5-turbo'),
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': content},
+                    'finish_reason': 'stop',
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+            })
+
+    def _send_json(self, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, content, size=40):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        for start in range(0, len(content), size):
+            chunk = {
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': 'gpt-3.5-turbo',
+                'choices': [{'index': 0, 'delta': {'content': content[start:start + size]},
+                             'finish_reason': None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            time.sleep(self.server.chunk_latency)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeOpenAIServer:
+    """
+    Servidor HTTP local que imita ``/v1/chat/completions`` de OpenAI.
+
+    Responde con un plan válido tras ``latency`` segundos (y ``chunk_latency``
+    entre fragmentos en modo streaming). Se usa como ``OPENAI_CLIENT['BASE_URL']``
+    en benchmarks y pruebas manuales.
+    """
+
+    def __init__(self, latency: float = 0.0, chunk_latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.latency = latency
+        self._server.chunk_latency = chunk_latency
+        self._server.plan = RuleBasedPlanGenerator().generate_training_plan('INT', 'HYPERTROPHY', 4)
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'FakeOpenAIServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,202 @@
+import itertools
+import os
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, reset_queries
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.training.models import TrainingPlan
+from apps.training.services.plan_stats import compute_plan_stats
+from apps.training.services.rule_based_generator import RuleBasedPlanGenerator
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+BENCH_USERNAME = 'bench'
+BENCH_PASSWORD = 'bench-pass-1234'
+SEED_BATCH_SIZE = 5000
+# Lecturas que se miden también con la caché de respuestas activa (``<nombre>_warm``).
+# En un solo proceso basta LocMemCache: no hay invalidaciones que repartir
+WARM_SCENARIOS = ('plan_list', 'plan_detail', 'profile_get')
+
+
+def seed_plans(total: int, user_plans: int, background_users: int = 100) -> User:
+    """
+    Crea ``total`` planes: ``user_plans`` del usuario de benchmark y el resto
+    repartidos entre usuarios de relleno, para que las consultas por usuario
+    trabajen sobre una tabla del tamaño indicado.
+    """
+    user = User.objects.create_user(username=BENCH_USERNAME, password=BENCH_PASSWORD)
+    others = User.objects.bulk_create([
+        User(username=f'{BENCH_USERNAME}-{index}', password='!')
+        for index in range(background_users)
+    ])
+    exercises = RuleBasedPlanGenerator().generate_training_plan('INT', 'HYPERTROPHY', 4)
+
+    def owner(index):
+        return user if index < user_plans else others[index % len(others)]
+
+    # bulk_create no pasa por save(): las estadísticas se calculan una vez
+    stats = compute_plan_stats(exercises)
+
+    batch = []
+    for index in range(total):
+        batch.append(TrainingPlan(
+            user=owner(index),
+            plan_type='STRENGTH',
+            difficulty='INT',
+            exercises=exercises,
+            is_active=index % 3 != 0,
+            **stats
+        ))
+        if len(batch) == SEED_BATCH_SIZE:
+            TrainingPlan.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        TrainingPlan.objects.bulk_create(batch)
+    return user
+
+
+def _percentile(samples: List[float], percentile: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _summary(samples: List[float], queries: int) -> Dict[str, Any]:
+    return {
+        'iterations': len(samples),
+        'mean_ms': statistics.mean(samples) * 1000,
+        'p50_ms': _percentile(samples, 50) * 1000,
+        'p95_ms': _percentile(samples, 95) * 1000,
+        'p99_ms': _percentile(samples, 99) * 1000,
+        'min_ms': min(samples) * 1000,
+        'max_ms': max(samples) * 1000,
+        'requests_per_second': len(samples) / sum(samples),
+        'queries': queries,
+    }
+
+
+def measure(request: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    """Latencia de ``request`` en ``iterations`` llamadas y consultas SQL de una llamada"""
+    for _ in range(warmup):
+        request()
+
+    # Las consultas se cuentan aparte para no sumar el coste de capturarlas a la latencia.
+    # El registro de consultas es una cola acotada: se vacía para que no esté llena
+    reset_queries()
+    with CaptureQueriesContext(connection) as context:
+        response = request()
+    if response.status_code >= 400:
+        raise RuntimeError(f'La petición de benchmark falló con {response.status_code}')
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        request()
+        samples.append(time.perf_counter() - start)
+    return _summary(samples, len(context.captured_queries))
+
+
+def build_scenarios(user: User) -> Dict[str, Callable[[], Any]]:
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+    anonymous = APIClient()
+    plan = TrainingPlan.objects.filter(user=user).first()
+    # Cada registro necesita un nombre de usuario nuevo
+    registrations = itertools.count()
+
+    return {
+        'token_obtain': lambda: anonymous.post(
+            reverse('token_obtain_pair'),
+            {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD}
+        ),
+        'register': lambda: anonymous.post(
+            reverse('user-register'),
+            {'username': f'bench-register-{next(registrations)}', 'password': BENCH_PASSWORD}
+        ),
+        'plan_list': lambda: client.get(reverse('training-plan-list')),
+        'plan_detail': lambda: client.get(reverse('training-plan-detail', kwargs={'pk': plan.pk})),
+        'profile_get': lambda: client.get(reverse('user-profile')),
+        'profile_patch': lambda: client.patch(
+            reverse('user-profile'), {'available_days': 4}, format='json'
+        ),
+        'plan_generate': lambda: client.post(
+            reverse('generate-training-plan-async'), {'engine': 'openai'}, format='json'
+        ),
+        'plan_generate_rules': lambda: client.post(
+            reverse('generate-training-plan'), {'engine': 'rules'}, format='json'
+        ),
+    }
+
+
+def run_benchmarks(sizes: Iterable[int], iterations: int = 50, warmup: int = 5,
+                   latency: float = 0.05, user_plans: int = 200,
+                   scenarios: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Ejecuta los escenarios sobre una base de datos de test sembrada con cada
+    tamaño de ``sizes`` y un servidor OpenAI local con la latencia indicada.
+    La base de datos configurada no se toca.
+    """
+    results: Dict[str, Any] = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            # Las peticiones se miden en serie: requests_per_second equivale a un núcleo
+            'cpu_count': os.cpu_count(),
+            'password_hasher': settings.PASSWORD_HASHERS[0],
+            'iterations': iterations,
+            'warmup': warmup,
+            'upstream_latency_s': latency,
+            'user_plans': user_plans,
+        },
+        'results': {},
+    }
+
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with FakeOpenAIServer(latency=latency) as server, override_settings(
+            OPENAI_CLIENT={**getattr(settings, 'OPENAI_CLIENT', {}), 'BASE_URL': server.base_url},
+            # Sin caché de planes, cada generación llega al servidor local
+            TRAINING_PLAN_CACHE={**getattr(settings, 'TRAINING_PLAN_CACHE', {}), 'ENABLED': False},
+            # Las lecturas se miden contra la base de datos; las variantes _warm, con caché
+            USER_RESPONSE_CACHE={**getattr(settings, 'USER_RESPONSE_CACHE', {}), 'ENABLED': False},
+        ):
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                user = seed_plans(size, min(user_plans, size))
+                available = build_scenarios(user)
+                selected = list(scenarios) if scenarios else list(available)
+                size_results = {
+                    name: measure(available[name], iterations, warmup)
+                    for name in selected
+                }
+                warm = [name for name in selected if name in WARM_SCENARIOS]
+                if warm:
+                    response_cache = {**getattr(settings, 'USER_RESPONSE_CACHE', {}), 'ENABLED': True}
+                    caches[response_cache.get('ALIAS', 'default')].clear()
+                    with override_settings(USER_RESPONSE_CACHE=response_cache):
+                        for name in warm:
+                            size_results[f'{name}_warm'] = measure(available[name], iterations, warmup)
+                results['results'][str(size)] = size_results
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+    return results
@@ -3,6 +3,7 @@ Django settings for fitness_backend project.
 """
 from pathlib import Path
 import os
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 
@@ -37,7 +38,7 @@ INSTALLED_APPS = [
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.ProfileJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -57,6 +58,15 @@ SIMPLE_JWT = {
     
     'USER_ID_FIELD': 'id',                        
     'USER_ID_CLAIM': 'user_id',                   
+
+    'TOKEN_OBTAIN_SERIALIZER': 'apps.users.api.serializers.VersionedTokenObtainPairSerializer',
+}
+
+# Revocación de JWT por versión: la versión vigente de cada usuario se guarda
+# en la caché local del proceso durante TIMEOUT segundos
+JWT_REVOCATION = {
+    'ALIAS': 'default',
+    'TIMEOUT': int(os.getenv('JWT_REVOCATION_CACHE_TIMEOUT', 60)),
 }
 
 MIDDLEWARE = [
@@ -98,6 +108,33 @@ DATABASES = {
     }
 }
 
+# Hash de contraseñas: el algoritmo elegido se usa para las nuevas y el
+# resto se mantiene para verificar las existentes, que se rehashean al entrar
+PASSWORD_HASHING = {
+    'ALGORITHM': os.getenv('PASSWORD_HASHER', 'scrypt'),
+    # scrypt: coste proporcional a N * r * p, memoria 128 * N * r bytes por hash
+    'SCRYPT_WORK_FACTOR': int(os.getenv('PASSWORD_SCRYPT_N', 2 ** 14)),
+    'SCRYPT_BLOCK_SIZE': int(os.getenv('PASSWORD_SCRYPT_R', 8)),
+    'SCRYPT_PARALLELISM': int(os.getenv('PASSWORD_SCRYPT_P', 2)),
+    # Argon2id (requiere argon2-cffi): memoria en KiB
+    'ARGON2_TIME_COST': int(os.getenv('PASSWORD_ARGON2_TIME_COST', 2)),
+    'ARGON2_MEMORY_COST': int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 19 * 1024)),
+    'ARGON2_PARALLELISM': int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 1)),
+    # Hashes simultáneos por proceso; acota CPU y memoria en picos de registros
+    'MAX_WORKERS': int(os.getenv('PASSWORD_HASHING_MAX_WORKERS', os.cpu_count() or 2)),
+}
+
+_PASSWORD_HASHERS = {
+    'scrypt': 'apps.users.hashers.TunedScryptPasswordHasher',
+    'argon2': 'apps.users.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHING['ALGORITHM']]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHING['ALGORITHM']
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+AUTHENTICATION_BACKENDS = ['apps.users.backends.PooledModelBackend']
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -120,6 +157,124 @@ TIME_ZONE = 'Europe/Madrid'
 USE_I18N = True
 USE_TZ = True
 
+# Backends de caché propios de cada proceso: sus invalidaciones no llegan a los demás
+_PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _shared_cache_flag(name: str, backend: str) -> bool:
+    """Lee un interruptor opcional (False por defecto) de una caché que debe ser compartida"""
+    enabled = os.getenv(name, 'False') == 'True'
+    if enabled and backend in _PROCESS_LOCAL_CACHES:
+        raise ImproperlyConfigured(f'{name} requiere un backend de caché compartido (Redis, Memcached...)')
+    return enabled
+
+
+# Caché
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Planes generados por OpenAI; LocMemCache expulsa por LRU al llegar a MAX_ENTRIES
+    'training_plans': {
+        'BACKEND': os.getenv(
+            'TRAINING_PLAN_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('TRAINING_PLAN_CACHE_LOCATION', 'training-plans'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('TRAINING_PLAN_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+    # Respuestas de lectura por usuario y versión de sus datos
+    'user_responses': {
+        'BACKEND': os.getenv(
+            'USER_RESPONSE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('USER_RESPONSE_CACHE_LOCATION', 'user-responses'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('USER_RESPONSE_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Caché de planes generados
+TRAINING_PLAN_CACHE = {
+    'ENABLED': os.getenv('TRAINING_PLAN_CACHE_ENABLED', 'True') == 'True',
+    'ALIAS': 'training_plans',
+    'TIMEOUT': int(os.getenv('TRAINING_PLAN_CACHE_TIMEOUT', 60 * 60 * 24)),
+    'MAX_ENTRY_BYTES': 64 * 1024,
+}
+
+# Caché de respuestas de lectura (planes y perfil) por usuario. Desactivada por
+# defecto: solo puede activarse con un backend compartido, para que las
+# invalidaciones lleguen a todos los procesos
+USER_RESPONSE_CACHE = {
+    'ENABLED': _shared_cache_flag('USER_RESPONSE_CACHE_ENABLED', CACHES['user_responses']['BACKEND']),
+    'ALIAS': 'user_responses',
+    'TIMEOUT': int(os.getenv('USER_RESPONSE_CACHE_TIMEOUT', 300)),
+    # La versión cacheada solo puede quedar obsoleta en una carrera con un commit
+    'VERSION_TIMEOUT': int(os.getenv('USER_RESPONSE_CACHE_VERSION_TIMEOUT', 60)),
+}
+
+# Usuario y perfil autenticados, cacheados hasta que cambia la versión de sus
+# datos. Como la caché de respuestas, es opcional y exige un backend compartido
+USER_AUTH_CACHE = {
+    'ENABLED': _shared_cache_flag('USER_AUTH_CACHE_ENABLED', CACHES['user_responses']['BACKEND']),
+    'ALIAS': 'user_responses',
+    'TIMEOUT': int(os.getenv('USER_AUTH_CACHE_TIMEOUT', 300)),
+}
+
+# Coalescencia de generaciones idénticas; con LOCK_DIR también entre procesos
+# (requiere una caché de planes compartida, p. ej. FileBasedCache o DatabaseCache)
+TRAINING_PLAN_SINGLE_FLIGHT = {
+    'LOCK_DIR': os.getenv('TRAINING_PLAN_LOCK_DIR') or None,
+    'LOCK_TIMEOUT': 120,
+}
+
+# Motor de generación por defecto: 'openai', 'rules' (generador local) o
+# 'auto' (OpenAI con el generador local como respaldo si falla)
+TRAINING_PLAN_GENERATOR = {
+    'ENGINE': os.getenv('TRAINING_PLAN_ENGINE', 'auto'),
+}
+
+# Trabajos de generación de planes: 'thread' los ejecuta en un pool de hilos
+# del propio proceso, 'worker' los deja para `manage.py process_plan_jobs`
+TRAINING_PLAN_JOBS = {
+    'MODE': os.getenv('TRAINING_PLAN_JOBS_MODE', 'thread'),
+    'MAX_WORKERS': int(os.getenv('TRAINING_PLAN_JOBS_MAX_WORKERS', 4)),
+    # Segundos tras los que un trabajo en curso (o pendiente en modo thread) se da por abandonado
+    'STALE_AFTER': int(os.getenv('TRAINING_PLAN_JOBS_STALE_AFTER', 300)),
+}
+
+# Generación en lote (manage.py generate_plans y acción del admin de perfiles)
+TRAINING_PLAN_BATCH = {
+    'MAX_WORKERS': int(os.getenv('TRAINING_PLAN_BATCH_MAX_WORKERS', 4)),
+    # Generaciones iniciadas por segundo como máximo, para no agotar el límite de OpenAI
+    'RATE_PER_SECOND': float(os.getenv('TRAINING_PLAN_BATCH_RATE', 2)),
+    'CHUNK_SIZE': 500,
+}
+
+# Paginación por cursor del listado de planes
+TRAINING_PLAN_PAGINATION = {
+    'PAGE_SIZE': int(os.getenv('TRAINING_PLAN_PAGE_SIZE', 20)),
+    'MAX_PAGE_SIZE': int(os.getenv('TRAINING_PLAN_MAX_PAGE_SIZE', 100)),
+}
+
+# Importación y exportación masiva de planes en JSON Lines
+TRAINING_PLAN_BULK = {
+    # Planes por inserción y por lectura de la exportación
+    'CHUNK_SIZE': int(os.getenv('TRAINING_PLAN_BULK_CHUNK_SIZE', 500)),
+    'EXPORT_CHUNK_SIZE': int(os.getenv('TRAINING_PLAN_EXPORT_CHUNK_SIZE', 500)),
+    'MAX_LINES': int(os.getenv('TRAINING_PLAN_BULK_MAX_LINES', 10000)),
+    'MAX_ERRORS': 50,
+}
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
@@ -146,6 +301,49 @@ SWAGGER_SETTINGS = {
 # OpenAI API Key
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 
+# Cliente HTTP de OpenAI, compartido por proceso. BASE_URL permite apuntar a
+# un servidor local que imite la API (tests y benchmarks)
+OPENAI_CLIENT = {
+    'BASE_URL': os.getenv('OPENAI_BASE_URL') or None,
+    'MAX_CONNECTIONS': int(os.getenv('OPENAI_MAX_CONNECTIONS', 20)),
+    'MAX_KEEPALIVE_CONNECTIONS': int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10)),
+    'KEEPALIVE_EXPIRY': float(os.getenv('OPENAI_KEEPALIVE_EXPIRY', 30)),
+    'CONNECT_TIMEOUT': float(os.getenv('OPENAI_CONNECT_TIMEOUT', 5)),
+    'READ_TIMEOUT': float(os.getenv('OPENAI_READ_TIMEOUT', 60)),
+    # Reintentos del SDK; por defecto 0 porque los gestiona OPENAI_RESILIENCE
+    'MAX_RETRIES': int(os.getenv('OPENAI_MAX_RETRIES', 0)),
+}
+
+# Plazo por petición, reintentos con backoff y circuit breaker de las llamadas a OpenAI
+OPENAI_RESILIENCE = {
+    'DEADLINE': float(os.getenv('OPENAI_DEADLINE', 45)),
+    'MAX_ATTEMPTS': int(os.getenv('OPENAI_MAX_ATTEMPTS', 3)),
+    'BACKOFF_BASE': 0.5,
+    'BACKOFF_MAX': 4.0,
+    'BREAKER_WINDOW': 20,
+    'BREAKER_MIN_CALLS': 5,
+    'BREAKER_FAILURE_RATE': 0.5,
+    'BREAKER_OPEN_SECONDS': float(os.getenv('OPENAI_BREAKER_OPEN_SECONDS', 30)),
+    'BREAKER_HALF_OPEN_CALLS': 1,
+}
+
+# Formato de respuesta pedido a OpenAI: 'json_schema' (salida estructurada, modelos
+# que la admiten), 'json_object' (modo JSON) o 'text'
+OPENAI_RESPONSE = {
+    'FORMAT': os.getenv('OPENAI_RESPONSE_FORMAT', 'json_object'),
+}
+
+# Presupuesto de tokens de cada generación: el prompt se recorta para caber en
+# MAX_PROMPT_TOKENS y max_tokens se ajusta a lo que ocupa un plan con esos días
+OPENAI_TOKEN_BUDGET = {
+    'MAX_PROMPT_TOKENS': int(os.getenv('OPENAI_MAX_PROMPT_TOKENS', 1000)),
+    'MAX_COMPLETION_TOKENS': int(os.getenv('OPENAI_MAX_COMPLETION_TOKENS', 3000)),
+    'COMPLETION_TOKENS_BASE': 50,
+    'COMPLETION_TOKENS_PER_DAY': int(os.getenv('OPENAI_COMPLETION_TOKENS_PER_DAY', 400)),
+    # Ventana de contexto del modelo (gpt-3.5-turbo)
+    'CONTEXT_WINDOW': 16385,
+}
+
 if not OPENAI_API_KEY:
     print("WARNING: No OPENAI_API_KEY found in environment variables")
     raise ValueError("No OPENAI_API_KEY set in environment")